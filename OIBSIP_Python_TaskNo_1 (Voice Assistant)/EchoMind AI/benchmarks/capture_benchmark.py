@@ -0,0 +1,87 @@
+"""Background capture / VAD segmentation benchmark
+
+Feeds WAV files through the background capture pipeline (utils/audio_capture.py)
+instead of a microphone and prints the utterances it cut, plus how much faster
+than real time the segmentation runs. Without arguments a synthetic recording
+(noise with three tone "utterances") is generated.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.capture_benchmark [recording.wav ...] [--realtime]
+"""
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# (start, length) in seconds of the tone bursts in the synthetic recording
+SYNTHETIC_BURSTS = [(1.0, 1.2), (3.5, 0.8), (5.5, 1.5)]
+
+
+def write_synthetic_wav(path, seconds=8.0, sample_rate=16000):
+    """Low background noise with loud tone bursts standing in for speech"""
+    rng = random.Random(7)
+    samples = []
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        value = rng.gauss(0, 60)
+        if any(start <= t < start + length for start, length in SYNTHETIC_BURSTS):
+            value += 3000 * math.sin(2 * math.pi * 220 * t)
+        samples.append(max(-32768, min(32767, int(value))))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def run(paths, realtime=False):
+    from utils.audio_capture import BackgroundCapture, WavFileSource
+
+    for path in paths:
+        source = WavFileSource(path, realtime=realtime)
+        capture = BackgroundCapture(source, max_pending=100)
+        started = time.perf_counter()
+        capture.start()
+        capture.finished.wait()
+        elapsed = time.perf_counter() - started
+        if capture.error is not None:
+            print(f"{path}: {capture.error}\n")
+            continue
+
+        with wave.open(path, "rb") as wav:
+            audio_seconds = wav.getnframes() / wav.getframerate()
+        utterances = []
+        while capture.pending():
+            utterances.append(capture.get(timeout=0))
+
+        print(f"{os.path.basename(path)}: {audio_seconds:.1f}s of audio, "
+              f"final threshold {capture.segmenter.threshold:.0f}")
+        for number, utterance in enumerate(utterances, 1):
+            print(f"  utterance {number}: at {utterance.offset:.2f}s, {utterance.duration:.2f}s long")
+        print(f"  {len(utterances)} utterances in {elapsed * 1000:.0f} ms "
+              f"({audio_seconds / elapsed:.0f}x real time)\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark EchoMind background capture segmentation")
+    parser.add_argument("wav", nargs="*", help="PCM WAV recordings to feed (default: synthetic)")
+    parser.add_argument("--realtime", action="store_true", help="read the files at recording speed")
+    args = parser.parse_args()
+
+    if args.wav:
+        run(args.wav, args.realtime)
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "synthetic.wav")
+            write_synthetic_wav(path)
+            print(f"Synthetic recording, bursts at {SYNTHETIC_BURSTS}")
+            run([path], args.realtime)
@@ -0,0 +1,117 @@
+"""Response extraction benchmark and golden-output check
+
+Runs every response body of the golden corpus (corpus/responses.jsonl)
+through extract_response() and through the chain it replaced (client
+extraction, then normalize_response() + strip_json_noise() in the handler),
+checks the text against the recorded golden output and reports the cost of
+both.
+
+The corpus is built from real traffic: gemini_client logs every raw body to
+logs/gemini_responses.jsonl, and --build-golden adds the bodies found there
+(with today's extract_response() output as their golden text). Review the
+new lines before committing them.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.extract_benchmark [--repeat 2000] [--show-changes]
+    python -m benchmarks.extract_benchmark --build-golden logs/gemini_responses.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import legacy_response
+
+GOLDEN = os.path.join(ROOT, "benchmarks", "corpus", "responses.jsonl")
+
+
+def load_golden(path=GOLDEN):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_golden(log_paths, path=GOLDEN):
+    """Append the response bodies of the logs that are not in the corpus yet"""
+    from utils.response_extract import extract_response
+
+    entries = load_golden(path)
+    known = {entry["raw"] for entry in entries}
+    added = 0
+    for log_path in log_paths:
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    raw = json.loads(line).get("response_text")
+                except ValueError:
+                    continue
+                if not isinstance(raw, str) or raw in known:
+                    continue
+                known.add(raw)
+                result = extract_response(raw)
+                entries.append({"raw": raw, "text": result.text, "finish_reason": result.finish_reason})
+                added += 1
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    print(f"added {added} responses, {len(entries)} in {os.path.relpath(path, ROOT)}")
+
+
+def _per_call(function, raws, repeat):
+    best = None
+    for _ in range(max(1, repeat // 100)):
+        started = time.perf_counter()
+        for _ in range(100):
+            for raw in raws:
+                function(raw)
+        elapsed = (time.perf_counter() - started) / (100 * len(raws))
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(repeat, show_changes):
+    from utils.response_extract import extract_response
+
+    entries = load_golden()
+    if not entries:
+        print("golden corpus is empty: run with --build-golden logs/gemini_responses.jsonl")
+        return 1
+
+    failures = 0
+    changes = 0
+    for entry in entries:
+        result = extract_response(entry["raw"])
+        if result.text != entry["text"] or result.finish_reason != entry.get("finish_reason"):
+            failures += 1
+            print(f"MISMATCH {entry['raw'][:60]!r}\n  golden: {entry['text']!r}\n  got:    {result.text!r}")
+        before = legacy_response.legacy_pipeline(entry["raw"])
+        if before != result.text:
+            changes += 1
+            if show_changes:
+                print(f"changed {entry['raw'][:60]!r}\n  before: {before!r}\n  now:    {result.text!r}")
+
+    raws = [entry["raw"] for entry in entries]
+    new = _per_call(lambda raw: extract_response(raw).text, raws, repeat)
+    old = _per_call(legacy_response.legacy_pipeline, raws, repeat)
+    print(f"{len(entries)} responses, {failures} golden mismatches, {changes} differ from the old chain")
+    print(f"  extract_response    {new * 1e6:8.1f} us/response")
+    print(f"  old cleaning chain  {old * 1e6:8.1f} us/response  ({old / new:.1f}x)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Gemini response extraction against a golden corpus")
+    parser.add_argument("--build-golden", nargs="+", metavar="LOG", help="add bodies from gemini_responses.jsonl logs")
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus per timing (default 2000)")
+    parser.add_argument("--show-changes", action="store_true", help="print outputs that differ from the old chain")
+    args = parser.parse_args()
+    if args.build_golden:
+        build_golden(args.build_golden)
+    else:
+        sys.exit(run(args.repeat, args.show_changes))
@@ -0,0 +1,315 @@
+"""Latency and failure-handling suite for the Gemini client
+
+Starts the local mock server (benchmarks/mock_gemini_server.py), points the
+client at it and sends a batch of questions through each entry point in a
+series of scenarios: a healthy backend, a slow one, rate limiting (429 with
+Retry-After), 5xx errors, malformed payloads and a backend that is down.
+
+Entry points:
+- generate: gemini_client.generate_response() (generateContent)
+- stream:   gemini_client.stream_generate() (streamGenerateContent)
+- fallback: main_refactored.handle_gemini_fallback() with streaming on, as a
+            voice question takes it (speech goes to the silent TTS backend)
+- batch:    gemini_client.generate_many() over all the questions at once,
+            --concurrency requests in flight
+
+For every scenario and entry point it reports how the answers ended (ok,
+unavailable message, cut off mid-stream, empty, error), p50/p95 latency, p50/p95 time to the
+first text of answered streams, throughput and what the server injected.
+Client warnings are hidden unless --verbose.
+
+Then it checks the failure handling and exits with status 1 if a check fails:
+- breaker:     a backend that is down opens the circuit breaker, and later
+               calls are refused without a request
+- retry_after: retries after a 429 wait at least as long as Retry-After
+- malformed:   malformed payloads end in the unavailable message (blocking and
+               streamed; a stream cut off mid-answer ends with it), never in
+               raw or empty text
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.gemini_load [--requests 20] [--concurrency 1] [--scenario healthy ...]
+    python -m benchmarks.gemini_load --target stream --sse --deadline 5
+    python -m benchmarks.gemini_load --checks-only
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.mock_gemini_server import DEFAULTS, MockGeminiServer
+from utils.call_metrics import percentile
+
+SCENARIOS = {
+    "healthy": {},
+    "slow": {"latency": 0.8, "chunk_interval": 0.2},
+    "rate_limited": {"rate_429": 0.4, "retry_after": "0.3"},
+    "flaky_5xx": {"rate_5xx": 0.3},
+    "malformed": {"malformed_rate": 0.5},
+    "down": {"rate_5xx": 1.0},
+}
+TARGETS = ("generate", "stream", "fallback", "batch")
+QUESTIONS = ["What is photosynthesis?", "Who wrote Hamlet?", "How far away is the moon?",
+             "Why is the sky blue?", "What is the capital of Australia?"]
+
+
+def classify(text):
+    import gemini_client
+
+    if not text or not text.strip():
+        return "empty"
+    if gemini_client.is_unavailable(text):
+        return "unavailable"
+    head, _, tail = text.rpartition("\n")
+    if head.strip() and gemini_client.is_unavailable(tail):
+        return "cut off"  # a stream that broke after part of the answer
+    return "ok"
+
+
+def call_generate(question):
+    import gemini_client
+
+    started = time.perf_counter()
+    text = gemini_client.generate_response(question)
+    return classify(text), time.perf_counter() - started, None
+
+
+def call_stream(question):
+    import gemini_client
+
+    started = time.perf_counter()
+    first = None
+    parts = []
+    for chunk in gemini_client.stream_generate(question):
+        if first is None and any(ch.isalnum() for ch in chunk):
+            first = time.perf_counter() - started
+        parts.append(chunk)
+    outcome = classify("".join(parts))
+    # The unavailable message is not a first token of an answer
+    return outcome, time.perf_counter() - started, first if outcome in ("ok", "cut off") else None
+
+
+def call_fallback(question):
+    import main_refactored
+    from utils import voice_io
+
+    logged = []
+    # Keep the results out of the interaction log; classify what would be logged
+    main_refactored.log_interaction = lambda command, response, source=None: logged.append(response)
+    voice_io.last_stream_metrics = None
+    started = time.perf_counter()
+    main_refactored.handle_gemini_fallback(question)
+    total = time.perf_counter() - started
+    metrics = voice_io.last_stream_metrics
+    response = logged[-1] if logged else ""
+    if response == "No response returned":
+        outcome = "empty"
+    elif response == "Cancelled" or response.startswith(("Error:", "Streaming error:")):
+        outcome = "error"
+    else:
+        outcome = classify(response)
+    return outcome, total, metrics.first_sentence if metrics and outcome in ("ok", "cut off") else None
+
+
+def run_batch(questions, concurrency):
+    import gemini_client
+
+    outcomes = {"unavailable": "unavailable", "empty response": "empty"}
+    return [("ok" if item.error is None else outcomes.get(item.error, "error"), item.seconds, None)
+            for item in gemini_client.generate_many(questions, max_concurrency=concurrency)]
+
+
+CALLS = {"generate": call_generate, "stream": call_stream, "fallback": call_fallback}
+
+
+def _safe(call, question):
+    try:
+        return call(question)
+    except Exception as e:
+        return f"error ({type(e).__name__})", 0.0, None
+
+
+def run_target(server, target, requests_count, concurrency, sse):
+    import gemini_client
+
+    streaming = target in ("stream", "fallback")
+    gemini_client.GEMINI_API_ENDPOINT = server.url(stream=streaming, sse=sse)
+    os.environ["GEMINI_API_STREAM"] = "true" if streaming else "false"
+    gemini_client.get_breaker().reset()
+    gemini_client.stage_metrics.clear()
+    server.reset_counts()
+
+    questions = [QUESTIONS[i % len(QUESTIONS)] + f" ({i})" for i in range(requests_count)]
+    started = time.perf_counter()
+    if target == "batch":
+        results = run_batch(questions, concurrency)
+    else:
+        call = CALLS[target]
+        workers = 1 if target == "fallback" else concurrency
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda question: _safe(call, question), questions))
+    wall = time.perf_counter() - started
+
+    outcomes = {}
+    for outcome, _, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return {
+        "outcomes": outcomes,
+        "latencies": [seconds for _, seconds, _ in results],
+        "ttfts": [first for _, _, first in results if first is not None],
+        "per_second": len(results) / wall if wall else 0.0,
+        "server": dict(server.counts),
+        "breaker": gemini_client.get_breaker().stats(),
+    }
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}" if seconds is not None else "-"
+
+
+def report(scenario, target, result):
+    outcomes = ", ".join(f"{name} {count}" for name, count in sorted(result["outcomes"].items()))
+    server = result["server"]
+    injected = " ".join(f"{name}={server[name]}" for name in ("429", "503", "malformed") if server.get(name))
+    breaker = result["breaker"]
+    print(f"{scenario:<13}{target:<9}{_ms(percentile(result['latencies'], 50)):>8}"
+          f"{_ms(percentile(result['latencies'], 95)):>8}{_ms(percentile(result['ttfts'], 50)):>8}"
+          f"{_ms(percentile(result['ttfts'], 95)):>8}{result['per_second']:>7.1f}  {outcomes:<36}"
+          f"sent {server.get('requests', 0) + server.get('streams', 0):<3} {injected or '-':<18}"
+          f"breaker {breaker['state']} (opened {breaker['opened']}, rejected {breaker['rejected']})")
+
+
+def check_breaker(server, sse):
+    """A backend answering 503 to everything opens the breaker; later calls are refused"""
+    import gemini_client
+
+    server.configure(**dict(DEFAULTS, rate_5xx=1.0))
+    result = run_target(server, "generate", 6, 1, sse)
+    breaker = result["breaker"]
+    sent = server.counts.get("requests", 0)
+    # Without the breaker every call would send its retries
+    passed = breaker["opened"] >= 1 and breaker["rejected"] >= 1 and sent < 6 * 3 \
+        and result["outcomes"] == {"unavailable": 6}
+    gemini_client.get_breaker().reset()
+    return passed, (f"opened {breaker['opened']}, rejected {breaker['rejected']}, {sent} requests sent, "
+                    f"outcomes {result['outcomes']}")
+
+
+def check_retry_after(server, sse, retry_after=0.5):
+    """After a 429, the next attempt waits at least Retry-After"""
+    server.configure(**dict(DEFAULTS, rate_429=1.0, retry_after=str(retry_after)))
+    run_target(server, "generate", 1, 1, sse)
+    arrivals = list(server.arrivals)
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    passed = bool(gaps) and min(gaps) >= retry_after
+    shortest = f"{min(gaps) * 1000:.0f} ms" if gaps else "no retry"
+    return passed, f"{len(arrivals)} attempts, shortest gap {shortest} (Retry-After {retry_after * 1000:.0f} ms)"
+
+
+def check_malformed(server, sse, count=8):
+    """Malformed payloads (truncated, garbage, no candidates, blocked) end in the unavailable message"""
+    server.configure(**dict(DEFAULTS, malformed_rate=1.0))
+    outcomes = {}
+    for target in ("generate", "stream"):
+        outcomes[target] = run_target(server, target, count, 1, sse)["outcomes"]
+    passed = (outcomes["generate"] == {"unavailable": count}
+              and set(outcomes["stream"]) <= {"unavailable", "cut off"})
+    return passed, ", ".join(f"{target} {result}" for target, result in outcomes.items())
+
+
+CHECKS = {"breaker": check_breaker, "retry_after": check_retry_after, "malformed": check_malformed}
+
+
+def run_checks(server, args):
+    """Run CHECKS against server; returns the number that failed"""
+    print("\nfailure handling checks:")
+    failed = 0
+    for name, check in CHECKS.items():
+        output = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            passed, detail = check(server, args.sse)
+        failed += not passed
+        print(f"  {'PASS' if passed else 'FAIL'} {name:<12} {detail}")
+    return failed
+
+
+def main(args):
+    server = MockGeminiServer(seed=args.seed).start()
+    # The client reads its settings at import time
+    os.environ.update({
+        "GEMINI_API_ENDPOINT": server.url(),
+        "GEMINI_API_KEY": "mock-key",
+        "GEMINI_API_KEY_HEADER": "x-goog-api-key",
+        "GEMINI_CACHE": "false",
+        "GEMINI_METRICS": "false",
+        "GEMINI_WARMUP": "false",
+        "GEMINI_DEADLINE": str(args.deadline),
+        "GEMINI_BREAKER_RESET": str(args.breaker_reset),
+        "GEMINI_RATE_LIMIT": str(args.rate_limit),
+        "TTS_BACKEND": "silent",
+    })
+    import gemini_client
+
+    targets = args.target or list(TARGETS)
+    if "fallback" in targets and not args.checks_only:
+        try:
+            importlib.import_module("main_refactored")
+        except ImportError as e:
+            print(f"Skipping the fallback target: main_refactored cannot be imported ({e})")
+            targets.remove("fallback")
+
+    print(f"{args.requests} requests per run, concurrency {args.concurrency}, "
+          f"deadline {args.deadline:.0f}s, {'SSE' if args.sse else 'JSON array'} streams")
+    if not args.checks_only:
+        print(f"{'scenario':<13}{'target':<9}{'p50 ms':>8}{'p95 ms':>8}{'TTFT50':>8}{'TTFT95':>8}{'req/s':>7}  "
+              f"{'outcomes':<36}server")
+    stage_totals = {}
+    failed = 0
+    try:
+        for scenario in [] if args.checks_only else args.scenario or list(SCENARIOS):
+            server.configure(**dict(DEFAULTS, **SCENARIOS[scenario]))
+            for target in targets:
+                output = io.StringIO()
+                with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                    result = run_target(server, target, args.requests, args.concurrency, args.sse)
+                report(scenario, target, result)
+                for stage, entry in gemini_client.metrics()["stages"].items():
+                    total = stage_totals.setdefault(stage, {"calls": 0, "failures": 0, "seconds": 0.0})
+                    total["calls"] += entry["calls"]
+                    total["failures"] += entry["failures"]
+                    total["seconds"] += entry["seconds"]
+        if not args.skip_checks:
+            failed = run_checks(server, args)
+    finally:
+        server.stop()
+
+    if stage_totals:
+        print("\nclient stages over all runs:")
+    for stage, total in sorted(stage_totals.items()):
+        print(f"  {stage:<9} {total['calls']:>5} calls  {total['failures']:>4} failed  "
+              f"{total['seconds'] / max(1, total['calls']) * 1000:>7.0f} ms avg")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load and failure tests of the Gemini client against a mock server")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="scenario to run (repeatable; default all)")
+    parser.add_argument("--target", action="append", choices=TARGETS, help="entry point to test (repeatable; default all)")
+    parser.add_argument("--requests", type=int, default=20, help="requests per scenario and target (default 20)")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel requests for generate/stream/batch (default 1)")
+    parser.add_argument("--deadline", type=float, default=5.0, help="GEMINI_DEADLINE in seconds (default 5)")
+    parser.add_argument("--breaker-reset", type=float, default=2.0, help="GEMINI_BREAKER_RESET in seconds (default 2)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="GEMINI_RATE_LIMIT in requests/minute (default 0: none)")
+    parser.add_argument("--sse", action="store_true", help="stream server-sent events instead of a JSON array")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the injected faults (default 0)")
+    parser.add_argument("--verbose", action="store_true", help="show the client's warnings")
+    parser.add_argument("--skip-checks", action="store_true", help="only report the numbers, without the pass/fail checks")
+    parser.add_argument("--checks-only", action="store_true", help="run only the pass/fail checks")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,281 @@
+"""Local stand-in for the Gemini generateContent API
+
+Answers POST .../models/<model>:generateContent with a complete JSON
+response and .../:streamGenerateContent with a streamed one (server-sent
+events with ?alt=sse, otherwise a JSON array sent piece by piece), in the
+same shapes as the real API. Both request bodies the client sends
+({"contents": ...} and {"prompt": ...}) are accepted.
+
+Everything that makes the real backend hard to test can be dialed in:
+latency before the first byte, the cadence of streamed chunks, injected 429
+and 5xx errors (with Retry-After) and malformed payloads. Options can be
+changed while the server runs (server.configure(...)).
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.mock_gemini_server [--port 8765] [--latency 0.3] [--rate-429 0.1] ...
+then point GEMINI_API_ENDPOINT at the printed URL (any GEMINI_API_KEY works).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SENTENCES = [
+    "This answer comes from the local mock Gemini server.",
+    "It streams a few short sentences so speech can start early.",
+    "Latency, errors and malformed payloads are configurable.",
+    "Nothing here was generated by a real model.",
+    "Use it to measure the client without an API key.",
+]
+
+MALFORMED_KINDS = ("truncated", "garbage", "empty_candidates", "blocked")
+
+DEFAULTS = {
+    "latency": 0.05,          # seconds before the response starts
+    "jitter": 0.2,            # +/- fraction applied to every delay
+    "chunk_interval": 0.05,   # seconds between streamed chunks
+    "chunk_words": 4,         # words per streamed chunk
+    "sentences": 3,           # sentences per answer
+    "rate_429": 0.0,          # fraction of requests answered 429
+    "rate_5xx": 0.0,          # fraction of requests answered 503
+    "retry_after": None,      # Retry-After header sent with 429/503 (e.g. "1")
+    "malformed_rate": 0.0,    # fraction of responses with a malformed payload
+}
+
+
+def _frame(text, finish=False, tokens=0):
+    frame = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}],
+             "usageMetadata": {"promptTokenCount": 24, "candidatesTokenCount": tokens,
+                               "totalTokenCount": 24 + tokens},
+             "modelVersion": "mock-gemini", "responseId": "mock"}
+    if finish:
+        frame["candidates"][0]["finishReason"] = "STOP"
+    return frame
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockGemini/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        # Connection warm-up and circuit breaker probes
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        url = urlsplit(self.path)
+        stream = ":streamGenerateContent" in url.path
+        sse = parse_qs(url.query).get("alt") == ["sse"]
+        fault = server.pick_fault()
+        server.count("streams" if stream else "requests")
+        server.arrived()
+
+        try:
+            json.loads(body or b"{}")
+        except ValueError:
+            self._send(400, b'{"error": {"code": 400, "message": "Invalid JSON payload"}}')
+            return
+
+        server.wait(server.options["latency"])
+        if fault in ("429", "503"):
+            server.count(fault)
+            message = "Resource exhausted" if fault == "429" else "The model is overloaded"
+            payload = json.dumps({"error": {"code": int(fault), "message": message}}).encode()
+            self._send(int(fault), payload, retry_after=server.options["retry_after"])
+            return
+
+        answer = server.answer()
+        if fault == "malformed":
+            server.count("malformed")
+        if stream:
+            self._stream(answer, sse, server.rng_choice(MALFORMED_KINDS) if fault == "malformed" else None)
+        else:
+            self._generate(answer, server.rng_choice(MALFORMED_KINDS) if fault == "malformed" else None)
+
+    def _send(self, status, payload, content_type="application/json", retry_after=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (cancelled or past its deadline)
+            self.close_connection = True
+
+    def _generate(self, answer, malformed):
+        payload = json.dumps(_frame(answer, finish=True, tokens=len(answer.split())), indent=2)
+        if malformed == "truncated":
+            payload = payload[:len(payload) // 2]
+        elif malformed == "garbage":
+            self._send(200, b"<html><body>Upstream error</body></html>", content_type="text/html")
+            return
+        elif malformed == "empty_candidates":
+            payload = json.dumps({"candidates": [], "modelVersion": "mock-gemini"})
+        elif malformed == "blocked":
+            payload = json.dumps({"promptFeedback": {"blockReason": "SAFETY"}, "modelVersion": "mock-gemini"})
+        self._send(200, payload.encode())
+
+    def _stream(self, answer, sse, malformed):
+        words = answer.split(" ")
+        size = max(1, self.server.options["chunk_words"])
+        chunks = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+                  for i in range(0, len(words), size)]
+        self.send_response(200)
+        if malformed == "garbage":
+            content_type = "text/html"  # a gateway error page, as for _generate()
+        else:
+            content_type = "text/event-stream" if sse else "application/json"
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            if malformed == "garbage":
+                self._chunk(b"<html><body>Upstream error</body></html>")
+            elif malformed in ("empty_candidates", "blocked"):
+                frame = {"candidates": []} if malformed == "empty_candidates" else \
+                    {"promptFeedback": {"blockReason": "SAFETY"}}
+                self._chunk((f"data: {json.dumps(frame)}\r\n\r\n" if sse else json.dumps([frame])).encode())
+            else:
+                tokens = 0
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        self.server.wait(self.server.options["chunk_interval"])
+                    tokens += len(chunk.split())
+                    frame = json.dumps(_frame(chunk, finish=i == len(chunks) - 1, tokens=tokens))
+                    if sse:
+                        data = f"data: {frame}\r\n\r\n"
+                    else:
+                        data = ("[" if i == 0 else ",\r\n") + frame + ("]" if i == len(chunks) - 1 else "")
+                    if malformed == "truncated" and i == len(chunks) // 2:
+                        # The connection drops in the middle of a frame
+                        self._chunk(data[:len(data) // 2].encode())
+                        self.close_connection = True
+                        return
+                    self._chunk(data.encode())
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (cancelled or past its deadline)
+            self.close_connection = True
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    """Threaded mock of the Gemini API; see DEFAULTS for the options"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, seed=0, **options):
+        super().__init__((host, port), _Handler)
+        self.options = dict(DEFAULTS)
+        self.configure(**options)
+        self.counts = {}
+        self.arrivals = []   # time.monotonic() of every POST since reset_counts()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._answers = 0
+        self._thread = None
+
+    def configure(self, **options):
+        """Change options (also while serving); unknown names raise TypeError"""
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise TypeError(f"unknown mock server options: {', '.join(sorted(unknown))}")
+        self.options.update(options)
+
+    def url(self, model="gemini-2.0-flash", stream=False, sse=True):
+        """Endpoint URL to use as GEMINI_API_ENDPOINT"""
+        host, port = self.server_address[:2]
+        method = "streamGenerateContent" + ("?alt=sse" if sse else "") if stream else "generateContent"
+        return f"http://{host}:{port}/v1beta/models/{model}:{method}"
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def arrived(self):
+        with self._lock:
+            self.arrivals.append(time.monotonic())
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = {}
+            self.arrivals = []
+
+    def pick_fault(self):
+        """None, "429", "503" or "malformed" for the next request"""
+        with self._lock:
+            roll = self._rng.random()
+        options = self.options
+        if roll < options["rate_429"]:
+            return "429"
+        roll -= options["rate_429"]
+        if roll < options["rate_5xx"]:
+            return "503"
+        roll -= options["rate_5xx"]
+        if roll < options["malformed_rate"]:
+            return "malformed"
+        return None
+
+    def rng_choice(self, items):
+        with self._lock:
+            return self._rng.choice(items)
+
+    def wait(self, seconds):
+        if seconds <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._rng.uniform(-1, 1) * self.options["jitter"]
+        time.sleep(seconds * factor)
+
+    def answer(self):
+        with self._lock:
+            self._answers += 1
+            number = self._answers
+        count = max(1, self.options["sentences"])
+        return " ".join([f"Mock answer number {number}."] + SENTENCES[:count - 1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Gemini API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    for name, default in DEFAULTS.items():
+        kind = str if name == "retry_after" else type(default)
+        parser.add_argument("--" + name.replace("_", "-"), type=kind, default=default)
+    args = vars(parser.parse_args())
+    host, port, seed = args.pop("host"), args.pop("port"), args.pop("seed")
+    server = MockGeminiServer(host, port, seed, **args)
+    print("Mock Gemini API listening:")
+    print(f"  GEMINI_API_ENDPOINT={server.url()}")
+    print(f"  GEMINI_API_ENDPOINT={server.url(stream=True)}   (with GEMINI_API_STREAM=true)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,125 @@
+"""Routing micro-benchmark
+
+Compares the per-command cost of a linear handler scan with the
+keyword-indexed dispatcher used by route_command, on the command corpus in
+benchmarks/corpus/commands.txt.
+
+"linear" is not the original handle_* chain: those handlers spoke, launched
+or fetched as soon as they matched, so they cannot be timed in a loop.
+Instead it runs the current handlers' match phases (see handlers/base.py)
+in order until one matches, the way the original chain was scanned; both
+columns therefore do the same matching work and nothing is spoken, launched
+or fetched while benchmarking. Each command is
+parsed into a Command once up front, as the main loop does, and the parse
+cost is reported separately.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.routing_benchmark [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus", "commands.txt")
+
+
+def load_corpus(path=CORPUS_PATH):
+    """Load benchmark commands, skipping blank lines and comments"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def route_linear(command, handlers):
+    """Scan the current handlers' match phases in order until one matches
+
+    The order and the stop-at-first-match of the original route_command
+    chain, with today's match() functions.
+
+    Returns (handler name or None, number of handlers evaluated)
+    """
+    evaluated = 0
+    for handler_name, handler, _ in handlers:
+        evaluated += 1
+        if handler.match(command) is not None:
+            return handler_name, evaluated
+    return None, evaluated
+
+
+def route_indexed(command, dispatcher):
+    """First match through the trigger index, as route_command does"""
+    for handler_name, _, _ in dispatcher.matches(command):
+        return handler_name
+    return None
+
+
+def _time_per_command(func, commands, repeat):
+    timings = []
+    for command in commands:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(command)
+        timings.append((time.perf_counter() - start) / repeat)
+    return timings
+
+
+def run(repeat=200):
+    import main_refactored
+
+    from utils.command import parse_command
+
+    raw_commands = load_corpus()
+    commands = [parse_command(c) for c in raw_commands]
+    handlers = main_refactored.HANDLERS
+    dispatcher = main_refactored.dispatcher
+
+    mismatches = []
+    evaluated_before = evaluated_after = 0
+    outcomes = []
+    for command in commands:
+        before, count = route_linear(command, handlers)
+        after = route_indexed(command, dispatcher)
+        outcomes.append(after)
+        evaluated_before += count
+        evaluated_after += len(dispatcher.candidate_positions(command))
+        if before != after:
+            mismatches.append((command.raw, before, after))
+
+    linear = _time_per_command(lambda c: route_linear(c, handlers), commands, repeat)
+    indexed = _time_per_command(lambda c: route_indexed(c, dispatcher), commands, repeat)
+    parsing = _time_per_command(parse_command, raw_commands, repeat)
+
+    def _report(label, selected):
+        if not selected:
+            return
+        before_us = sum(linear[i] for i in selected) / len(selected) * 1e6
+        after_us = sum(indexed[i] for i in selected) / len(selected) * 1e6
+        speedup = before_us / after_us if after_us else float("inf")
+        print(f"{label:<22}{len(selected):>6}{before_us:>14.1f}{after_us:>14.1f}{speedup:>10.1f}x")
+
+    print(f"Routing benchmark: {len(commands)} commands x {repeat} repeats")
+    print("linear = the current match phases scanned in order (not the original handle_* chain)\n")
+    print(f"{'':<22}{'count':>6}{'linear (us)':>14}{'indexed (us)':>14}{'speedup':>11}")
+    _report("all commands", list(range(len(commands))))
+    _report("handled locally", [i for i, name in enumerate(outcomes) if name])
+    _report("Gemini fallback", [i for i, name in enumerate(outcomes) if not name])
+    print(f"\nparse_command: {sum(parsing) / len(parsing) * 1e6:.1f} us per command (once per utterance)")
+    print(f"Handlers evaluated per command: "
+          f"{evaluated_before / len(commands):.1f} (linear) vs "
+          f"{evaluated_after / len(commands):.1f} (indexed, upper bound)")
+    if mismatches:
+        print("\nWARNING: first matching handler differs for:")
+        for command, before, after in mismatches:
+            print(f"  {command!r}: linear={before} indexed={after}")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark EchoMind command routing")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations per command")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.repeat) else 1)
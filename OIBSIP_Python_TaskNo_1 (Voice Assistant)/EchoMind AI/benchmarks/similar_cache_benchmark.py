@@ -0,0 +1,108 @@
+"""Near-duplicate question cache benchmark
+
+Checks utils/similar_cache.py on pairs of questions: rephrasings that should
+reuse the cached answer and different questions that must not, including
+near misses that differ by one word or only in tense. Reports, per
+threshold, how many rephrasings are found and how many different questions
+would wrongly get another question's answer. Also reports the lookup time
+with --entries prompts indexed.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.similar_cache_benchmark [--entries 1000] [--threshold 0.8 ...]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# (cached question, later question)
+SAME = [
+    ("what's the capital of france", "capital of france?"),
+    ("What is photosynthesis?", "explain photosynthesis"),
+    ("who wrote hamlet", "Who wrote Hamlet?"),
+    ("tell me what a black hole is", "what is a black hole"),
+    ("how far is the moon from the earth", "how far is the moon from earth?"),
+    ("what is the boiling point of water", "boiling point of water"),
+    ("can you explain machine learning", "what is machine learning?"),
+    ("how does a rainbow form", "how do rainbows form"),
+    ("who is the author of pride and prejudice", "who's the author of pride and prejudice"),
+    ("what is the speed of light", "tell me the speed of light please"),
+    # Looser rephrasings: found at lower thresholds only
+    ("who was the first man on the moon", "who was the first man to walk on the moon"),
+    ("how does a refrigerator work", "how do refrigerators work exactly"),
+    ("why do cats purr", "why do cats purr so much"),
+    ("what causes earthquakes", "what causes an earthquake to happen"),
+]
+DIFFERENT = [
+    ("what's the capital of france", "what's the capital of germany"),
+    ("when was albert einstein born", "where was albert einstein born"),
+    ("who wrote hamlet", "who wrote macbeth"),
+    ("how tall is the eiffel tower", "how old is the eiffel tower"),
+    ("what is the capital of australia", "what is the population of australia"),
+    ("what is 12 times 12", "what is 12 times 13"),
+    ("is coffee good for you", "is coffee not good for you"),
+    ("what is python", "what is python used for"),
+    ("how do i cook rice", "how do i cook pasta"),
+    ("why is the sky blue", "why is the sea blue"),
+    # Same words, different tense
+    ("who is the president of the usa", "who was the president of the usa"),
+    ("who is the prime minister of the uk", "who was the prime minister of the uk"),
+    ("what is the population of india", "what will the population of india be"),
+    # Near misses: one word changes the answer
+    ("how many calories are in a banana", "how many calories are in a banana split"),
+    ("how many people live in new york city", "how many people live in new york state"),
+    ("how long does it take to boil an egg", "how long does it take to boil a soft egg"),
+    ("what year did world war 2 end", "what year did world war 1 end"),
+]
+WORDS = ("planet river mountain history music painting engine language ocean forest city "
+         "computer animal bridge island desert battery theory country flower").split()
+
+
+def accuracy(threshold):
+    from utils.similar_cache import SimilarityCache
+
+    found = wrong = 0
+    for pairs, expect in ((SAME, True), (DIFFERENT, False)):
+        for cached, later in pairs:
+            cache = SimilarityCache(threshold)
+            cache.put(cached, "answer")
+            hit = cache.get(later) is not None
+            if expect and hit:
+                found += 1
+            elif not expect and hit:
+                wrong += 1
+                print(f"  wrong reuse at {threshold}: {cached!r} -> {later!r}")
+    return found, wrong
+
+
+def lookup_time(entries, threshold, lookups=2000):
+    from utils.similar_cache import SimilarityCache
+
+    rng = random.Random(0)
+    cache = SimilarityCache(threshold, max_entries=entries)
+    prompts = [" ".join(rng.sample(WORDS, 4)) + f" {i}" for i in range(entries)]
+    for prompt in prompts:
+        cache.put(prompt, "answer")
+    queries = [rng.choice(prompts) if i % 2 else " ".join(rng.sample(WORDS, 4)) for i in range(lookups)]
+    started = time.perf_counter()
+    for query in queries:
+        cache.get(query)
+    return (time.perf_counter() - started) / lookups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the near-duplicate question cache")
+    parser.add_argument("--entries", type=int, default=1000, help="prompts indexed for the timing (default 1000)")
+    parser.add_argument("--threshold", type=float, action="append", help="similarity threshold (repeatable)")
+    args = parser.parse_args()
+    for threshold in args.threshold or [0.6, 0.7, 0.8, 0.9]:
+        found, wrong = accuracy(threshold)
+        per_lookup = lookup_time(args.entries, threshold)
+        print(f"threshold {threshold:.2f}: {found}/{len(SAME)} rephrasings reused, "
+              f"{wrong}/{len(DIFFERENT)} different questions wrongly reused, "
+              f"{per_lookup * 1e6:.1f} us/lookup with {args.entries} prompts")
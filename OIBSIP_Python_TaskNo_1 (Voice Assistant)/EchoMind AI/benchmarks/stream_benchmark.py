@@ -0,0 +1,144 @@
+"""Streamed-response parsing benchmark
+
+Replays recorded Gemini stream captures, cut into network-sized reads,
+through the incremental parser (utils/stream_parser.py) and through the
+previous line-based path (split lines, regex + raw_decode the "text" field,
+strip_json_noise() every chunk). Reports the CPU cost per read and the
+time to the first text delta when the reads arrive --interval ms apart.
+
+Captures are raw response bodies: *.sse from streamGenerateContent?alt=sse,
+*.json from plain streamGenerateContent (a JSON array). Record your own with
+e.g. curl -N -H "x-goog-api-key: $GEMINI_API_KEY" -d @body.json URL > answer.sse
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.stream_benchmark [capture ...] [--read-size 512] [--interval 5]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import legacy_response
+
+CAPTURES = os.path.join(ROOT, "benchmarks", "corpus", "streams")
+
+_LEGACY_TEXT_RE = re.compile(r'"text"\s*:\s*')
+_LEGACY_DECODER = json.JSONDecoder()
+
+
+def split_reads(data, read_size, seed=0):
+    """Cut data into reads of 1..read_size bytes, like a socket delivers them"""
+    rng = random.Random(seed)
+    reads = []
+    pos = 0
+    while pos < len(data):
+        size = rng.randint(1, read_size)
+        reads.append(data[pos:pos + size])
+        pos += size
+    return reads
+
+
+class LegacyParser:
+    """The line-based parsing stream_generate used before stream_parser"""
+
+    def __init__(self):
+        self._strip = legacy_response.strip_json_noise
+        self._extract = legacy_response._extract_text_from_data
+        self._pending = ""
+
+    def _line_text(self, line):
+        match = _LEGACY_TEXT_RE.search(line)
+        if match:
+            try:
+                text, _ = _LEGACY_DECODER.raw_decode(line[match.end():])
+                return text if isinstance(text, str) and text else None
+            except ValueError:
+                pass
+        try:
+            return self._extract(json.loads(line)) or None
+        except Exception:
+            return None
+
+    def _lines(self, lines):
+        deltas = []
+        for line in lines:
+            text = self._line_text(line) if line else None
+            if not text:
+                continue
+            cleaned = self._strip(text)
+            if cleaned and any(ch.isalnum() for ch in cleaned):
+                deltas.append(cleaned)
+        return deltas
+
+    def feed(self, data):
+        # What requests' iter_lines(decode_unicode=True) does with each read
+        lines = (self._pending + data.decode("utf-8", "replace")).splitlines()
+        self._pending = lines.pop() if lines and not data.endswith((b"\n", b"\r")) else ""
+        return self._lines(lines)
+
+    def close(self):
+        lines, self._pending = [self._pending], ""
+        return self._lines(lines)
+
+
+def replay(parser, reads, interval=0.0):
+    """(CPU seconds per read, seconds to the first delta, joined text)"""
+    cpu = 0.0
+    first = None
+    deltas = []
+    started = time.perf_counter()
+    for i, data in enumerate(reads):
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        before = time.process_time()
+        out = parser.feed(data)
+        cpu += time.process_time() - before
+        if out and first is None:
+            first = time.perf_counter() - started
+        deltas.extend(out)
+    before = time.process_time()
+    out = parser.close()
+    cpu += time.process_time() - before
+    if out and first is None:
+        first = time.perf_counter() - started
+    deltas.extend(out)
+    return cpu / max(1, len(reads)), first, "".join(deltas)
+
+
+def run(paths, read_size, interval, repeat):
+    from utils import stream_parser
+
+    parsers = [("incremental", stream_parser.StreamParser), ("line-based", LegacyParser)]
+    print(f"{'capture':<22}{'reads':>6}  {'parser':<12}{'us/read':>9}{'TTFT (ms)':>11}  text")
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        reads = split_reads(data, read_size)
+        for name, factory in parsers:
+            # CPU: best of several replays without delays; TTFT: one paced replay
+            per_read = min(replay(factory(), reads)[0] for _ in range(repeat))
+            _, first, text = replay(factory(), reads, interval / 1000.0)
+            ttft = f"{first * 1000:.1f}" if first is not None else "-"
+            preview = text if len(text) <= 40 else text[:37] + "..."
+            print(f"{os.path.basename(path):<22}{len(reads):>6}  {name:<12}{per_read * 1e6:>9.1f}{ttft:>11}  "
+                  f"{preview!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parsing of streamed Gemini responses")
+    parser.add_argument("capture", nargs="*", help="recorded response bodies (default: benchmarks/corpus/streams)")
+    parser.add_argument("--read-size", type=int, default=512, help="largest network read in bytes (default 512)")
+    parser.add_argument("--interval", type=float, default=5.0, help="ms between reads for TTFT (default 5)")
+    parser.add_argument("--repeat", type=int, default=200, help="replays per CPU measurement (default 200)")
+    args = parser.parse_args()
+    run(args.capture or sorted(glob.glob(os.path.join(CAPTURES, "*"))), args.read_size, args.interval, args.repeat)
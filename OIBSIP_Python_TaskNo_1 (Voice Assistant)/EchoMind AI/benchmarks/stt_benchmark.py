@@ -0,0 +1,87 @@
+"""Speech-to-text engine comparison
+
+Runs the same recordings through each speech-to-text backend (utils/stt.py)
+and reports recognition latency, real-time factor and word error rate. A
+recording's reference transcript is read from a .txt file next to it
+(recording.wav -> recording.txt); without one only latency is reported.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.stt_benchmark recording.wav [...] [--backend vosk] [--backend google]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref) if ref else float(bool(hyp))
+
+
+def _reference(path):
+    transcript = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(transcript):
+        return None
+    with open(transcript, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def run(paths, backends):
+    import speech_recognition as sr
+    from utils import stt
+
+    recordings = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            recordings.append((path, sr.Recognizer().record(source), _reference(path)))
+
+    for name in backends:
+        backend = stt.create_backend(name)
+        if backend.name != name:
+            print(f"{name}: unavailable, skipped\n")
+            continue
+
+        print(name)
+        print(f"  {'audio (s)':>9}{'latency (ms)':>14}{'WER':>7}  result")
+        errors = []
+        timings = []
+        for path, audio, reference in recordings:
+            try:
+                text = stt.recognize_with(backend, audio)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                text = f"<{type(e).__name__}>"
+            timing = stt.last_timing()
+            timings.append(timing)
+            wer = "-"
+            if reference is not None:
+                error = word_error_rate(reference, "" if text.startswith("<") else text)
+                errors.append(error)
+                wer = f"{error:.2f}"
+            print(f"  {timing.audio_seconds:>9.1f}{timing.latency * 1000:>14.0f}{wer:>7}  "
+                  f"{os.path.basename(path)}: {text}")
+
+        stats = stt.recognition_stats(timings)[name]
+        summary = f"  average {stats['latency'] * 1000:.0f} ms, real-time factor {stats['real_time_factor']:.2f}"
+        if errors:
+            summary += f", WER {sum(errors) / len(errors):.2f}"
+        print(summary + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare EchoMind speech-to-text engines")
+    parser.add_argument("wav", nargs="+", help="PCM WAV recordings (reference in recording.txt)")
+    parser.add_argument("--backend", action="append", help="engine to measure (repeatable, default: google)")
+    args = parser.parse_args()
+    run(args.wav, args.backend or ["google"])
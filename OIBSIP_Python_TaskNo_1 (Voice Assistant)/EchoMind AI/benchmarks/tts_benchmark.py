@@ -0,0 +1,66 @@
+"""Text-to-speech latency benchmark
+
+Speaks the same sentences through each TTS backend of the persistent speech
+worker (utils/tts.py) and reports per-utterance latency, so backends can be
+compared on the same machine. Audio really plays while this runs.
+
+Usage (from the EchoMind AI folder):
+    python -m benchmarks.tts_benchmark [--backend pyttsx3] [--backend subprocess]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SENTENCES = [
+    "Good morning!",
+    "The current time is 10:42 AM.",
+    "Opening notepad.",
+    "Battery is at 80 percent and charging.",
+    "Sorry, I didn't understand that. Could you repeat?",
+]
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def run(backends):
+    from utils.tts import SpeechWorker, speech_stats
+
+    all_timings = []
+    for name in backends:
+        worker = SpeechWorker(backend_name=name)
+        worker.start()
+        for sentence in SENTENCES:
+            worker.enqueue(sentence)
+        worker.wait_until_idle()
+        worker.stop()
+        worker.join()
+
+        if worker.backend.name != name:
+            print(f"{name}: unavailable, worker fell back to {worker.backend.name}\n")
+            continue
+
+        print(f"{name}")
+        print(f"  {'chars':>5}{'queued (ms)':>13}{'first audio (ms)':>18}{'total (ms)':>12}  text")
+        for sentence, timing in zip(SENTENCES, worker.timings):
+            print(f"  {timing.chars:>5}{_ms(timing.queued):>13}{_ms(timing.first_audio):>18}"
+                  f"{_ms(timing.total):>12}  {sentence}")
+        print()
+        all_timings.extend(worker.timings)
+
+    for backend, stats in speech_stats(all_timings).items():
+        print(f"{backend:<12} {stats['count']} utterances, first audio {_ms(stats['first_audio'])} ms, "
+              f"total {_ms(stats['total'])} ms (average)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark EchoMind text-to-speech backends")
+    parser.add_argument("--backend", action="append", choices=["pyttsx3", "subprocess"],
+                        help="backend to measure (repeatable, default: both)")
+    args = parser.parse_args()
+    run(args.backend or ["pyttsx3", "subprocess"])
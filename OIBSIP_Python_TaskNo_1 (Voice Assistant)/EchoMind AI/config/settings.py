@@ -16,6 +16,51 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     print("Warning: GEMINI_API_KEY not set. Gemini features will be disabled until you set this environment variable.")
 
+# Text-to-speech engine used by the persistent TTS worker (utils/tts.py):
+# "auto" (pyttsx3 when installed, else the system command), "pyttsx3" or "subprocess"
+TTS_BACKEND = os.getenv("TTS_BACKEND", "auto").strip().lower()
+
+# How listen() gets audio: "session" records one phrase per call on a shared
+# microphone session, "background" captures continuously on a background thread
+# and queues utterances (utils/audio_capture.py)
+LISTEN_MODE = os.getenv("LISTEN_MODE", "session").strip().lower()
+
+# Optional wake word for background capture (e.g. "echo"); empty = answer everything
+WAKE_WORD = os.getenv("WAKE_WORD", "").strip().lower()
+
+# Speech-to-text engine (utils/stt.py): "google" (web API), "vosk" or "whisper"
+# (offline, optional packages) or "file" (transcripts read from STT_TRANSCRIPT_FILE,
+# for tests). STT_FALLBACK is tried when the main engine fails (empty = none).
+STT_BACKEND = os.getenv("STT_BACKEND", "google").strip().lower()
+STT_FALLBACK = os.getenv("STT_FALLBACK", "").strip().lower()
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+STT_TRANSCRIPT_FILE = os.getenv("STT_TRANSCRIPT_FILE", "")
+
+# Speculative Gemini requests: start the request for a spoken question while
+# the local handlers are still being matched, and cancel it if one of them
+# takes the command (see gemini_async.Speculation)
+GEMINI_SPECULATIVE = os.getenv("GEMINI_SPECULATIVE", "false").strip().lower() in ("1", "true", "yes")
+
+# Background log writer (utils/log_writer.py): entries are written in batches of
+# LOG_BATCH_SIZE or every LOG_FLUSH_INTERVAL seconds; files are rotated and
+# gzipped past LOG_MAX_BYTES (and daily), keeping LOG_BACKUP_COUNT archives
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_DAILY = os.getenv("LOG_ROTATE_DAILY", "true").strip().lower() in ("1", "true", "yes")
+
+# Per-utterance span tracing (utils/tracing.py): the last TRACE_KEEP utterances
+# are written to TRACE_FILE in Chrome trace format (open in ui.perfetto.dev)
+TRACE = os.getenv("TRACE", "false").strip().lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("logs", "trace.json"))
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "50"))
+
+# Prometheus metrics endpoint (utils/metrics_endpoint.py); 0 = off
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
 # Common applications dictionary (Windows-focused)
 COMMON_APPS = {
     "notepad": "notepad",
@@ -93,6 +138,9 @@ CONNECTOR_WORDS = ["and ", "with ", "to ", "inside ", "then ", "also "]
 # City extraction blacklist for weather
 WEATHER_CITY_BLACKLIST = ("current", "what", "tell", "give", "show", "get", "find")
 
+# Said while a Gemini request is in flight (LISTEN_MODE=background), these abort it
+INTERRUPT_KEYWORDS = ["stop", "cancel", "never mind", "nevermind", "abort", "be quiet"]
+
 # Exit keywords
 EXIT_KEYWORDS = ["exit", "quit", "stop", "bye", "goodbye", "terminate"]
 
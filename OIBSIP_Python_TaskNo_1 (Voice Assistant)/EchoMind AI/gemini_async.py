@@ -0,0 +1,521 @@
+"""Asyncio counterparts of gemini_client.generate_response / stream_generate.
+
+Every request can be aborted through a CancelToken (from any thread, e.g.
+when the user says "stop") and is bounded by an overall deadline, so the
+caller is freed immediately instead of sitting in a 15-30 s blocking
+timeout. Prompt building, caching and response parsing are shared with
+gemini_client, so answers are identical to the blocking client.
+
+HTTP goes through httpx.AsyncClient when httpx is installed. Without it the
+blocking client runs in a worker thread: cancelling still frees the caller
+at once, the abandoned request just finishes in the background.
+
+The synchronous main loop uses the *_cancellable() wrappers, which run the
+coroutines on one background event loop thread, and Speculation to start a
+request before it knows whether a local handler will answer instead.
+"""
+
+import asyncio
+import functools
+import os
+import queue
+import threading
+import time
+from typing import AsyncGenerator, Optional
+from urllib.parse import urlsplit
+
+import gemini_client
+from utils import call_metrics, resilience, stream_parser
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Overall time budget (seconds) for one request, including retries and fallbacks
+GEMINI_DEADLINE = gemini_client.GEMINI_DEADLINE
+
+
+class RequestCancelled(Exception):
+    """Raised when a request is aborted through its CancelToken."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised internally when a request runs past its overall deadline."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag that in-flight requests are raced against."""
+
+    def __init__(self):
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Abort every request using this token (safe to call from any thread)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Call callback() on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RequestCancelled(self.reason)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def _race(awaitable, token: Optional[CancelToken], deadline_at: float):
+    """Await awaitable unless the token fires or the deadline passes first."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    waiters = {task}
+    cancelled = None
+    callback = None
+    if token is not None:
+        # The token may fire on any thread; hop onto this loop to resolve the future
+        cancelled = loop.create_future()
+        callback = functools.partial(loop.call_soon_threadsafe, _resolve, cancelled)
+        token.add_callback(callback)
+        waiters.add(cancelled)
+    try:
+        done, _ = await asyncio.wait(waiters, timeout=max(0.0, deadline_at - time.monotonic()),
+                                     return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if callback is not None:
+            token.remove_callback(callback)
+    if task in done:
+        return task.result()
+    task.cancel()
+    if cancelled is not None and cancelled in done:
+        raise RequestCancelled(token.reason)
+    raise DeadlineExceeded()
+
+
+_clients = {}
+
+
+def _client() -> "httpx.AsyncClient":
+    """One pooled AsyncClient per event loop (connections are bound to their loop)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        for old_loop in [l for l in _clients if l.is_closed()]:
+            del _clients[old_loop]
+        limits = httpx.Limits(max_connections=gemini_client.GEMINI_POOL_SIZE,
+                              max_keepalive_connections=gemini_client.GEMINI_POOL_SIZE)
+        client = _clients[loop] = httpx.AsyncClient(limits=limits)
+    return client
+
+
+async def _post(google: bool, enhanced_prompt: str, deadline_at: float, retry_count: int = 3,
+                call=None, route=None) -> Optional[str]:
+    """POST one generate request; retries like call_google_generate, within deadline_at."""
+    stage = "google" if google else "http"
+    headers, payload = gemini_client.build_request(enhanced_prompt, google, route)
+    endpoint = gemini_client.route_endpoint(route)
+    breaker = gemini_client.get_breaker()
+    failed = False
+    for attempt in range(retry_count):
+        if not await _rate_slot(deadline_at):
+            break
+        started = time.perf_counter()
+        retry_after = None
+        try:
+            resp = await _client().post(endpoint, json=payload, headers=headers,
+                                        timeout=max(0.1, deadline_at - time.monotonic()))
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            failed = True
+            gemini_client._record_attempt(stage, started, None, call)
+            print(f"WARNING: API error: {e!r} (attempt {attempt+1}/{retry_count})")
+        else:
+            if not gemini_client._record_attempt(stage, started, resp.status_code, call):
+                breaker.record_success()
+                resp.raise_for_status()
+                if not google:
+                    gemini_client.log_response(endpoint, enhanced_prompt, resp.text)
+                try:
+                    data = resp.json()
+                except ValueError:
+                    data = None
+                return gemini_client._answer_from(resp, data, call)
+            failed = True
+            retry_after = resp.headers.get("Retry-After")
+            gemini_client.note_rate_limit(resp.status_code, retry_after)
+            print(f"WARNING: API {'rate limited' if resp.status_code == 429 else 'unavailable'} "
+                  f"({resp.status_code}) - (attempt {attempt+1}/{retry_count})")
+
+        if attempt < retry_count - 1:
+            wait_time = resilience.backoff_delay(attempt, retry_after)
+            if wait_time >= deadline_at - time.monotonic():
+                break
+            print(f"  Retrying in {wait_time:.1f}s...")
+            await asyncio.sleep(wait_time)
+            gemini_client.stage_metrics.record("backoff", wait_time)
+    if failed:
+        breaker.record_failure()
+    return None
+
+
+async def _rate_slot(deadline_at: float) -> bool:
+    """Wait for a slot of the shared rate limiter; False if the deadline comes first"""
+    wait = gemini_client.rate_limiter.reserve(resilience.Deadline(deadline_at - time.monotonic()))
+    if wait is None:
+        return False
+    if wait > 0:
+        await asyncio.sleep(wait)
+    return True
+
+
+async def _generate(prompt: str, key, deadline_at: float, call=None, route=None) -> str:
+    if not HTTPX_AVAILABLE:
+        loop = asyncio.get_running_loop()
+        deadline = resilience.Deadline(deadline_at - time.monotonic())
+        return await loop.run_in_executor(None, gemini_client._generate_uncached, prompt, key, deadline, call, route)
+    if not (gemini_client.GEMINI_API_ENDPOINT and gemini_client.GEMINI_API_KEY):
+        return gemini_client.UNAVAILABLE_MESSAGE
+    breaker = gemini_client.get_breaker()
+    if not breaker.allow():
+        print("WARNING: Gemini backend is failing, not calling it for now")
+        return gemini_client.UNAVAILABLE_MESSAGE
+
+    enhanced_prompt = gemini_client.build_prompt(prompt)
+    attempts = [True, False] if gemini_client.prefers_google() else [False]
+    for google in attempts:
+        if breaker.state == "open" or time.monotonic() >= deadline_at:
+            break
+        try:
+            out = await _post(google, enhanced_prompt, deadline_at, call=call, route=route)
+        except httpx.HTTPError as e:
+            print(f"WARNING: API error: {e}")
+            continue
+        if out is not None:
+            if not out.strip():
+                return gemini_client.UNAVAILABLE_MESSAGE  # a reply without an answer (blocked, empty or unreadable)
+            gemini_client.remember_response(key, prompt, out)
+            return out
+    return gemini_client.UNAVAILABLE_MESSAGE
+
+
+async def generate_response_async(prompt: str, cancel_token: Optional[CancelToken] = None,
+                                  deadline: Optional[float] = None, source: str = "gemini") -> str:
+    """Async generate_response(): the full answer, or UNAVAILABLE_MESSAGE.
+
+    Raises RequestCancelled if cancel_token fires first. Running past
+    deadline seconds (default: the time budget of the chosen model route)
+    counts as a failed request. The call is recorded under source unless
+    it is cancelled.
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    call = call_metrics.CallRecord(source)
+    cached, key = gemini_client.cached_response(prompt, call)
+    if cached is not None:
+        return gemini_client.finish_call(call, cached)
+    route = gemini_client.choose_route(prompt, source, call)
+    deadline = route.timeout if deadline is None else deadline
+    deadline_at = time.monotonic() + deadline
+    try:
+        text = await _race(_generate(prompt, key, deadline_at, call, route), cancel_token, deadline_at)
+    except DeadlineExceeded:
+        print(f"WARNING: Gemini request exceeded its {deadline:.0f}s deadline")
+        text = gemini_client.UNAVAILABLE_MESSAGE
+    return gemini_client.finish_call(call, text)
+
+
+async def stream_generate_async(prompt: str, cancel_token: Optional[CancelToken] = None,
+                                deadline: Optional[float] = None,
+                                source: str = "gemini_stream") -> AsyncGenerator[str, None]:
+    """Async stream_generate(): yields text deltas as they arrive.
+
+    Raises RequestCancelled when cancel_token fires. When the deadline passes
+    the stream just ends (or yields UNAVAILABLE_MESSAGE if nothing came yet);
+    a stream that breaks after some text ends with STREAM_UNAVAILABLE_MESSAGE.
+    The call is recorded under source unless it is cancelled.
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    call = call_metrics.CallRecord(source)
+    parts = []
+    cancelled = False
+    chunks = _stream_chunks(prompt, cancel_token, deadline, source, call)
+    try:
+        async for chunk in chunks:
+            if call.ttft is None and any(ch.isalnum() for ch in chunk):
+                call.first_text()
+            parts.append(chunk)
+            yield chunk
+    except RequestCancelled:
+        cancelled = True
+        raise
+    finally:
+        await chunks.aclose()
+        if not cancelled:
+            gemini_client.finish_call(call, "".join(parts))
+
+
+async def _stream_chunks(prompt: str, cancel_token: Optional[CancelToken], deadline: Optional[float],
+                         source: str, call):
+    """The chunks of stream_generate_async(); attempts and token usage are added to call"""
+    cached, key = gemini_client.cached_response(prompt, call)
+    if cached is not None:
+        yield cached
+        return
+    route = gemini_client.choose_route(prompt, source, call)
+    deadline = route.timeout if deadline is None else deadline
+    deadline_at = time.monotonic() + deadline
+    stream_flag = os.getenv("GEMINI_API_STREAM", "").lower() in ("1", "true", "yes")
+
+    yielded = False
+    if HTTPX_AVAILABLE and stream_flag and gemini_client.GEMINI_API_ENDPOINT and gemini_client.GEMINI_API_KEY:
+        if not gemini_client.get_breaker().allow():
+            print("WARNING: Gemini backend is failing, not calling it for now")
+            yield gemini_client.UNAVAILABLE_MESSAGE
+            return
+        try:
+            slot = await _race(_rate_slot(deadline_at), cancel_token, deadline_at)
+        except DeadlineExceeded:
+            slot = False
+        if not slot:
+            print("WARNING: Gemini rate limit leaves no time for this request")
+            yield gemini_client.UNAVAILABLE_MESSAGE
+            return
+        google = gemini_client.prefers_google()
+        headers, payload = gemini_client.build_request(gemini_client.build_prompt(prompt), google, route)
+        raw_parts = []
+        started = time.perf_counter()
+        status = None
+        try:
+            request = _client().stream("POST", gemini_client.route_endpoint(route), json=payload, headers=headers,
+                                       timeout=max(0.1, deadline_at - time.monotonic()))
+            async with request as resp:
+                status = resp.status_code
+                resp.raise_for_status()
+                if gemini_client._is_html_page(resp):
+                    raise httpx.DecodingError(f"got an HTML page instead of an answer (status {status})",
+                                              request=resp.request)
+                parser = stream_parser.StreamParser()
+                reads = resp.aiter_bytes()
+                while True:
+                    try:
+                        data = await _race(reads.__anext__(), cancel_token, deadline_at)
+                    except StopAsyncIteration:
+                        break
+                    for text in parser.feed(data):
+                        raw_parts.append(text)
+                        yielded = yielded or any(ch.isalnum() for ch in text)
+                        yield text
+                for text in parser.close():
+                    raw_parts.append(text)
+                    yielded = yielded or any(ch.isalnum() for ch in text)
+                    yield text
+                call.usage(parser.usage)
+            if yielded:
+                gemini_client.remember_response(key, prompt, "".join(raw_parts))
+                return
+        except DeadlineExceeded:
+            print(f"WARNING: Gemini stream exceeded its {deadline:.0f}s deadline")
+            if not yielded:
+                yield gemini_client.UNAVAILABLE_MESSAGE
+            return
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.HTTPStatusError):
+                gemini_client.note_rate_limit(status, e.response.headers.get("Retry-After"))
+            else:
+                status = None  # no response, or the connection broke mid-stream
+            print(f"WARNING: Streaming failed: {e}")
+            if yielded:
+                # Part of the answer is out already: say it broke off rather than repeat it
+                yield "\n" + gemini_client.STREAM_UNAVAILABLE_MESSAGE
+                return
+        finally:
+            if gemini_client._record_attempt("stream", started, status, call):
+                gemini_client.get_breaker().record_failure()
+            else:
+                gemini_client.get_breaker().record_success()
+
+    # Not streaming (or the stream failed before any text): one blocking-style request
+    try:
+        yield await _race(_generate(prompt, key, deadline_at, call, route), cancel_token, deadline_at)
+    except DeadlineExceeded:
+        print(f"WARNING: Gemini request exceeded its {deadline:.0f}s deadline")
+        yield gemini_client.UNAVAILABLE_MESSAGE
+
+
+async def _warm_up_async(timeout: float) -> bool:
+    parts = urlsplit(gemini_client.GEMINI_API_ENDPOINT)
+    try:
+        await _client().head(f"{parts.scheme}://{parts.netloc}/", timeout=timeout)
+    except httpx.HTTPError:
+        return False
+    return True
+
+
+def warm_up(timeout: float = 5.0) -> bool:
+    """Open the connection the async client will use (see gemini_client.warm_up)."""
+    if not HTTPX_AVAILABLE:
+        return gemini_client.warm_up(timeout)
+    if not (gemini_client.GEMINI_WARMUP and gemini_client.GEMINI_API_ENDPOINT and gemini_client.GEMINI_API_KEY):
+        return False
+    return asyncio.run_coroutine_threadsafe(_warm_up_async(timeout), _background_loop()).result()
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running on a daemon thread for the synchronous wrappers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-async", daemon=True).start()
+        return _loop
+
+
+def generate_response_cancellable(prompt: str, cancel_token: Optional[CancelToken] = None,
+                                  deadline: Optional[float] = None, source: str = "gemini") -> str:
+    """Blocking call into generate_response_async() for synchronous code."""
+    future = asyncio.run_coroutine_threadsafe(
+        generate_response_async(prompt, cancel_token, deadline, source), _background_loop())
+    return future.result()
+
+
+def stream_generate_cancellable(prompt: str, cancel_token: Optional[CancelToken] = None,
+                                deadline: Optional[float] = None, source: str = "gemini_stream"):
+    """Synchronous generator over stream_generate_async() (e.g. for speak_stream)."""
+    loop = _background_loop()
+    stream = stream_generate_async(prompt, cancel_token, deadline, source)
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(stream.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(stream.aclose(), loop).result()
+
+
+_speculation_counts = {"started": 0, "adopted": 0, "wasted": 0, "saved_seconds": 0.0}
+_speculation_lock = threading.Lock()
+_DONE = object()
+
+
+class Speculation:
+    """A Gemini request started before routing knows whether it is needed
+
+    The request runs on the background loop right away and buffers what it
+    receives. If a local handler takes the command, cancel() aborts it (a
+    wasted request); otherwise the fallback adopts it with chunks() or
+    result() and gets the head start.
+    """
+
+    def __init__(self, prompt: str, stream: bool, deadline: Optional[float] = None, source: str = None):
+        self.prompt = prompt
+        self.stream = stream
+        self.source = source or ("gemini_stream" if stream else "gemini")
+        self.token = CancelToken()
+        self.started = time.perf_counter()
+        self.first_at = None
+        self.adopted_at = None
+        self.saved = None  # seconds the head start saved, once adopted
+        self._queue = queue.Queue()
+        with _speculation_lock:
+            _speculation_counts["started"] += 1
+        asyncio.run_coroutine_threadsafe(self._run(deadline), _background_loop())
+
+    async def _run(self, deadline):
+        try:
+            if self.stream:
+                async for chunk in stream_generate_async(self.prompt, self.token, deadline, self.source):
+                    self._put(chunk)
+            else:
+                self._put(await generate_response_async(self.prompt, self.token, deadline, self.source))
+        except BaseException as e:
+            self._queue.put(e)
+        finally:
+            self._queue.put(_DONE)
+
+    def _put(self, chunk):
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+        self._queue.put(chunk)
+
+    def cancel(self, reason: str = "handled locally"):
+        """Abort the request because it is not needed"""
+        if self.adopted_at is None and not self.token.cancelled:
+            with _speculation_lock:
+                _speculation_counts["wasted"] += 1
+        self.token.cancel(reason)
+
+    def _adopt(self):
+        if self.adopted_at is not None:
+            return
+        self.adopted_at = time.perf_counter()
+        # The head start saved the time until adoption, or only until the
+        # first text if that arrived earlier
+        first_at = self.first_at
+        self.saved = (self.adopted_at if first_at is None else first_at) - self.started
+        with _speculation_lock:
+            _speculation_counts["adopted"] += 1
+            _speculation_counts["saved_seconds"] += self.saved
+
+    def chunks(self):
+        """Adopt the request: the buffered chunks, then the rest as they arrive"""
+        self._adopt()
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def result(self) -> str:
+        """Adopt the request and wait for the whole answer"""
+        return "".join(self.chunks())
+
+
+def speculation_stats() -> dict:
+    """Speculative requests started, adopted by the fallback and wasted, and the time saved"""
+    with _speculation_lock:
+        stats = dict(_speculation_counts)
+    stats["avg_saved_ms"] = stats["saved_seconds"] * 1000 / stats["adopted"] if stats["adopted"] else 0.0
+    return stats
+
+
+__all__ = [
+    "CancelToken", "RequestCancelled", "generate_response_async", "stream_generate_async",
+    "generate_response_cancellable", "stream_generate_cancellable", "Speculation", "speculation_stats",
+]
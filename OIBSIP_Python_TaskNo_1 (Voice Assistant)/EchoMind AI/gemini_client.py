@@ -9,8 +9,16 @@ uses your provider's streaming SDK or HTTP/gRPC/WebSocket API.
 """
 
 import os
+import threading
+import time
+from collections import namedtuple
 from typing import Generator, Optional
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils import (call_metrics, conversation, log_writer, metrics_endpoint, model_router, resilience, response_cache,
+                   response_extract, similar_cache, stream_parser, tracing)
 
 # Read config from environment
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -22,98 +30,59 @@ GEMINI_API_KEY_HEADER = os.getenv("GEMINI_API_KEY_HEADER")
 # Optional: control response formatting and prompt wrapping
 GEMINI_RESPONSE_MODE = os.getenv("GEMINI_RESPONSE_MODE", "").lower()  # e.g. 'plain_text'
 GEMINI_PROMPT_WRAPPER = os.getenv("GEMINI_PROMPT_WRAPPER", "").strip()
-
-
-def _extract_text_from_data(data):
-    """Try to extract a human-readable text reply from a parsed JSON object
-    or from a raw text string that may contain JSON. Returns a string or None.
-    The function looks for common Gemini/LLM shapes (candidates -> content
-    -> parts -> text) and falls back to finding the longest string value in
-    the JSON tree.
-    """
-    import json as _json
-
-    # If it's a string, try to parse JSON out of it first
-    if isinstance(data, str):
-        s = data.strip()
-        # quick heuristic: if it looks like JSON try to parse
-        if s.startswith("{") or s.startswith("["):
-            try:
-                parsed = _json.loads(s)
-                return _extract_text_from_data(parsed)
-            except Exception:
-                # not JSON, return the raw string
-                return s
-        return s
-
-    # If it's a dict, check common locations
-    if isinstance(data, dict):
-        # 1) candidates -> [0] -> content -> parts -> [0] -> text
-        if "candidates" in data and isinstance(data["candidates"], list) and data["candidates"]:
-            cand = data["candidates"][0]
-            if isinstance(cand, dict):
-                content = cand.get("content")
-                if isinstance(content, dict):
-                    parts = content.get("parts")
-                    if isinstance(parts, list) and parts:
-                        first = parts[0]
-                        if isinstance(first, dict) and "text" in first and isinstance(first["text"], str):
-                            return first["text"].strip()
-                # candidate may include 'text' directly
-                if "text" in cand and isinstance(cand["text"], str):
-                    return cand["text"].strip()
-
-        # 2) output -> [0] -> content -> [0] -> text
-        if "output" in data and isinstance(data["output"], list) and data["output"]:
-            o0 = data["output"][0]
-            if isinstance(o0, dict) and "content" in o0:
-                cont = o0.get("content")
-                if isinstance(cont, list) and cont:
-                    first = cont[0]
-                    if isinstance(first, dict) and "text" in first and isinstance(first["text"], str):
-                        return first["text"].strip()
-
-        # 3) choices -> [0] -> message -> content
-        if "choices" in data and isinstance(data["choices"], list) and data["choices"]:
-            choice = data["choices"][0]
-            if isinstance(choice, dict):
-                msg = choice.get("message") or {}
-                if isinstance(msg, dict) and "content" in msg and isinstance(msg["content"], str):
-                    return msg["content"].strip()
-                if "text" in choice and isinstance(choice["text"], str):
-                    return choice["text"].strip()
-
-        # 4) direct keys 'text', 'content', 'response'
-        for k in ("text", "content", "response"):
-            if k in data and isinstance(data[k], str):
-                return data[k].strip()
-
-        # 5) fallback: recursively find the longest string value in the dict
-        longest = None
-
-        def _walk(obj):
-            nonlocal longest
-            if isinstance(obj, str):
-                s = obj.strip()
-                if not longest or len(s) > len(longest):
-                    longest = s
-            elif isinstance(obj, dict):
-                for v in obj.values():
-                    _walk(v)
-            elif isinstance(obj, list):
-                for v in obj:
-                    _walk(v)
-
-        try:
-            _walk(data)
-        except Exception:
-            pass
-
-        if longest:
-            return longest
-
-    # If nothing found, return None
-    return None
+# Optional: connection pool size for the shared HTTP session and whether to
+# open the connection in the background at startup
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "4"))
+GEMINI_WARMUP = os.getenv("GEMINI_WARMUP", "true").lower() in ("1", "true", "yes")
+# Optional: response cache (in-memory LRU + SQLite file); TTL in seconds
+GEMINI_CACHE = os.getenv("GEMINI_CACHE", "true").lower() in ("1", "true", "yes")
+GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", os.path.join(".cache", "gemini_responses.sqlite3"))
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", str(response_cache.DEFAULT_TTL)))
+# Optional: also reuse answers to rephrased questions (similarity 0-1 of their
+# content words), for at most GEMINI_SIMILAR_TTL seconds; keeps GEMINI_SIMILAR_MAX prompts
+GEMINI_SIMILAR_CACHE = os.getenv("GEMINI_SIMILAR_CACHE", "true").lower() in ("1", "true", "yes")
+GEMINI_SIMILAR_THRESHOLD = float(os.getenv("GEMINI_SIMILAR_THRESHOLD", "0.8"))
+GEMINI_SIMILAR_TTL = int(os.getenv("GEMINI_SIMILAR_TTL", str(GEMINI_CACHE_TTL)))
+GEMINI_SIMILAR_MAX = int(os.getenv("GEMINI_SIMILAR_MAX", "1000"))
+# Optional: conversation memory for follow-up questions. "followups" sends the
+# recent turns with questions that refer back to them, "always" with every
+# question, "off" never; the history is kept within GEMINI_MEMORY_TOKENS
+# (estimated) and forgotten after GEMINI_MEMORY_IDLE seconds without a question
+GEMINI_MEMORY = os.getenv("GEMINI_MEMORY", "followups").lower()
+GEMINI_MEMORY_TOKENS = int(os.getenv("GEMINI_MEMORY_TOKENS", "400"))
+GEMINI_MEMORY_TURNS = int(os.getenv("GEMINI_MEMORY_TURNS", "10"))
+GEMINI_MEMORY_IDLE = float(os.getenv("GEMINI_MEMORY_IDLE", "300"))
+# Overall time budget (seconds) for one request, shared by all retries and fallbacks
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "30"))
+# Circuit breaker: fail fast after this many failed requests in a row, and
+# probe the backend again after this many seconds
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "3"))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+# Requests per minute the API key allows (0 = no limit); after a 429 every
+# request waits for the Retry-After
+GEMINI_RATE_LIMIT = float(os.getenv("GEMINI_RATE_LIMIT", "0"))
+# Optional: record tokens, latency, retries and the answering stage of every
+# call (see utils/call_metrics.py); rows older than GEMINI_METRICS_DAYS are pruned
+GEMINI_METRICS = os.getenv("GEMINI_METRICS", "true").lower() in ("1", "true", "yes")
+GEMINI_METRICS_PATH = os.getenv("GEMINI_METRICS_PATH", call_metrics.DEFAULT_PATH)
+GEMINI_METRICS_DAYS = int(os.getenv("GEMINI_METRICS_DAYS", "30"))
+# Optional: send short questions to a fast model and long prompts/answers (and
+# file writing) to a large one, each with its own time budget (seconds) and
+# output token limit (0 = none). The model replaces the one in the endpoint URL.
+GEMINI_ROUTING = os.getenv("GEMINI_ROUTING", "false").lower() in ("1", "true", "yes")
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "").strip()
+GEMINI_FAST_TIMEOUT = float(os.getenv("GEMINI_FAST_TIMEOUT", "10"))
+GEMINI_FAST_MAX_TOKENS = int(os.getenv("GEMINI_FAST_MAX_TOKENS", "512"))
+GEMINI_LARGE_MODEL = os.getenv("GEMINI_LARGE_MODEL", "").strip()
+GEMINI_LARGE_TIMEOUT = float(os.getenv("GEMINI_LARGE_TIMEOUT", "45"))
+GEMINI_LARGE_MAX_TOKENS = int(os.getenv("GEMINI_LARGE_MAX_TOKENS", "2048"))
+# Prompts (estimated tokens) and expected answers longer than these take the large model
+GEMINI_ROUTE_PROMPT_TOKENS = int(os.getenv("GEMINI_ROUTE_PROMPT_TOKENS", "200"))
+GEMINI_ROUTE_OUTPUT_TOKENS = int(os.getenv("GEMINI_ROUTE_OUTPUT_TOKENS", "300"))
+
+
+# Metadata (finish reason, model version, token usage) of the last API response
+last_extraction = None
 
 
 def strip_json_noise(text):
@@ -121,59 +90,7 @@ def strip_json_noise(text):
     Extracts only readable text content from mixed JSON+text responses.
     Removes system prompts and formatting noise.
     """
-    import re
-    if not isinstance(text, str):
-        return str(text)
-    
-    text = text.strip()
-    
-    # CRITICAL: Remove system prompt echoes - but be careful not to remove actual content!
-    # The system prompt must NEVER reach the user, but we must preserve the answer
-    
-    # SAFE PATTERN: Only match system prompt at START of response, ending at first newline or period+newline
-    # This prevents matching partial sentences from real answers
-    system_prompt_start_patterns = [
-        # "You are a voice assistant..." - just first sentence
-        r"^you are a voice assistant[^.\n]*\.",
-        # "Answer the user's question..." - just first sentence  
-        r"^answer the user['\']?s question[^.\n]*\.",
-        # "Respond only with..." - just first sentence
-        r"^respond only with[^.\n]*\.",
-        # "I will provide..." - just first sentence
-        r"^i will provide[^.\n]*\.",
-        # "Okay I understand..." - just that phrase, not everything after
-        r"^okay[,.]?\s*(?:i\s+)?understand\.\s*",
-    ]
-    
-    for pattern in system_prompt_start_patterns:
-        text = re.sub(pattern, '', text, flags=re.MULTILINE | re.IGNORECASE)
-    
-    # Now remove JSON metadata keys: "key": value patterns
-    # This catches "candidates": [...], "role": "model", etc.
-    # But be careful not to remove colons from actual content
-    text = re.sub(r'"[^"]*":\s*(?:\{[^}]*\}|\[[^\]]*\]|"[^"]*"|[^,}\]]*)', '', text)
-    
-    # Remove stray quotes around values
-    text = re.sub(r'^"([^"]+)"$', r'\1', text, flags=re.MULTILINE)
-    
-    # Remove leading/trailing JSON punctuation only
-    text = re.sub(r'^[\{\[\,\s]+', '', text)
-    text = re.sub(r'[\}\]\,\s]+$', '', text)
-    
-    # Clean up repeated whitespace but preserve some structure
-    text = re.sub(r'[ \t]+', ' ', text)  # Collapse spaces/tabs but keep newlines
-    
-    # Clean up multiple newlines
-    text = re.sub(r'\n\s*\n+', '\n', text)
-    
-    # Final trim
-    text = text.strip()
-    
-    # If result is empty or just punctuation, return nothing
-    if not text or all(not c.isalnum() for c in text):
-        return ""
-    
-    return text
+    return response_extract.clean_text(text)
 
 
 def normalize_response(raw):
@@ -181,66 +98,424 @@ def normalize_response(raw):
     cleaned human-readable string. Safe to call on any API output. Returns
     an empty string when nothing useful is found.
     """
-    import json as _json
+    return response_extract.extract_response(raw).text
+
+
+def _is_html_page(resp) -> bool:
+    """True if resp is an HTML page (a proxy or gateway error page, not an answer)"""
+    return "html" in resp.headers.get("Content-Type", "").lower()
+
+
+def _answer_from(resp, data, call=None):
+    """Answer text for an HTTP response (data = its parsed JSON or None)
 
-    if raw is None:
+    "" when the response carries no answer (e.g. a blocked prompt or an HTML
+    error page), so the raw body is never spoken or cached. The token usage
+    goes to call (a call_metrics.CallRecord), if given.
+    """
+    global last_extraction
+    if data is None and _is_html_page(resp):
+        print(f"WARNING: Gemini returned an HTML page instead of an answer (status {resp.status_code})")
         return ""
+    extraction = last_extraction = response_extract.extract_response(data if data is not None else resp.text)
+    if call is not None:
+        call.usage(extraction.usage)
+    if not extraction.text and extraction.finish_reason:
+        print(f"WARNING: Gemini returned no text (finish reason {extraction.finish_reason})")
+    return extraction.text
 
-    # If it's bytes, decode
-    if isinstance(raw, (bytes, bytearray)):
-        try:
-            raw = raw.decode("utf-8", errors="ignore")
-        except Exception:
-            raw = str(raw)
-
-    # If it's already a dict/list, extract directly
-    if isinstance(raw, (dict, list)):
-        out = _extract_text_from_data(raw)
-        return out or ""
-
-    # If it's a string, try to parse JSON first
-    if isinstance(raw, str):
-        s = raw.strip()
-        # If it looks like JSON, attempt to parse
-        if s.startswith("{") or s.startswith("["):
-            try:
-                parsed = _json.loads(s)
-                out = _extract_text_from_data(parsed)
-                if out:
-                    return out
-            except Exception:
-                # Not JSON or parse failed, continue with aggressive strip
-                return strip_json_noise(s)
-
-        # Heuristic: remove lines that look like JSON structure or metadata
-        lines = [l for l in s.splitlines() if l.strip()]
-        cleaned_lines = []
-        for line in lines:
-            # skip lines that start with JSON structural tokens or keys
-            if line.strip().startswith("{") or line.strip().startswith("}"):
-                continue
-            if any(k in line for k in ["\"candidates\"", "usageMetadata", "modelVersion", "responseId", "avgLogprobs"]):
-                continue
-            # skip lines that look like JSON arrays/objects
-            if line.strip().startswith("[") or line.strip().endswith("]"):
-                continue
-            cleaned_lines.append(line)
-
-        # join remaining lines; if it's still empty, return original raw trimmed
-        joined = "\n".join(cleaned_lines).strip()
-        if joined:
-            # Final pass through aggressive cleaner
-            final = strip_json_noise(joined)
-            return final if final else joined
-
-        # Fallback: aggressive strip on original
-        return strip_json_noise(s)
-
-    # Last resort
+
+_session = None
+_session_lock = threading.Lock()
+# Seconds the last warm-up took (None until one has finished)
+last_warmup_seconds = None
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session so Gemini calls reuse one keep-alive connection.
+
+    Only connection failures are retried by the adapter (the request never
+    reached the server, so a POST is safe to resend); rate limits and
+    timeouts are still handled by the callers.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def warm_up(timeout: float = 5.0) -> bool:
+    """Open (TCP + TLS) a pooled connection to the Gemini endpoint's host.
+
+    Sends a HEAD request to the host root without the API key; the status
+    does not matter, only that the connection ends up in the pool.
+    """
+    global last_warmup_seconds
+    if not (GEMINI_WARMUP and GEMINI_API_ENDPOINT and GEMINI_API_KEY):
+        return False
+    parts = urlsplit(GEMINI_API_ENDPOINT)
+    started = time.perf_counter()
     try:
-        return strip_json_noise(str(raw))
-    except Exception:
-        return ""
+        get_session().head(f"{parts.scheme}://{parts.netloc}/", timeout=timeout, allow_redirects=False)
+    except requests.RequestException:
+        return False
+    last_warmup_seconds = time.perf_counter() - started
+    return True
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+# Calls, failures and seconds per stage ("google", "http", "stream" attempts and "backoff" waits)
+stage_metrics = resilience.StageMetrics()
+# Request slots shared by every caller (batch workers, streams, async requests)
+rate_limiter = resilience.RateLimiter(GEMINI_RATE_LIMIT)
+
+
+def _probe_backend() -> bool:
+    """Background health check for the circuit breaker: does the host answer at all?"""
+    parts = urlsplit(GEMINI_API_ENDPOINT)
+    try:
+        resp = get_session().head(f"{parts.scheme}://{parts.netloc}/", timeout=5, allow_redirects=False)
+    except requests.RequestException:
+        return False
+    return resp.status_code < 500
+
+
+def get_breaker() -> resilience.CircuitBreaker:
+    """Circuit breaker shared by every call to the Gemini endpoint"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = resilience.CircuitBreaker("Gemini", GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET,
+                                                 probe=_probe_backend if GEMINI_API_ENDPOINT else None)
+        return _breaker
+
+
+def is_transient(status_code: Optional[int]) -> bool:
+    """True for statuses worth retrying (and counting against the breaker); None = no response"""
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def _record_attempt(stage: str, started: float, status_code: Optional[int], call=None) -> bool:
+    """Add one finished attempt to stage_metrics (and call); returns True if it failed transiently"""
+    ok = status_code is not None and status_code < 400
+    stage_metrics.record(stage, time.perf_counter() - started, ok=ok)
+    tracing.add_span("gemini." + stage, started, status=status_code)
+    if call is not None:
+        call.attempt(stage, ok)
+    return is_transient(status_code)
+
+
+def note_rate_limit(status_code: Optional[int], retry_after: Optional[str]) -> None:
+    """After a 429, hold every caller back for Retry-After (or a short backoff)"""
+    if status_code == 429:
+        rate_limiter.pause(resilience.backoff_delay(0, retry_after))
+
+
+def get_call_store():
+    """Background writer of the per-call metrics, or None when GEMINI_METRICS is off"""
+    if not GEMINI_METRICS:
+        return None
+    return call_metrics.get_store(GEMINI_METRICS_PATH, GEMINI_METRICS_DAYS)
+
+
+def finish_call(call, text: str) -> str:
+    """Complete call (a call_metrics.CallRecord) with the answer it produced and store it; returns text"""
+    call.finish(is_answer(text))
+    router = get_router()
+    if router is not None and call.route is not None and call.attempts:
+        router.record(call.route, call.total, call.ok)
+    metrics_endpoint.LLM_SECONDS.observe(call.total, source=call.source, stage=call.stage if call.ok else "failed")
+    if call.ok:
+        metrics_endpoint.LLM_TTFT_SECONDS.observe(call.ttft, source=call.source)
+    if call.prompt_tokens:
+        metrics_endpoint.LLM_TOKENS.inc(call.prompt_tokens, kind="prompt")
+    if call.output_tokens:
+        metrics_endpoint.LLM_TOKENS.inc(call.output_tokens, kind="output")
+    tracing.add_span("gemini:" + call.source, call.started, stage=call.stage, route=call.route, ok=call.ok,
+                     retries=call.retries, ttft_ms=None if call.ttft is None else round(call.ttft * 1000))
+    store = get_call_store()
+    if store is not None:
+        store.record(call)
+    return text
+
+
+def metrics() -> dict:
+    """Circuit breaker state, rate limiting, time spent per request stage and latency per model route"""
+    router = get_router()
+    return {"breaker": get_breaker().stats(), "rate_limit": rate_limiter.stats(),
+            "stages": stage_metrics.snapshot(), "routes": router.stats() if router is not None else {}}
+
+
+# The only route while GEMINI_ROUTING is off: the endpoint's model and GEMINI_DEADLINE
+DEFAULT_ROUTE = model_router.Route("default", None, GEMINI_DEADLINE, 0)
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Shared fast/large model router, or None when GEMINI_ROUTING is off"""
+    global _router
+    if not GEMINI_ROUTING:
+        return None
+    with _router_lock:
+        if _router is None:
+            _router = model_router.ModelRouter(
+                model_router.Route("fast", GEMINI_FAST_MODEL or None, GEMINI_FAST_TIMEOUT, GEMINI_FAST_MAX_TOKENS),
+                model_router.Route("large", GEMINI_LARGE_MODEL or None, GEMINI_LARGE_TIMEOUT, GEMINI_LARGE_MAX_TOKENS),
+                GEMINI_ROUTE_PROMPT_TOKENS, GEMINI_ROUTE_OUTPUT_TOKENS)
+        return _router
+
+
+def choose_route(prompt: str, source: str = None, call=None):
+    """Route (model, time budget, token limit) for prompt from source; noted on call"""
+    router = get_router()
+    route = router.choose(prompt, source) if router is not None else DEFAULT_ROUTE
+    if call is not None:
+        call.route = route.name
+    return route
+
+
+def route_endpoint(route=None) -> str:
+    """GEMINI_API_ENDPOINT with route's model in it"""
+    return model_router.endpoint_for(GEMINI_API_ENDPOINT, route)
+
+
+def _with_limits(payload: dict, route) -> dict:
+    """payload with route's output token limit (generateContent bodies only)"""
+    if route is not None and route.max_tokens and "contents" in payload:
+        payload["generationConfig"] = {"maxOutputTokens": route.max_tokens}
+    return payload
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Shared response cache, or None when GEMINI_CACHE is off"""
+    global _cache
+    if not GEMINI_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = response_cache.ResponseCache(GEMINI_CACHE_PATH)
+        return _cache
+
+
+_similar = None
+
+
+def get_similar_cache():
+    """Near-duplicate index of cached answers, or None when it (or the cache) is off
+
+    Built on first use from the unexpired answers in the SQLite cache that
+    were stored with the current settings.
+    """
+    global _similar
+    cache = get_cache()
+    if cache is None or not GEMINI_SIMILAR_CACHE:
+        return None
+    with _cache_lock:
+        if _similar is None:
+            similar = similar_cache.SimilarityCache(GEMINI_SIMILAR_THRESHOLD, GEMINI_SIMILAR_MAX)
+            now = time.time()
+            for key, prompt, response, expires in reversed(cache.entries(GEMINI_SIMILAR_MAX, now)):
+                if prompt and key == cache_key(prompt):
+                    similar.put(prompt, response, ttl=min(expires - now, GEMINI_SIMILAR_TTL), now=now)
+            _similar = similar
+        return _similar
+
+
+def cache_key(prompt: str) -> str:
+    """Key for prompt: the normalized user prompt plus the settings that shape the answer.
+
+    The date/time context added by build_prompt() is deliberately not part of it.
+    """
+    return response_cache.make_key(prompt, GEMINI_PROMPT_WRAPPER, GEMINI_RESPONSE_MODE, GEMINI_API_ENDPOINT)
+
+
+def cached_response(prompt: str, call=None):
+    """(cached answer or None, key to store a fresh answer under or None)
+
+    Time-sensitive prompts are neither looked up nor stored. A hit is noted
+    on call (stage "cache" or "similar"), if given.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None, None
+    if response_cache.is_time_sensitive(prompt):
+        cache.record_bypass()
+        metrics_endpoint.CACHE_LOOKUPS.inc(result="bypass")
+        return None, None
+    key = cache_key(prompt)
+    cached = cache.get(key)
+    stage = "cache"
+    # A follow-up with history only matches exactly: its history is most of the text
+    if cached is None and not prompt.startswith(conversation.HEADER):
+        similar = get_similar_cache()
+        match = similar.get(prompt) if similar is not None else None
+        if match is not None:
+            cached, stage = match[0], "similar"
+    metrics_endpoint.CACHE_LOOKUPS.inc(result=stage if cached is not None else "miss")
+    if cached is not None and call is not None:
+        call.answered_from(stage)
+    return cached, key
+
+
+def remember_response(key, prompt: str, response: str):
+    """Store a successful answer under key (from cached_response)"""
+    cache = get_cache()
+    if key is None or cache is None or not response or not response.strip():
+        return
+    cache.put(key, response, ttl=response_cache.ttl_for(prompt, GEMINI_CACHE_TTL), prompt=prompt)
+    similar = get_similar_cache()
+    if similar is not None and not prompt.startswith(conversation.HEADER):
+        similar.put(prompt, response, ttl=response_cache.ttl_for(prompt, GEMINI_SIMILAR_TTL))
+
+
+def cache_stats() -> dict:
+    """Hit/miss statistics of the response cache ({} when disabled)
+
+    Lookups the exact cache missed but a rephrased question answered are
+    counted under "similar".
+    """
+    cache = get_cache()
+    if cache is None:
+        return {}
+    stats = cache.stats()
+    similar = get_similar_cache()
+    if similar is not None:
+        stats["similar"] = similar.stats()
+    return stats
+
+
+_conversation = None
+_conversation_lock = threading.Lock()
+
+
+def get_conversation():
+    """Shared conversation memory, or None when GEMINI_MEMORY is off"""
+    global _conversation
+    if GEMINI_MEMORY not in ("followups", "always"):
+        return None
+    with _conversation_lock:
+        if _conversation is None:
+            _conversation = conversation.ConversationMemory(GEMINI_MEMORY_TOKENS, GEMINI_MEMORY_TURNS,
+                                                            GEMINI_MEMORY_IDLE)
+        return _conversation
+
+
+def conversation_prompt(question: str):
+    """(prompt to send, conversation.ContextInfo) for a spoken or typed question.
+
+    The prompt is the question, preceded by the recent turns when it needs
+    them (see GEMINI_MEMORY). Build it once per question and pass it to
+    generate_response()/stream_generate() in place of the question.
+    """
+    memory = get_conversation()
+    if memory is None or (GEMINI_MEMORY != "always" and not conversation.is_follow_up(question)):
+        return question, conversation.NO_CONTEXT
+    context = memory.context()
+    if not context.text:
+        return question, context
+    return f"{context.text}\n\nUser: {question}", context
+
+
+def remember_turn(question: str, answer: str):
+    """Add an answered question to the conversation memory (failures are skipped)"""
+    memory = get_conversation()
+    if memory is None or not is_answer(answer):
+        return
+    memory.add(question, answer)
+
+
+def log_prompt_size(question: str, prompt: str, context) -> None:
+    """Queue the prompt size and what fitting the history did for logs/gemini_context.jsonl"""
+    log_writer.write("gemini_context.jsonl", {
+        "ts": time.time(), "question": question,
+        "prompt_tokens": conversation.estimate_tokens(build_prompt(prompt)),
+        "history_tokens": context.tokens, "turns": context.turns,
+        "summarized": context.summarized, "dropped": context.dropped})
+
+
+# Spoken when no backend produced an answer
+UNAVAILABLE_MESSAGE = "I'm having trouble connecting to my AI backend right now. Please try again in a moment."
+# Last chunk of a stream when neither streaming nor the blocking fallback answered
+STREAM_UNAVAILABLE_MESSAGE = "I'm having trouble reaching the AI service right now. Please try again in a moment."
+
+
+def is_unavailable(text: str) -> bool:
+    """True if text is one of the messages spoken when no backend answered"""
+    return bool(text) and text.strip() in (UNAVAILABLE_MESSAGE, STREAM_UNAVAILABLE_MESSAGE)
+
+
+def is_answer(text: str) -> bool:
+    """True if text is an actual answer (not empty and not an unavailable message)"""
+    return bool(text and text.strip()) and not is_unavailable(text)
+
+
+def build_request(enhanced_prompt: str, google: bool, route=None):
+    """(headers, payload) for a generate request (blocking and async callers).
+
+    google selects the generateContent body (with route's token limit) and
+    x-goog-api-key header; otherwise {"prompt": ...} with GEMINI_API_KEY_HEADER
+    or a Bearer token.
+    """
+    prompt_to_send = enhanced_prompt
+    if GEMINI_RESPONSE_MODE == "plain_text":
+        if GEMINI_PROMPT_WRAPPER:
+            prompt_to_send = GEMINI_PROMPT_WRAPPER + "\n\n" + enhanced_prompt
+        else:
+            prompt_to_send = "Respond only with the final answer in plain text. Do not include JSON, metadata, or code fences.\n\n" + enhanced_prompt
+    if google:
+        headers = {"Content-Type": "application/json", "x-goog-api-key": GEMINI_API_KEY}
+        return headers, _with_limits({"contents": [{"parts": [{"text": prompt_to_send}]}]}, route)
+    if GEMINI_API_KEY_HEADER:
+        headers = {GEMINI_API_KEY_HEADER: GEMINI_API_KEY, "Content-Type": "application/json"}
+    else:
+        headers = {"Authorization": f"Bearer {GEMINI_API_KEY}", "Content-Type": "application/json"}
+    return headers, {"prompt": prompt_to_send}
+
+
+def log_response(endpoint: str, prompt: str, response_text: str) -> None:
+    """Queue a request/response pair for logs/gemini_responses.jsonl (UTC ISO-8601 timestamp)"""
+    import datetime as _dt
+    entry = {"ts": _dt.datetime.utcnow().isoformat() + "Z", "endpoint": endpoint, "prompt": prompt,
+             "response_text": response_text}
+    log_writer.write("gemini_responses.jsonl", entry)
+
+
+def prefers_google() -> bool:
+    """True when the endpoint (or key header) is Google's generateContent API."""
+    if GEMINI_API_ENDPOINT and "generativelanguage.googleapis.com" in GEMINI_API_ENDPOINT:
+        return True
+    return bool(GEMINI_API_KEY_HEADER and "goog" in GEMINI_API_KEY_HEADER.lower())
+
+
+def build_prompt(prompt: str, now=None) -> str:
+    """Prompt as sent to the API: current date/time, the wrapper, then the user prompt.
+
+    The date/time is injected here at send time, so it never leaks into the
+    cache key (see cache_key()).
+    """
+    from datetime import datetime as dt
+    now = now or dt.now()
+    current_date = now.strftime("%B %d, %Y")  # e.g., "November 05, 2025"
+    current_time = now.strftime("%H:%M:%S")   # e.g., "14:30:45"
+    if GEMINI_PROMPT_WRAPPER:
+        wrapper = GEMINI_PROMPT_WRAPPER
+        # Add current date/time to wrapper if not already there
+        if "current date" not in wrapper.lower():
+            wrapper = f"Today's date is {current_date} and the current time is {current_time}. " + wrapper
+        return wrapper + "\n\n" + prompt
+    return f"Today's date is {current_date} and the current time is {current_time}. " + prompt
 
 
 def ensure_key():
@@ -262,307 +537,379 @@ def stream_response_stub(prompt: str) -> Generator[str, None, None]:
         yield sample[i : i + 80]
 
 
-def call_http_endpoint(prompt: str, timeout: float = 15.0) -> Optional[str]:
+def call_http_endpoint(prompt: str, timeout: float = 15.0, deadline: Optional[resilience.Deadline] = None,
+                       call=None, route=None) -> Optional[str]:
     """Call a configured HTTP endpoint (if set) and try to extract a text reply.
 
     The function is intentionally permissive about response shape to support
     different provider formats. It sends a JSON body {"prompt": prompt} and
     supplies the API key as a Bearer token. Set `GEMINI_API_ENDPOINT` in your
     environment to enable this behaviour.
+
+    The timeout is shortened to what is left of deadline (if given). The
+    attempt and token usage are added to call (a call_metrics.CallRecord);
+    route picks the model (see choose_route()).
     """
     if not GEMINI_API_ENDPOINT:
         return None
     if not GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY must be set to call GEMINI_API_ENDPOINT")
 
-    # Support custom API key header (e.g., X-goog-api-key) or default to
-    # Authorization: Bearer <key> when GEMINI_API_KEY_HEADER is not provided.
-    if GEMINI_API_KEY_HEADER:
-        headers = {GEMINI_API_KEY_HEADER: GEMINI_API_KEY, "Content-Type": "application/json"}
-    else:
-        headers = {"Authorization": f"Bearer {GEMINI_API_KEY}", "Content-Type": "application/json"}
-    # Optionally wrap the prompt to request plain-text responses
-    prompt_to_send = prompt
-    if GEMINI_RESPONSE_MODE == "plain_text":
-        if GEMINI_PROMPT_WRAPPER:
-            prompt_to_send = GEMINI_PROMPT_WRAPPER + "\n\n" + prompt
-        else:
-            prompt_to_send = "Respond only with the final answer in plain text. Do not include JSON, metadata, or code fences.\n\n" + prompt
-
-    payload = {"prompt": prompt_to_send}
+    # Custom API key header (e.g., X-goog-api-key) or Authorization: Bearer <key>
+    headers, payload = build_request(prompt, False, route)
+    if deadline is not None:
+        if deadline.expired:
+            return None
+    if not rate_limiter.acquire(deadline):
+        return None
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
+    started = time.perf_counter()
     try:
-        resp = requests.post(GEMINI_API_ENDPOINT, json=payload, headers=headers, timeout=timeout)
+        resp = get_session().post(route_endpoint(route), json=payload, headers=headers, timeout=timeout)
         resp.raise_for_status()
-        # Attempt to parse JSON; if it fails we'll log raw text
-        try:
-            data = resp.json()
-        except Exception:
-            data = None
-        # Log request/response for debugging (safe: do not log API keys)
-        try:
-            import json as _json, os as _os, datetime as _dt
-            _logdir = _os.path.join(_os.getcwd(), "logs")
-            _os.makedirs(_logdir, exist_ok=True)
-            _entry = {"ts": _dt.datetime.utcnow().isoformat()+"Z", "endpoint": GEMINI_API_ENDPOINT, "prompt": prompt, "response_text": resp.text}
-            with open(_os.path.join(_logdir, "gemini_responses.jsonl"), "a", encoding="utf-8") as _f:
-                _f.write(_json.dumps(_entry, ensure_ascii=False)+"\n")
-        except Exception:
-            pass
-        # Try to extract a human-friendly text from the parsed JSON or raw
-        # response body. This handles cases where the model returns structured
-        # objects or plain text.
-        extracted = _extract_text_from_data(data) if data is not None else None
-        if extracted:
-            return extracted
-        # Fallback to raw text if no extraction succeeded
-        return resp.text
-    except Exception:
+    except requests.RequestException as e:
+        status = e.response.status_code if getattr(e, "response", None) is not None else None
+        if status is not None:
+            note_rate_limit(status, e.response.headers.get("Retry-After"))
+        if _record_attempt("http", started, status, call):
+            get_breaker().record_failure()
+        else:
+            get_breaker().record_success()
         # Bubble up the error to the caller for logging/handling
         raise
+    _record_attempt("http", started, resp.status_code, call)
+    get_breaker().record_success()
+    # Attempt to parse JSON; if it fails we'll log raw text
+    try:
+        data = resp.json()
+    except Exception:
+        data = None
+    # Log request/response for debugging (safe: do not log API keys).
+    # Queued for the background log writer, so this does not block.
+    try:
+        log_response(route_endpoint(route), prompt, resp.text)
+    except Exception:
+        pass
+    # Parse the answer (and its metadata) out of the JSON or raw body once
+    return _answer_from(resp, data, call)
 
 
-def call_google_generate(prompt: str, timeout: float = 15.0, retry_count: int = 3) -> Optional[str]:
+def call_google_generate(prompt: str, timeout: float = 15.0, retry_count: int = 3,
+                         deadline: Optional[resilience.Deadline] = None, call=None,
+                         route=None) -> Optional[str]:
     """Call Google Generative Language `generateContent` endpoint.
 
     Builds the request body matching the curl example and attempts to extract
     a useful text reply from the JSON response. This function does not embed
     any key; it uses GEMINI_API_KEY and GEMINI_API_KEY_HEADER from environment.
     
-    Retries on 429 (rate limit) errors with exponential backoff.
+    Retries timeouts, connection errors, 429 (rate limit) and 5xx errors with
+    jittered exponential backoff, or as long as the server's Retry-After asks.
+    All attempts and waits stay within deadline (default: GEMINI_DEADLINE).
+    Attempts and token usage are added to call (a call_metrics.CallRecord);
+    route picks the model and the output token limit (see choose_route()).
     """
     if not GEMINI_API_ENDPOINT:
         return None
     if not GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY must be set to call Google endpoint")
 
-    headers = {"Content-Type": "application/json"}
-    # Google API requires x-goog-api-key header for API key authentication
-    headers["x-goog-api-key"] = GEMINI_API_KEY
-
-    # Google generateContent expects `contents: [{parts: [{text: ...}]}]`
-    prompt_to_send = prompt
-    if GEMINI_RESPONSE_MODE == "plain_text":
-        if GEMINI_PROMPT_WRAPPER:
-            prompt_to_send = GEMINI_PROMPT_WRAPPER + "\n\n" + prompt
-        else:
-            prompt_to_send = "Respond only with the final answer in plain text. Do not include JSON, metadata, or code fences.\n\n" + prompt
-
-    payload = {"contents": [{"parts": [{"text": prompt_to_send}]}]}
+    # x-goog-api-key header and the `contents: [{parts: [{text: ...}]}]` body
+    headers, payload = build_request(prompt, True, route)
+    endpoint = route_endpoint(route)
     
-    import time
+    if deadline is None:
+        deadline = resilience.Deadline(GEMINI_DEADLINE)
+    failed = False
     for attempt in range(retry_count):
+        if deadline.expired or not rate_limiter.acquire(deadline):
+            break
+        started = time.perf_counter()
+        retry_after = None
         try:
-            resp = requests.post(GEMINI_API_ENDPOINT, json=payload, headers=headers, timeout=timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            extracted = _extract_text_from_data(data)
-            if extracted:
-                return extracted
-            return resp.text
-        except requests.exceptions.Timeout:
-            print(f"WARNING: API timeout calling {GEMINI_API_ENDPOINT} (attempt {attempt+1}/{retry_count})")
-            if attempt < retry_count - 1:
-                wait_time = 2 ** attempt  # Exponential backoff: 1, 2, 4 seconds
-                print(f"  Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            return None
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:
-                # Rate limit - retry with backoff
-                print(f"WARNING: API rate limited (429) - (attempt {attempt+1}/{retry_count})")
-                if attempt < retry_count - 1:
-                    wait_time = 2 ** (attempt + 1)  # More aggressive backoff for rate limits: 2, 4, 8 seconds
-                    print(f"  Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    # Last attempt failed, return None
-                    return None
+            resp = get_session().post(endpoint, json=payload, headers=headers,
+                                      timeout=deadline.timeout(timeout))
+            if is_transient(resp.status_code):
+                failed = True
+                retry_after = resp.headers.get("Retry-After")
+                note_rate_limit(resp.status_code, retry_after)
+                _record_attempt("google", started, resp.status_code, call)
+                print(f"WARNING: API {'rate limited' if resp.status_code == 429 else 'unavailable'} "
+                      f"({resp.status_code}) - (attempt {attempt+1}/{retry_count})")
             else:
-                print(f"WARNING: API HTTP error {resp.status_code}: {e}")
-                return None
+                _record_attempt("google", started, resp.status_code, call)
+                get_breaker().record_success()
+                resp.raise_for_status()
+                try:
+                    data = resp.json()
+                except ValueError:
+                    data = None
+                return _answer_from(resp, data, call)
+        except requests.exceptions.HTTPError as e:
+            print(f"WARNING: API HTTP error {e.response.status_code}: {e}")
+            return None
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            failed = True
+            _record_attempt("google", started, None, call)
+            kind = "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection error"
+            print(f"WARNING: API {kind} calling {endpoint} (attempt {attempt+1}/{retry_count})")
         except Exception as e:
             print(f"WARNING: API error: {e}")
             return None
-    
+
+        if attempt < retry_count - 1:
+            wait_time = resilience.backoff_delay(attempt, retry_after)
+            if wait_time >= deadline.remaining():
+                print("  Not retrying: the request deadline would pass first")
+                break
+            print(f"  Retrying in {wait_time:.1f}s...")
+            time.sleep(wait_time)
+            stage_metrics.record("backoff", wait_time)
+
+    # Every attempt failed transiently (or the deadline ran out after a failure)
+    if failed:
+        get_breaker().record_failure()
     return None
 
 
 __all__ = ["GEMINI_API_KEY", "GEMINI_API_ENDPOINT", "ensure_key", "stream_response_stub", "call_http_endpoint"]
 
 
-def generate_response(prompt: str) -> str:
+def generate_response(prompt: str, source: str = "gemini") -> str:
     """Convenience blocking helper that returns a full response string.
 
     Behavior:
     - If GEMINI_API_ENDPOINT is set, call the HTTP endpoint using the API key
       and return the best-effort text extraction from the response.
     - If API fails, return a user-friendly error message instead of stub.
+    - Answers are cached (see get_cache()); a cached answer is returned
+      without calling the API.
+    - The call is recorded under source (see GEMINI_METRICS), which also
+      takes part in choosing the model (see GEMINI_ROUTING).
+    """
+    call = call_metrics.CallRecord(source)
+    cached, key = cached_response(prompt, call)
+    if cached is not None:
+        return finish_call(call, cached)
+    route = choose_route(prompt, source, call)
+    return finish_call(call, _generate_uncached(prompt, key, call=call, route=route))
+
+
+def _generate_uncached(prompt: str, key, deadline: Optional[resilience.Deadline] = None, call=None,
+                       route=None) -> str:
+    """generate_response() without the cache lookup; stores a successful answer under key.
+
+    The whole fallback chain shares one deadline (the route's time budget,
+    GEMINI_DEADLINE by default), and nothing is sent while the circuit
+    breaker is open. Attempts are added to call, if given.
     """
+    if deadline is None:
+        deadline = resilience.Deadline(route.timeout if route is not None else GEMINI_DEADLINE)
+    if GEMINI_API_ENDPOINT and not get_breaker().allow():
+        print("WARNING: Gemini backend is failing, not calling it for now")
+        return UNAVAILABLE_MESSAGE
+
     # Inject current date into prompt for accurate time-based answers
-    import datetime
-    from datetime import datetime as dt
-    now = dt.now()
-    current_date = now.strftime("%B %d, %Y")  # e.g., "November 05, 2025"
-    current_time = now.strftime("%H:%M:%S")   # e.g., "14:30:45"
-    
-    # Enhanced prompt with date/time context
-    enhanced_prompt = prompt
-    if GEMINI_PROMPT_WRAPPER:
-        # Replace placeholder dates if they exist, or prepend date info
-        wrapper = GEMINI_PROMPT_WRAPPER
-        # Add current date/time to wrapper if not already there
-        if "current date" not in wrapper.lower():
-            wrapper = f"Today's date is {current_date} and the current time is {current_time}. " + wrapper
-        enhanced_prompt = wrapper + "\n\n" + prompt
-    else:
-        enhanced_prompt = f"Today's date is {current_date} and the current time is {current_time}. " + prompt
+    enhanced_prompt = build_prompt(prompt)
     
     # If the configured endpoint looks like Google's Generative API or the key
     # header indicates Google, try the Google-specific caller first.
-    try_google = False
-    if GEMINI_API_ENDPOINT and "generativelanguage.googleapis.com" in GEMINI_API_ENDPOINT:
-        try_google = True
-    if GEMINI_API_KEY_HEADER and "goog" in GEMINI_API_KEY_HEADER.lower():
-        try_google = True
-
-    if try_google and GEMINI_API_ENDPOINT:
+    if prefers_google() and GEMINI_API_ENDPOINT:
         try:
-            out = call_google_generate(enhanced_prompt)
+            out = call_google_generate(enhanced_prompt, deadline=deadline, call=call, route=route)
             if out is not None:
+                if not out.strip():
+                    return UNAVAILABLE_MESSAGE  # a reply without an answer (blocked, empty or unreadable)
+                remember_response(key, prompt, out)
                 return out
         except Exception as e:
             # Don't print - let it continue to fallback
             pass
 
-    # Try generic HTTP endpoint next (real provider)
-    if GEMINI_API_ENDPOINT:
+    # Try generic HTTP endpoint next (real provider), with whatever time is left
+    if GEMINI_API_ENDPOINT and not deadline.expired and get_breaker().state != "open":
         try:
-            out = call_http_endpoint(enhanced_prompt)
+            out = call_http_endpoint(enhanced_prompt, deadline=deadline, call=call, route=route)
             if out is not None:
+                if not out.strip():
+                    return UNAVAILABLE_MESSAGE  # a reply without an answer (blocked, empty or unreadable)
+                remember_response(key, prompt, out)
                 return out
         except Exception as e:
             # Don't print - let it continue to fallback
             pass
 
     # If both API calls failed/returned None, return error message instead of stub
-    return "I'm having trouble connecting to my AI backend right now. Please try again in a moment."
+    return UNAVAILABLE_MESSAGE
+
+
+# One answer of generate_many(): text is None when error is set ("unavailable",
+# "empty response" or an exception message); seconds is 0.0 for cached answers
+BatchResult = namedtuple("BatchResult", ["prompt", "text", "error", "seconds", "cached"])
 
 
-def stream_generate(prompt: str):
+def generate_many(prompts, max_concurrency: int = GEMINI_POOL_SIZE, source: str = "gemini_batch") -> list:
+    """Answer many prompts concurrently; returns one BatchResult per prompt, in order.
+
+    Up to max_concurrency requests run at once over the pooled session (at
+    most GEMINI_POOL_SIZE, the connections it keeps alive). Each request has
+    its own deadline and retries like generate_response(); all of them share
+    the rate limiter (GEMINI_RATE_LIMIT, and a 429 holds back every worker)
+    and the circuit breaker, so once the backend is down the rest fail fast.
+    Cached answers come back without a request and repeated prompts are sent
+    once. Every answer is recorded under source (see GEMINI_METRICS).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    prompts = list(prompts)
+    results = [None] * len(prompts)
+    pending = {}  # prompt -> (cache key, indexes of the prompt)
+    for index, prompt in enumerate(prompts):
+        if prompt in pending:
+            pending[prompt][1].append(index)
+            continue
+        call = call_metrics.CallRecord(source)
+        cached, key = cached_response(prompt, call)
+        if cached is not None:
+            results[index] = BatchResult(prompt, finish_call(call, cached), None, 0.0, True)
+        else:
+            pending[prompt] = (key, [index])
+
+    def run(prompt, key):
+        started = time.perf_counter()
+        call = call_metrics.CallRecord(source)
+        route = choose_route(prompt, source, call)
+        try:
+            text = finish_call(call, _generate_uncached(prompt, key, call=call, route=route))
+        except Exception as e:
+            finish_call(call, "")
+            return None, str(e) or type(e).__name__, time.perf_counter() - started
+        if text == UNAVAILABLE_MESSAGE:
+            return None, "unavailable", time.perf_counter() - started
+        if not text:
+            return None, "empty response", time.perf_counter() - started
+        return text, None, time.perf_counter() - started
+
+    if pending:
+        workers = max(1, min(max_concurrency, GEMINI_POOL_SIZE, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-batch") as pool:
+            futures = {prompt: pool.submit(run, prompt, key) for prompt, (key, _) in pending.items()}
+            for prompt, future in futures.items():
+                text, error, seconds = future.result()
+                for index in pending[prompt][1]:
+                    results[index] = BatchResult(prompt, text, error, seconds, False)
+    return results
+
+
+def stream_generate(prompt: str, source: str = "gemini_stream"):
     """Generator that yields incremental text chunks.
 
     Behavior:
     - If GEMINI_API_STREAM is set (true/1) and GEMINI_API_ENDPOINT is configured,
       attempt a streaming HTTP POST and yield incoming lines/chunks.
     - Otherwise, fall back to the blocking call.
+    - The stream and the fallback share one GEMINI_DEADLINE; while the circuit
+      breaker is open the unavailable message is yielded at once.
+    - The call (with its time to the first text) is recorded under source,
+      which also takes part in choosing the model (see GEMINI_ROUTING).
     """
-    import re
-    import json as _json
-    import datetime
-    from datetime import datetime as dt
-    
+    call = call_metrics.CallRecord(source)
+    parts = []
+    chunks = _stream_chunks(prompt, source, call)
+    try:
+        for chunk in chunks:
+            if call.ttft is None and any(ch.isalnum() for ch in chunk):
+                call.first_text()
+            parts.append(chunk)
+            yield chunk
+    finally:
+        chunks.close()
+        finish_call(call, "".join(parts))
+
+
+def _stream_chunks(prompt: str, source: str, call):
+    """The chunks of stream_generate(); attempts and token usage are added to call"""
+    cached, key = cached_response(prompt, call)
+    if cached is not None:
+        yield cached
+        return
+    route = choose_route(prompt, source, call)
+    deadline = resilience.Deadline(route.timeout)
+
     # Inject current date into prompt for accurate time-based answers
-    now = dt.now()
-    current_date = now.strftime("%B %d, %Y")  # e.g., "November 05, 2025"
-    current_time = now.strftime("%H:%M:%S")   # e.g., "14:30:45"
-    
-    # Enhanced prompt with date/time context
-    enhanced_prompt = prompt
-    if GEMINI_PROMPT_WRAPPER:
-        wrapper = GEMINI_PROMPT_WRAPPER
-        # Add current date/time to wrapper if not already there
-        if "current date" not in wrapper.lower():
-            wrapper = f"Today's date is {current_date} and the current time is {current_time}. " + wrapper
-        enhanced_prompt = wrapper + "\n\n" + prompt
-    else:
-        enhanced_prompt = f"Today's date is {current_date} and the current time is {current_time}. " + prompt
+    enhanced_prompt = build_prompt(prompt)
     
     stream_flag = os.getenv("GEMINI_API_STREAM", "").lower() in ("1", "true", "yes")
     
     if stream_flag and GEMINI_API_ENDPOINT and GEMINI_API_KEY:
-        # Check if it's a Google endpoint
-        is_google = "generativelanguage.googleapis.com" in GEMINI_API_ENDPOINT
-        
-        headers = {"Content-Type": "application/json"}
-        # Google API requires x-goog-api-key header for API key authentication
-        if is_google:
-            headers["x-goog-api-key"] = GEMINI_API_KEY
-        else:
-            headers["Authorization"] = f"Bearer {GEMINI_API_KEY}"
+        # Google endpoints get the generateContent body, others {"prompt": ...}
+        is_google = prefers_google()
+        headers, payload = build_request(enhanced_prompt, is_google, route)
         
-        # Use proper payload format for Google API
-        prompt_to_send = enhanced_prompt
-        if GEMINI_RESPONSE_MODE == "plain_text":
-            if GEMINI_PROMPT_WRAPPER:
-                prompt_to_send = GEMINI_PROMPT_WRAPPER + "\n\n" + enhanced_prompt
-            else:
-                prompt_to_send = "Respond only with the final answer in plain text. Do not include JSON, metadata, or code fences.\n\n" + enhanced_prompt
+        if not get_breaker().allow():
+            print("WARNING: Gemini backend is failing, not calling it for now")
+            yield UNAVAILABLE_MESSAGE
+            return
+        if not rate_limiter.acquire(deadline):
+            print("WARNING: Gemini rate limit leaves no time for this request")
+            yield UNAVAILABLE_MESSAGE
+            return
 
-        if is_google:
-            payload = {"contents": [{"parts": [{"text": prompt_to_send}]}]}
-        else:
-            payload = {"prompt": prompt_to_send}
-        
         stream_success = False
+        # Text deltas exactly as streamed, so the cached answer keeps its spacing
+        raw_parts = []
+        parser = stream_parser.StreamParser()
+        started = time.perf_counter()
+        status = None
         try:
-            with requests.post(GEMINI_API_ENDPOINT, json=payload, headers=headers, stream=True, timeout=30) as resp:
+            with get_session().post(route_endpoint(route), json=payload, headers=headers, stream=True,
+                                    timeout=deadline.timeout(30)) as resp:
+                status = resp.status_code
                 resp.raise_for_status()
+                if _is_html_page(resp):
+                    raise ValueError(f"got an HTML page instead of an answer (status {status})")
                 
-                chunk_count = 0
-                for raw in resp.iter_lines(decode_unicode=True):
-                    if not raw:
-                        continue
-                    
-                    # IMPROVED: Extract "text": "..." by finding the field and then JSON-parsing it
-                    # Look for "text": followed by a colon and potential whitespace, then capture until end of field
-                    text_match = re.search(r'"text"\s*:\s*', raw)
-                    if text_match:
-                        # Start position after "text":
-                        start_pos = text_match.end()
-                        # Try to extract the JSON string value starting at this position
-                        try:
-                            # Use json.JSONDecoder to properly parse the string value
-                            decoder = _json.JSONDecoder()
-                            text_content, _ = decoder.raw_decode(raw[start_pos:])
-                            
-                            # text_content is now the properly unescaped string
-                            if text_content and isinstance(text_content, str):
-                                if text_content.strip():  # Only if non-empty
-                                    cleaned = strip_json_noise(text_content)
-                                    if cleaned and any(ch.isalnum() for ch in cleaned):
-                                        yield cleaned
-                                        chunk_count += 1
-                                        stream_success = True
-                            continue
-                        except Exception as e:
-                            # Fall through to try other parsing methods
-                            pass
-                    
-                    # Try parsing entire line as complete JSON
-                    try:
-                        part = _json.loads(raw)
-                        extracted = _extract_text_from_data(part)
-                        if extracted:
-                            cleaned = strip_json_noise(extracted)
-                            if cleaned and any(ch.isalnum() for ch in cleaned):
-                                yield cleaned
-                                chunk_count += 1
-                                stream_success = True
-                        continue
-                    except Exception:
-                        pass  # Not valid JSON, skip
+                # Frames are parsed as the bytes arrive, whatever the read boundaries
+                for text_content in stream_parser.parse_stream(resp.iter_content(chunk_size=None), parser):
+                    raw_parts.append(text_content)
+                    yield text_content
+                    if not stream_success and any(ch.isalnum() for ch in text_content):
+                        stream_success = True
+                    if deadline.expired:
+                        print(f"WARNING: Gemini stream exceeded its {route.timeout:.0f}s deadline")
+                        break
+                call.usage(parser.usage)
                 
                 if stream_success:
+                    if not deadline.expired:  # never cache an answer cut off by the deadline
+                        remember_response(key, prompt, "".join(raw_parts))
                     return  # Successfully streamed
         except requests.exceptions.HTTPError as e:
+            note_rate_limit(e.response.status_code, e.response.headers.get("Retry-After"))
             print(f"WARNING: Streaming HTTP error {e.response.status_code}: {e}")
         except Exception as e:
+            # Includes a connection that broke in the middle of the stream
+            status = None
             print(f"WARNING: Streaming failed: {e}")
+        finally:
+            if _record_attempt("stream", started, status, call):
+                get_breaker().record_failure()
+            else:
+                get_breaker().record_success()
+
+        if deadline.expired:
+            yield UNAVAILABLE_MESSAGE
+            return
+        if stream_success:
+            # The stream broke after part of the answer was spoken: say so
+            # instead of asking again and repeating the start of the answer
+            yield "\n" + STREAM_UNAVAILABLE_MESSAGE
+            return
 
-    # Fallback: use blocking call instead
+    # Fallback: use blocking call instead (the cache was already checked above)
     try:
-        response = generate_response(prompt)
+        response = _generate_uncached(prompt, key, deadline, call, route)
         if response:
             yield response
             return
@@ -570,5 +917,5 @@ def stream_generate(prompt: str):
         print(f"WARNING: Fallback generate_response failed: {e}")
     
     # Last resort: inform user of API issue
-    yield "I'm having trouble reaching the AI service right now. Please try again in a moment."
+    yield STREAM_UNAVAILABLE_MESSAGE
 
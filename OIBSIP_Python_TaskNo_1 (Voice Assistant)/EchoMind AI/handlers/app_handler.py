@@ -9,6 +9,7 @@ from config.settings import OS, COMMON_APPS
 from utils.voice_io import speak, listen, speak_stream
 from utils.text_processing import clean_connector_words
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 def find_installed_apps_windows():
@@ -93,19 +94,22 @@ def find_installed_apps():
         # macOS and others will use default approach
         return {}
 
-def handle_app_opening(command):
-    """Handle application opening commands"""
-    if not re.search(r'\b(open|launch|start)\b', command, re.IGNORECASE):
-        return False
+def match_app_opening(command):
+    """Match application opening commands
+    
+    args["app"] is None when the app name could not be parsed; execute then
+    asks the user which app to open.
+    """
+    if command.token_set.isdisjoint(("open", "launch", "start")):
+        return None
     
     app = None
     remaining_text = None
-    command_lower = command.lower()
     
-    # Extract app name from command
+    # Extract app name from command (keeping the original casing)
     for prefix in ["open ", "launch ", "start "]:
-        if command_lower.startswith(prefix):
-            remainder = command[len(prefix):].strip()
+        if command.text.startswith(prefix):
+            remainder = command.raw.strip()[len(prefix):].strip()
             app_words = remainder.split()
             
             if len(app_words) >= 2:
@@ -128,6 +132,15 @@ def handle_app_opening(command):
     if remaining_text:
         remaining_text = clean_connector_words(remaining_text)
     
+    return matched(command, confidence=1.0 if app else 0.5, app=app, remaining_text=remaining_text)
+
+
+def execute_app_opening(match):
+    """Launch the matched app, then pass any remaining text to Gemini"""
+    command = match.command
+    app = match.args["app"]
+    remaining_text = match.args["remaining_text"]
+    
     if not app:
         speak("Which app would you like to open?")
         app = listen()
@@ -174,6 +187,11 @@ def handle_app_opening(command):
     return False
 
 
+def handle_app_opening(command):
+    """Handle application opening commands"""
+    return run_handler(match_app_opening, execute_app_opening, command)
+
+
 def _open_app_with_windows_search(app, command, remaining_text):
     """Open app using Windows Search (Windows key + S)
     
@@ -314,18 +332,11 @@ def _process_remaining_text(text):
     if stream_flag:
         try:
             gen = gemini_client.stream_generate(text)
+            # Spoken sentence by sentence while the stream arrives
             final_text = speak_stream(gen)
             
-            if not final_text:
-                return True
-            
-            cleaned = gemini_client.normalize_response(final_text)
-            final_clean = gemini_client.strip_json_noise(cleaned)
-            
-            if final_clean:
-                print(final_clean)
-                speak(final_clean)
-                log_interaction(text, final_clean, source="gemini_stream")
+            if final_text:
+                log_interaction(text, final_text, source="gemini_stream")
                 
         except Exception as e:
             print(f"Streaming error: {e}")
@@ -333,16 +344,9 @@ def _process_remaining_text(text):
     else:
         response = gemini_client.generate_response(text)
         if response:
-            cleaned = gemini_client.normalize_response(response)
-            final_clean = gemini_client.strip_json_noise(cleaned)
-            
-            if final_clean:
-                print(final_clean)
-                speak(final_clean)
-            else:
-                print(response)
-                speak(response)
-            log_interaction(text, final_clean if final_clean else response, source="gemini")
+            print(response)
+            speak(response)
+            log_interaction(text, response, source="gemini")
         else:
             speak("Sorry, I couldn't generate a response.")
     
@@ -0,0 +1,38 @@
+"""Two-phase handler protocol
+
+Every handler is split into:
+- match_*(command): cheap and pure. Inspects the pre-parsed Command only
+  (see utils/command.py - no network, microphone, keystrokes or speech) and
+  returns a Match, or None when the handler does not apply.
+- execute_*(match): performs the side effects for a previous match and
+  returns True when the command was handled (False lets routing continue).
+
+The classic handle_*(command) functions are kept as thin wrappers so callers
+that want a one-shot call still work.
+"""
+from collections import namedtuple
+from utils.command import parse_command
+
+# command:    the utterance text that was matched (Command.raw)
+# confidence: 0.0-1.0, how sure the matcher is (heuristic matches are < 1.0)
+# args:       dict of values parsed from the command for execute_*()
+Match = namedtuple("Match", ["command", "confidence", "args"])
+
+# A routable handler: its pure matcher and its side-effecting executor
+Handler = namedtuple("Handler", ["match", "execute"])
+
+
+def matched(command, confidence=1.0, **args):
+    """Build a Match for a Command with the parsed args"""
+    return Match(command.raw, confidence, args)
+
+
+def run_handler(matcher, executor, command):
+    """Match then execute in one call (the original handle_* behaviour)
+
+    command may be a plain string or an already parsed Command.
+    """
+    match = matcher(parse_command(command))
+    if match is None:
+        return False
+    return executor(match)
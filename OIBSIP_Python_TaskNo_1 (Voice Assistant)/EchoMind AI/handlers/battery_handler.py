@@ -4,7 +4,9 @@ import threading
 import time
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from utils import metrics_endpoint
 from config.settings import OS
+from handlers.base import matched, run_handler
 
 # Track battery state
 current_battery_level = 100
@@ -145,6 +147,7 @@ def monitor_battery():
     check_interval = 10  # Check every 10 seconds
     
     while monitoring:
+        started = time.perf_counter()
         try:
             battery_level, charging_status = get_battery_info()
             current_battery_level = battery_level
@@ -178,10 +181,12 @@ def monitor_battery():
                 log_interaction("charging_stopped", message, source="system")
                 charging_announced = False
             
+            metrics_endpoint.MONITOR_LOOP_SECONDS.observe(time.perf_counter() - started, monitor="battery")
             time.sleep(check_interval)
         
         except Exception as e:
             # Silent fail - don't interrupt the assistant
+            metrics_endpoint.MONITOR_ERRORS.inc(monitor="battery")
             time.sleep(check_interval)
 
 
@@ -200,11 +205,15 @@ def stop_battery_monitoring():
     monitoring = False
 
 
-def handle_battery_status(command):
-    """Handle battery status queries"""
-    if not any(word in command.lower() for word in ['battery', 'charge', 'charging']):
-        return False
-    
+def match_battery_status(command):
+    """Match battery status queries"""
+    if not any(word in command.text for word in ['battery', 'charge', 'charging']):
+        return None
+    return matched(command)
+
+
+def execute_battery_status(match):
+    """Read and speak the battery level"""
     battery_level, is_charging = get_battery_info()
     
     if is_charging:
@@ -213,5 +222,10 @@ def handle_battery_status(command):
         message = f"Battery is {battery_level} percent"
     
     speak(message)
-    log_interaction(command, message, source="local")
+    log_interaction(match.command, message, source="local")
     return True
+
+
+def handle_battery_status(command):
+    """Handle battery status queries"""
+    return run_handler(match_battery_status, execute_battery_status, command)
@@ -5,6 +5,7 @@ import os
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 # Dictionary to convert written numbers to integers
@@ -19,7 +20,7 @@ NUMBER_WORDS = {
 
 
 def parse_brightness_value(command):
-    """Parse brightness percentage from command text
+    """Parse brightness percentage from a parsed Command
     
     Supports:
     - "Make brightness 40%"
@@ -28,20 +29,18 @@ def parse_brightness_value(command):
     - "Set brightness to fifty"
     """
     # Try to find a percentage first (e.g., "40%")
-    match = re.search(r'(\d{1,3})\s*%', command, re.IGNORECASE)
-    if match:
-        value = int(match.group(1))
+    if command.percentages:
+        value = command.percentages[0]
         return value if 0 <= value <= 100 else None
     
     # Try to find a number without percent (e.g., "40")
-    match = re.search(r'\b(\d{1,3})\b', command)
-    if match:
-        value = int(match.group(1))
-        return value if 0 <= value <= 100 else None
+    for value in command.numbers:
+        if value < 1000:
+            return value if 0 <= value <= 100 else None
     
     # Try to find written numbers (e.g., "seventy")
     for word, value in NUMBER_WORDS.items():
-        if re.search(rf'\b{word}\b', command, re.IGNORECASE):
+        if word in command.token_set:
             return value if 0 <= value <= 100 else None
     
     return None
@@ -227,8 +226,8 @@ def set_brightness(percentage):
         return False
 
 
-def handle_brightness(command):
-    """Handle brightness control commands
+def match_brightness(command):
+    """Match brightness control commands
     
     Supports:
     - "Make brightness 40%"
@@ -237,11 +236,27 @@ def handle_brightness(command):
     - "Set brightness to fifty"
     - "Brightness 80"
     """
-    if not re.search(r'\b(brightness|screen brightness|display brightness)\b', command, re.IGNORECASE):
-        return False
+    if not re.search(r'\b(brightness|screen brightness|display brightness)\b', command.text):
+        return None
     
     # Parse the brightness value from the command
     brightness_value = parse_brightness_value(command)
+    if brightness_value is not None:
+        return matched(command, value=brightness_value, direction=None)
+    
+    # Try generic brightness commands
+    if "increase" in command.text or "up" in command.text:
+        return matched(command, value=None, direction="increase")
+    elif "decrease" in command.text or "down" in command.text:
+        return matched(command, value=None, direction="decrease")
+    return matched(command, confidence=0.5, value=None, direction=None)
+
+
+def execute_brightness(match):
+    """Apply the matched brightness change"""
+    command = match.command
+    brightness_value = match.args["value"]
+    direction = match.args["direction"]
     
     if brightness_value is not None:
         # Validate percentage
@@ -261,12 +276,12 @@ def handle_brightness(command):
             log_interaction(command, f"Brightness change requested to {brightness_value}%", source="local")
         return True
     else:
-        # Try generic brightness commands
-        if "increase" in command.lower() or "up" in command.lower():
+        # Generic brightness commands
+        if direction == "increase":
             speak("Increasing the brightness")
             set_brightness(75)  # Set to 75% as default increase
             log_interaction(command, "Brightness increase requested", source="local")
-        elif "decrease" in command.lower() or "down" in command.lower():
+        elif direction == "decrease":
             speak("Decreasing the brightness")
             set_brightness(25)  # Set to 25% as default decrease
             log_interaction(command, "Brightness decrease requested", source="local")
@@ -274,3 +289,8 @@ def handle_brightness(command):
             speak("I can change brightness if you tell me a percentage, for example 'set brightness to 60' or 'make brightness seventy'.")
         log_interaction(command, "Brightness command", source="local")
         return True
+
+
+def handle_brightness(command):
+    """Handle brightness control commands"""
+    return run_handler(match_brightness, execute_brightness, command)
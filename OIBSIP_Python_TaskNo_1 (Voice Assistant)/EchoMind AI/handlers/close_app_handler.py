@@ -6,6 +6,7 @@ import psutil
 from config.settings import OS, PROCESS_NAMES
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 # Track opened applications by user command
 OPENED_APPS = {}  # {app_name: process_name}
@@ -25,8 +26,8 @@ def register_opened_tab(browser_name, tab_name):
     OPENED_TABS[browser_lower].append(tab_name.lower())
 
 
-def handle_app_closing(command):
-    """Handle application closing commands
+def match_app_closing(command):
+    """Match application closing commands
     
     Supports:
     - "close powerpoint" → closes PowerPoint
@@ -40,20 +41,20 @@ def handle_app_closing(command):
     - "close the fast youtube tab" → closes YouTube tab (ignores adjectives like "fast")
     - "close the current tab" → closes current active tab (uses Ctrl+W)
     - "close this tab" → closes current active tab (uses Ctrl+W)
+    
+    args["action"] is "current_tab", "hotkey_tab", "close_app" (with
+    args["target"]) or "close_tab" (with args["target"] and args["browser"]).
     """
-    command_lower = command.lower().strip()
+    command_lower = command.text
     
     # EXCLUSION: Don't process exit/quit keywords - let exit handler handle them
     exit_keywords = ['exit', 'terminate', 'stop yourself', 'quit', 'goodbye']
     if any(keyword in command_lower for keyword in exit_keywords):
-        return False  # Don't process - let exit handler handle this
+        return None  # Don't process - let exit handler handle this
     
     # PATTERN 0: Close current/active tab - "close the current tab" or "close this tab"
     if re.search(r'(?:close|shut|kill)\s+(?:the\s+)?(?:current|this|active)\s+tab', command_lower):
-        speak("Closing current tab")
-        _close_tab_with_hotkey(command)
-        log_interaction(command, "Closed current tab using Ctrl+W", source="local")
-        return True
+        return matched(command, action="current_tab")
     
     # Check for explicit close/shut/kill commands
     has_close_word = re.search(r'\b(close|shut|kill|terminate|stop)\b', command_lower)
@@ -64,7 +65,7 @@ def handle_app_closing(command):
     
     # If no close word and no tab keyword, don't process this command
     if not has_close_word and not has_tab_keyword:
-        return False
+        return None
     
     # Ordinals and adjectives to filter out
     ordinals = r"first|second|third|fourth|fifth|last"
@@ -77,11 +78,7 @@ def handle_app_closing(command):
         command_lower
     )
     if ordinal_tab_browser:
-        browser_name = ordinal_tab_browser.group(1).strip()
-        speak("Closing tab using keyboard shortcut")
-        _close_tab_with_hotkey(command)
-        log_interaction(command, "Closed tab using Ctrl+W", source="local")
-        return True
+        return matched(command, action="hotkey_tab")
     
     # PATTERN 2: close [adjective]* [ordinal]* [tab_name] tab
     # Filter out both adjectives AND ordinals from capture group
@@ -105,9 +102,9 @@ def handle_app_closing(command):
             apps = ("chrome", "firefox", "edge", "microsoft edge", "powerpoint", "word", "excel", 
                    "notepad", "calculator", "discord", "settings")
             if target.lower() in apps:
-                return _close_application_instance(target.lower(), command)
+                return matched(command, action="close_app", target=target.lower())
             else:
-                return _close_tab_or_website(target, browser_name, command)
+                return matched(command, action="close_tab", target=target, browser=browser_name)
     
     # PATTERN 3: IMPLICIT tab close - just "[name] tab" without close word
     # e.g., "youtube tab" → Close youtube tab
@@ -122,9 +119,9 @@ def handle_app_closing(command):
                 apps = ("chrome", "firefox", "edge", "microsoft edge", "powerpoint", "word", "excel", 
                        "notepad", "calculator", "discord", "settings")
                 if target.lower() in apps:
-                    return _close_application_instance(target.lower(), command)
+                    return matched(command, action="close_app", target=target.lower())
                 else:
-                    return _close_tab_or_website(target, None, command)
+                    return matched(command, action="close_tab", target=target, browser=None)
     
     # PATTERN 4: close [app_name] (without tab keyword - application close)
     # e.g., "close microsoft edge" → Close entire application
@@ -135,9 +132,34 @@ def handle_app_closing(command):
             apps = ("chrome", "firefox", "edge", "microsoft edge", "powerpoint", "word", "excel", 
                    "notepad", "calculator", "discord", "settings")
             if target.lower() in apps:
-                return _close_application_instance(target.lower(), command)
+                return matched(command, action="close_app", target=target.lower())
     
-    return False
+    return None
+
+
+def execute_app_closing(match):
+    """Close the matched tab or application"""
+    command = match.command
+    action = match.args["action"]
+    
+    if action == "current_tab":
+        speak("Closing current tab")
+        _close_tab_with_hotkey(command)
+        log_interaction(command, "Closed current tab using Ctrl+W", source="local")
+        return True
+    if action == "hotkey_tab":
+        speak("Closing tab using keyboard shortcut")
+        _close_tab_with_hotkey(command)
+        log_interaction(command, "Closed tab using Ctrl+W", source="local")
+        return True
+    if action == "close_app":
+        return _close_application_instance(match.args["target"], command)
+    return _close_tab_or_website(match.args["target"], match.args["browser"], command)
+
+
+def handle_app_closing(command):
+    """Handle application closing commands"""
+    return run_handler(match_app_closing, execute_app_closing, command)
 
 
 
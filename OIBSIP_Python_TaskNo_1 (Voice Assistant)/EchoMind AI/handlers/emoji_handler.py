@@ -5,6 +5,7 @@ import time
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 # Try different keyboard control methods
 try:
@@ -113,37 +114,46 @@ def open_emoji():
         return False
 
 
-def handle_emoji_mode(command):
-    """Handle emoji mode/picker commands
+def match_emoji_mode(command):
+    """Match emoji mode/picker commands
     
     Supports:
     - "Open emoji" / "Show emoji" / "emoji" -> Opens emoji picker (Win+.)
-    - "Give me some emoji" / "Suggest emojis" / "emoji suggestions" -> Uses Gemini to suggest emojis
+    - "Give me some emoji" / "Suggest emojis" / "emoji suggestions" -> Not matched, so Gemini suggests emojis
     """
     # Check if command contains "emoji" keyword
-    if "emoji" not in command.lower():
-        return False
+    if "emoji" not in command.text:
+        return None
     
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Check if user is asking for emoji suggestions/recommendations (not just opening picker)
     if re.search(r'\b(suggest|give me|recommend|show me|some|list|examples?|types?)\b', command_lower):
         # User wants emoji suggestions - let Gemini handle this
-        # Return False so it falls through to Gemini
-        return False
+        # Return None so it falls through to Gemini
+        return None
     
-    # Otherwise, open the emoji picker directly with Win+.
+    return matched(command)
+
+
+def execute_emoji_mode(match):
+    """Open the emoji picker directly with Win+."""
     success = open_emoji()
     
     if success:
         speak("Opening emoji picker")
-        log_interaction(command, "Emoji picker opened (Win+.)", source="local")
+        log_interaction(match.command, "Emoji picker opened (Win+.)", source="local")
     else:
         speak("Tried to open emoji picker but it may not be supported on this system.")
-        log_interaction(command, "Emoji picker requested", source="local")
+        log_interaction(match.command, "Emoji picker requested", source="local")
     return True
 
 
+def handle_emoji_mode(command):
+    """Handle emoji mode/picker commands"""
+    return run_handler(match_emoji_mode, execute_emoji_mode, command)
+
+
 if __name__ == "__main__":
     print("Emoji handler test - import successful")
     print(f"OS detected: {OS}")
@@ -1,9 +1,10 @@
 """Exit handler"""
 import re
 from config.settings import EXIT_KEYWORDS
+from handlers.base import matched, run_handler
 
-def handle_exit(command):
-    """Handle exit/quit commands
+def match_exit(command):
+    """Match exit/quit commands
     
     Matches:
     - Direct keywords: exit, quit, stop, bye, goodbye, terminate
@@ -11,26 +12,36 @@ def handle_exit(command):
     - Leaving phrases: I want to leave, I want to go, I need to go
     - Ending phrases: that's all, nothing else, no more
     """
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Direct exit keywords
     if re.search(r'\b(exit|quit|stop|bye|goodbye|terminate)\b', command_lower):
-        return True
+        return matched(command)
     
     # Closing/ending the conversation patterns
     if re.search(r'\b(close|end|finish|wrap)\b.*\b(our|the|this)?\s*(conversation|convo|chat|talk|discussion)\b', command_lower):
-        return True
+        return matched(command)
     
     # Leaving/going away patterns
     if re.search(r'\b(i\s+want\s+to|i\s+need\s+to|i\s+have\s+to|i\'ll|i\s+gotta)\s+(leave|go|depart|exit|quit|stop)\b', command_lower):
-        return True
+        return matched(command)
     
     # Nothing else / that's all patterns
     if re.search(r'\b(that\'?s\s+all|nothing\s+else|no\s+more|no\s+further|we\'?re\s+done|all\s+done)\b', command_lower):
-        return True
+        return matched(command)
     
     # Goodbye variations
     if re.search(r'\b(goodbye|good\s+bye|see\s+you|see\s+ya|take\s+care|farewell)\b', command_lower):
-        return True
+        return matched(command)
     
-    return False
+    return None
+
+
+def execute_exit(match):
+    """Exiting has no side effects here - the main loop says goodbye"""
+    return True
+
+
+def handle_exit(command):
+    """Handle exit/quit commands"""
+    return run_handler(match_exit, execute_exit, command)
@@ -5,13 +5,14 @@ import os
 from config.settings import OS, LOCATION_MAP
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
-def handle_file_opening(command):
-    """Handle file and folder opening commands"""
-    if not re.search(r'\b(open|show)\b.*(pdf|file|document|documents|folder|downloads|pictures|music|videos|explorer)', command, re.IGNORECASE):
-        return False
+def match_file_opening(command):
+    """Match file and folder opening commands"""
+    if not re.search(r'\b(open|show)\b.*(pdf|file|document|documents|folder|downloads|pictures|music|videos|explorer)', command.text):
+        return None
     
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Determine which location to open
     location = None
@@ -27,6 +28,11 @@ def handle_file_opening(command):
         else:
             location = os.path.expanduser('~')
     
+    return matched(command, location=location)
+
+def execute_file_opening(match):
+    """Open the matched location in the file explorer"""
+    location = match.args["location"]
     try:
         if OS == "windows":
             subprocess.Popen(["explorer", location])
@@ -36,9 +42,13 @@ def handle_file_opening(command):
             subprocess.Popen(["nautilus", location])
         
         speak(f"Opening file explorer")
-        log_interaction(command, "Opened file explorer", source="local")
+        log_interaction(match.command, "Opened file explorer", source="local")
         return True
     except Exception as e:
         speak("Sorry, I couldn't open the file explorer.")
         print(f"Error: {e}")
         return False
+
+def handle_file_opening(command):
+    """Handle file and folder opening commands"""
+    return run_handler(match_file_opening, execute_file_opening, command)
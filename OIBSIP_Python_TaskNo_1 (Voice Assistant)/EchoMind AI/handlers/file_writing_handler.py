@@ -8,20 +8,21 @@ from config.settings import OS
 from utils.voice_io import speak, listen
 from utils.logger import log_interaction
 import gemini_client
+from handlers.base import matched, run_handler
 
 
-def handle_file_writing(command):
-    """Handle writing content to files (Notepad, Word, etc.)
+def match_file_writing(command):
+    """Match writing content to files (Notepad, Word, etc.)
     
     Examples:
     - "Open notepad and write a story"
     - "Open word and write a bengali story in english"
     - "Open notepad and write a hindi poem"
     """
-    if not re.search(r'\b(open|launch|start)\b.*\b(notepad|word|document|ms\s+word)\b.*\b(and\s+)?write\b', command, re.IGNORECASE):
-        return False
+    if not re.search(r'\b(open|launch|start)\b.*\b(notepad|word|document|ms\s+word)\b.*\b(and\s+)?write\b', command.text):
+        return None
     
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Determine which app to open
     app_name = None
@@ -30,7 +31,7 @@ def handle_file_writing(command):
     elif "word" in command_lower or "document" in command_lower:
         app_name = "word"
     else:
-        return False
+        return None
     
     # Extract the writing prompt
     write_prompt = None
@@ -42,6 +43,14 @@ def handle_file_writing(command):
     if not write_prompt or len(write_prompt.strip()) < 3:
         write_prompt = "a creative story"
     
+    return matched(command, app_name=app_name, write_prompt=write_prompt)
+
+
+def execute_file_writing(match):
+    """Open the matched app and type Gemini-generated content into it"""
+    command = match.command
+    app_name = match.args["app_name"]
+    write_prompt = match.args["write_prompt"]
     try:
         # Open the application
         if OS == "windows":
@@ -92,6 +101,11 @@ def handle_file_writing(command):
         return False
 
 
+def handle_file_writing(command):
+    """Handle writing content to files (Notepad, Word, etc.)"""
+    return run_handler(match_file_writing, execute_file_writing, command)
+
+
 def _generate_content(prompt):
     """Generate content using Gemini API"""
     try:
@@ -101,16 +115,11 @@ def _generate_content(prompt):
         else:
             full_prompt = prompt
         
-        # Use blocking API for reliability
-        response = gemini_client.generate_response(full_prompt)
-        
-        if response:
-            # Clean the response
-            cleaned = gemini_client.normalize_response(response)
-            final_clean = gemini_client.strip_json_noise(cleaned)
-            return final_clean if final_clean else response
+        # Use blocking API for reliability (long-form text: routed to the large model)
+        response = gemini_client.generate_response(full_prompt, source="file_writing")
         
-        return None
+        # Already extracted by the client
+        return response if response else None
     except Exception as e:
         print(f"Error generating content: {e}")
         return None
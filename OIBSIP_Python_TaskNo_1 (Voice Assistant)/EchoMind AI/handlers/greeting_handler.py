@@ -1,12 +1,22 @@
 """Greeting handler"""
-import re
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
+
+GREETING_WORDS = frozenset(["hello", "hi", "hey", "greetings"])
+
+def match_greeting(command):
+    """Match greeting commands"""
+    if not command.token_set.isdisjoint(GREETING_WORDS):
+        return matched(command)
+    return None
+
+def execute_greeting(match):
+    """Respond to a greeting"""
+    speak("Hello! How can I help you?")
+    log_interaction(match.command, "Hello! How can I help you?", source="local")
+    return True
 
 def handle_greeting(command):
     """Handle greeting commands"""
-    if re.search(r'\b(hello|hi|hey|greetings)\b', command, re.IGNORECASE):
-        speak("Hello! How can I help you?")
-        log_interaction(command, "Hello! How can I help you?", source="local")
-        return True
-    return False
+    return run_handler(match_greeting, execute_greeting, command)
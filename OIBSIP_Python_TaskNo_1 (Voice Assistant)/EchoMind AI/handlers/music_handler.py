@@ -6,6 +6,7 @@ import urllib.parse
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 def _find_youtube_video_url(song_query):
@@ -71,25 +72,23 @@ def _open_video_url(video_url):
         return False
 
 
-def handle_play_music(command):
+def match_play_music(command):
     """
-    Handle play music commands
+    Match play music commands
     Patterns:
     - "play <song_name>"
     - "play <song_name> by <artist>"
     - "play music <song_name>"
-    
-    Now attempts to play the first video directly instead of just searching
     """
     # Check if command contains play keyword
-    if not re.search(r'\bplay\b', command, re.IGNORECASE):
-        return False
+    if not re.search(r'\bplay\b', command.text):
+        return None
     
-    command_lower = command.lower().strip()
+    command_lower = command.text
     
     # Don't handle if it's explicitly for YouTube (handled by handle_play_on_youtube)
     if "on youtube" in command_lower or "on you tube" in command_lower:
-        return False
+        return None
     
     # Extract the song query
     song_query = None
@@ -107,48 +106,60 @@ def handle_play_music(command):
         if match:
             song_query = match.group(1).strip()
     
-    # If we found a song query, search it on YouTube and play
-    if song_query:
-        try:
-            speak(f"Playing {song_query}")
-            
-            # Try to find direct video URL
-            video_url = _find_youtube_video_url(song_query)
-            
-            if video_url:
-                # Open the video directly
-                _open_video_url(video_url)
-                log_interaction(command, f"YouTube play (direct): {song_query}", source="music")
-            else:
-                # Fallback to search results if direct link fails
-                youtube_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(song_query)}"
-                _open_video_url(youtube_url)
-                log_interaction(command, f"YouTube search (fallback): {song_query}", source="music")
-            
-            return True
-        except Exception as e:
-            speak("Sorry, I couldn't play the music on YouTube.")
-            print(f"Music play error: {e}")
-            log_interaction(command, f"Music error: {e}", source="music")
-            return False
+    if not song_query:
+        return None
+    return matched(command, song_query=song_query)
+
+
+def execute_play_music(match):
+    """
+    Search the song on YouTube and play it
     
-    return False
+    Attempts to play the first video directly instead of just searching
+    """
+    command = match.command
+    song_query = match.args["song_query"]
+    try:
+        speak(f"Playing {song_query}")
+        
+        # Try to find direct video URL
+        video_url = _find_youtube_video_url(song_query)
+        
+        if video_url:
+            # Open the video directly
+            _open_video_url(video_url)
+            log_interaction(command, f"YouTube play (direct): {song_query}", source="music")
+        else:
+            # Fallback to search results if direct link fails
+            youtube_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(song_query)}"
+            _open_video_url(youtube_url)
+            log_interaction(command, f"YouTube search (fallback): {song_query}", source="music")
+        
+        return True
+    except Exception as e:
+        speak("Sorry, I couldn't play the music on YouTube.")
+        print(f"Music play error: {e}")
+        log_interaction(command, f"Music error: {e}", source="music")
+        return False
 
 
-def handle_play_on_youtube(command):
+def handle_play_music(command):
+    """Handle play music commands"""
+    return run_handler(match_play_music, execute_play_music, command)
+
+
+def match_play_on_youtube(command):
     """
-    Alternative handler for explicit YouTube play commands
+    Match explicit YouTube play commands
     Patterns:
     - "play <song> on youtube"
     - "youtube play <song>"
-    
-    Now attempts to play the first video directly
     """
-    if not re.search(r'\b(play|youtube)\b.*\byoutube\b', command, re.IGNORECASE):
-        if not re.search(r'\byoutube\s+play\b', command, re.IGNORECASE):
-            return False
+    if not re.search(r'\b(play|youtube)\b.*\byoutube\b', command.text):
+        if not re.search(r'\byoutube\s+play\b', command.text):
+            return None
     
-    command_lower = command.lower().strip()
+    command_lower = command.text
     
     # Extract song query
     song_query = None
@@ -162,28 +173,39 @@ def handle_play_on_youtube(command):
     elif command_lower.startswith("youtube play"):
         song_query = command_lower[12:].strip()
     
-    if song_query:
-        try:
-            speak(f"Playing {song_query} on YouTube")
-            
-            # Try to find direct video URL
-            video_url = _find_youtube_video_url(song_query)
-            
-            if video_url:
-                # Open the video directly
-                _open_video_url(video_url)
-                log_interaction(command, f"YouTube play (direct): {song_query}", source="music")
-            else:
-                # Fallback to search results
-                youtube_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(song_query)}"
-                _open_video_url(youtube_url)
-                log_interaction(command, f"YouTube search (fallback): {song_query}", source="music")
-            
-            return True
-        except Exception as e:
-            speak("Sorry, I couldn't play the music on YouTube.")
-            print(f"YouTube play error: {e}")
-            log_interaction(command, f"YouTube play error: {e}", source="music")
-            return False
-    
-    return False
+    if not song_query:
+        return None
+    return matched(command, song_query=song_query)
+
+
+def execute_play_on_youtube(match):
+    """Play the first YouTube result for the matched song"""
+    command = match.command
+    song_query = match.args["song_query"]
+    try:
+        speak(f"Playing {song_query} on YouTube")
+        
+        # Try to find direct video URL
+        video_url = _find_youtube_video_url(song_query)
+        
+        if video_url:
+            # Open the video directly
+            _open_video_url(video_url)
+            log_interaction(command, f"YouTube play (direct): {song_query}", source="music")
+        else:
+            # Fallback to search results
+            youtube_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(song_query)}"
+            _open_video_url(youtube_url)
+            log_interaction(command, f"YouTube search (fallback): {song_query}", source="music")
+        
+        return True
+    except Exception as e:
+        speak("Sorry, I couldn't play the music on YouTube.")
+        print(f"YouTube play error: {e}")
+        log_interaction(command, f"YouTube play error: {e}", source="music")
+        return False
+
+
+def handle_play_on_youtube(command):
+    """Handle explicit YouTube play commands"""
+    return run_handler(match_play_on_youtube, execute_play_on_youtube, command)
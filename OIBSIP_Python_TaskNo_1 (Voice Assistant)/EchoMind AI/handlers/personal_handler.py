@@ -2,6 +2,7 @@
 import re
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 # Tech stack information
 TECH_STACK = [
@@ -22,15 +23,15 @@ CREATOR_INFO = {
     'tech_stack': ', '.join(TECH_STACK[:5])  # First 5 for brevity
 }
 
-def handle_personal_questions(command):
-    """Handle personal questions about the assistant
+def match_personal_questions(command):
+    """Match personal questions about the assistant
     
-    Only handle if there's no other explicit intent (translate, convert, language, etc)
+    Only match if there's no other explicit intent (translate, convert, language, etc)
     This ensures queries like "who are you in Bengali" go to Gemini for translation
     """
     # Check if this is about the creator
-    if re.search(r'\b(who\s+is|do\s+you\s+know)\s+(babin|b a b i n|babin\s+bid)\b', command, re.IGNORECASE):
-        if re.search(r'\bwho\s+is\b', command, re.IGNORECASE):
+    if re.search(r'\b(who\s+is|do\s+you\s+know)\s+(babin|b a b i n|babin\s+bid)\b', command.text):
+        if re.search(r'\bwho\s+is\b', command.text):
             # "Who is Babin?" or "Who is Babin Bid?"
             response = (f"Babin Bid is my creator and the developer of EchoMind AI. "
                        f"He built me using {CREATOR_INFO['tech_stack']} and many other technologies "
@@ -41,24 +42,29 @@ def handle_personal_questions(command):
                        f"{CREATOR_INFO['tech_stack']}, Google Speech Recognition, and other modern technologies. "
                        f"Because of him, I can understand your voice commands and provide intelligent responses.")
         
-        speak(response)
-        log_interaction(command, response, source="local")
-        return True
+        return matched(command, response=response)
     
     # Check if there are other explicit intents that override personal questions
     # Include language names to catch queries like "who are you in bengali"
     override_keywords = r'\b(translate|convert|language|meaning|definition|spell|pronounce|write|encode|decode|in\s+(bengali|hindi|spanish|french|german|gujarati|tamil|telugu|kannada|marathi|punjabi|urdu|arabic|chinese|japanese|korean|russian|portuguese|italian|thai|vietnamese))\b'
-    if re.search(override_keywords, command, re.IGNORECASE):
+    if re.search(override_keywords, command.text):
         # Don't handle personal questions if user is asking for translation/conversion
-        return False
+        return None
     
-    if re.search(r'\b(how are you|how do you do)\b', command, re.IGNORECASE):
-        speak("I'm doing well, thank you! How can I assist you?")
-        log_interaction(command, "I'm doing well, thank you! How can I assist you?", source="local")
-        return True
-    elif re.search(r'\b(your name|who are you|what are you)\b', command, re.IGNORECASE):
-        speak("I am EchoMind AI, your voice assistant.")
-        log_interaction(command, "I am EchoMind AI, your voice assistant.", source="local")
-        return True
+    if re.search(r'\b(how are you|how do you do)\b', command.text):
+        return matched(command, response="I'm doing well, thank you! How can I assist you?")
+    elif re.search(r'\b(your name|who are you|what are you)\b', command.text):
+        return matched(command, response="I am EchoMind AI, your voice assistant.")
     
-    return False
+    return None
+
+def execute_personal_questions(match):
+    """Speak the prepared answer to a personal question"""
+    response = match.args["response"]
+    speak(response)
+    log_interaction(match.command, response, source="local")
+    return True
+
+def handle_personal_questions(command):
+    """Handle personal questions about the assistant"""
+    return run_handler(match_personal_questions, execute_personal_questions, command)
@@ -0,0 +1,63 @@
+"""Lazy handler registry
+
+Handler modules pull in heavy or platform-specific dependencies (pyautogui,
+psutil, pynput, keyboard, winreg, requests ...). A LazyHandler only names the
+module and its match/execute functions; the module is imported the first time
+the dispatcher actually evaluates the handler, i.e. the first time one of its
+triggers fires, instead of before the greeting is spoken.
+"""
+import importlib
+
+
+class LazyHandler:
+    """Handler (match/execute pair) whose module is imported on first use"""
+
+    def __init__(self, module_name, match_name, execute_name):
+        self.module_name = module_name
+        self.match_name = match_name
+        self.execute_name = execute_name
+        self._match = None
+        self._execute = None
+        self.failed = False
+
+    @property
+    def loaded(self):
+        """True once the handler module has been imported successfully"""
+        return self._match is not None
+
+    def _load(self):
+        try:
+            module = importlib.import_module(self.module_name)
+            self._match = getattr(module, self.match_name)
+            self._execute = getattr(module, self.execute_name)
+        except (ImportError, AttributeError) as e:
+            # Missing optional/platform dependency: disable this handler only
+            print(f"Warning: handler {self.module_name}.{self.match_name} unavailable: {e}")
+            self.failed = True
+
+    def match(self, command):
+        """Pure match phase; imports the handler module on the first call"""
+        if self._match is None:
+            if self.failed:
+                return None
+            self._load()
+            if self.failed:
+                return None
+        return self._match(command)
+
+    def execute(self, match):
+        """Side-effecting execute phase for a previous match"""
+        if self._execute is None:
+            self._load()
+            if self.failed:
+                return False
+        return self._execute(match)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else ("failed" if self.failed else "not loaded")
+        return f"LazyHandler({self.module_name}.{self.match_name}, {state})"
+
+
+def lazy_handler(module_name, name):
+    """LazyHandler for handlers.<module_name> following the match_<name>/execute_<name> convention"""
+    return LazyHandler(f"handlers.{module_name}", f"match_{name}", f"execute_{name}")
@@ -6,6 +6,7 @@ import webbrowser
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 def open_resume_windows(file_path):
@@ -76,8 +77,8 @@ def open_resume(file_path):
         return False
 
 
-def handle_resume_opening(command):
-    """Handle resume opening commands
+def match_resume_opening(command):
+    """Match resume opening commands
     
     Supports:
     - "Open my resume"
@@ -89,17 +90,24 @@ def handle_resume_opening(command):
     - "Curriculum vitae"
     - Misspellings: "curriculam vitae", etc.
     """
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Check if command contains resume-related keywords (with flexibility for spacing and misspellings)
     # Supports: resume, cv, c v, curriculum vitae, curricula, curriculam, etc.
     resume_pattern = r'\b(resume|c\.?v\.?|c\s+v|curricul[au]m\s+vitae|cv\.?)\b'
     if not re.search(resume_pattern, command_lower):
-        return False
+        return None
     
     # Check if it's a request to open
     if not re.search(r'\b(open|show|display|view|launch|start)\b', command_lower):
-        return False
+        return None
+    
+    return matched(command)
+
+
+def execute_resume_opening(match):
+    """Open the resume file"""
+    command = match.command
     
     # Resume file path - customize this to your actual resume location
     resume_path = "file:///E:/Personal%20Informations/Babin_Bid_Resume.pdf"
@@ -120,3 +128,8 @@ def handle_resume_opening(command):
         speak("Sorry, I couldn't open your resume.")
         log_interaction(command, f"Resume error: {e}", source="local")
         return True
+
+
+def handle_resume_opening(command):
+    """Handle resume opening commands"""
+    return run_handler(match_resume_opening, execute_resume_opening, command)
@@ -4,35 +4,44 @@ import os
 from utils.weather import get_weather
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
-def handle_simple_city_weather(command):
-    """Handle simple city name as weather query"""
+def match_simple_city_weather(command):
+    """Match a simple city name as a weather query
+    
+    Only the shape of the command is checked here; whether the word really is a
+    city is decided by the weather lookup in execute, so confidence stays low.
+    """
+    # Single word city - check blacklist of common question/command words
+    if len(command.tokens) == 1 and re.match(r"^[a-z]{3,40}$", command.text):
+        blacklist_tokens = (
+            "why", "what", "when", "where", "how", "do", "did", "does", 
+            "don't", "didn't", "tell", "is", "are", "be", "open", "hello", "hi",
+            "yes", "no", "ok", "okay", "sure", "thanks", "thank", "welcome",
+            "please", "sorry", "excuse", "bye", "goodbye", "quit", "exit",
+            "next", "stop", "continue", "repeat", "again", "help",
+            "search", "api", "map", "maps", "database", "website", "web",
+            "google", "chrome", "firefox", "edge", "browser",
+            "open", "visit", "go", "check", "find", "look", "show"
+        )
+        if command.text not in blacklist_tokens:
+            return matched(command, confidence=0.3, city=command.raw.strip())
+    
+    return None
+
+def execute_simple_city_weather(match):
+    """Speak the weather if the word turned out to be a known city"""
     try:
-        words = command.split()
-        simple_city_candidate = False
-        
-        # Single word city - check blacklist of common question/command words
-        if len(words) == 1 and re.match(r"^[a-zA-Z]{3,40}$", command):
-            blacklist_tokens = (
-                "why", "what", "when", "where", "how", "do", "did", "does", 
-                "don't", "didn't", "tell", "is", "are", "be", "open", "hello", "hi",
-                "yes", "no", "ok", "okay", "sure", "thanks", "thank", "welcome",
-                "please", "sorry", "excuse", "bye", "goodbye", "quit", "exit",
-                "next", "stop", "continue", "repeat", "again", "help",
-                "search", "api", "map", "maps", "database", "website", "web",
-                "google", "chrome", "firefox", "edge", "browser",
-                "open", "visit", "go", "check", "find", "look", "show"
-            )
-            if command.lower() not in blacklist_tokens:
-                simple_city_candidate = True
-        
-        if simple_city_candidate:
-            weather_info = get_weather(command)
-            if weather_info and not weather_info.lower().startswith("sorry"):
-                speak(weather_info)
-                log_interaction(command, weather_info, source="local")
-                return True
+        weather_info = get_weather(match.args["city"])
+        if weather_info and not weather_info.lower().startswith("sorry"):
+            speak(weather_info)
+            log_interaction(match.command, weather_info, source="local")
+            return True
     except Exception:
         pass
     
     return False
+
+def handle_simple_city_weather(command):
+    """Handle simple city name as weather query"""
+    return run_handler(match_simple_city_weather, execute_simple_city_weather, command)
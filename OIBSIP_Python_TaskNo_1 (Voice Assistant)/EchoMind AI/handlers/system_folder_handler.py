@@ -5,6 +5,7 @@ import os
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 # Common system folders mapping
@@ -36,8 +37,8 @@ SYSTEM_FOLDERS = {
 }
 
 
-def handle_system_folder_opening(command):
-    r"""Handle opening system folders and drives
+def match_system_folder_opening(command):
+    r"""Match opening system folders and drives
     
     Supports:
     - "Open Desktop" → Opens C:\Users\[username]\Desktop
@@ -55,17 +56,20 @@ def handle_system_folder_opening(command):
     - "Close drive D" → Closes/Ejects D:\ safely (if removable)
     - "Close the D drive" → Ejects D:\ 
     - "Eject drive C" → Ejects C:\ (if removable)
+    
+    args["action"] is "close_drive", "folder" (with args["folder_key"]) or
+    "drive" (with args["drive_letter"]).
     """
-    command_lower = command.lower().strip()
+    command_lower = command.text
     
     # Check if this is a close/eject drive command
     if re.search(r'\b(?:close|eject|unmount)\s+(?:the\s+)?(?:drive\s+)?[a-z]:', command_lower) or \
        re.search(r'\b(?:close|eject|unmount)\s+(?:the\s+)?(?:drive\s+)?[a-z]\s+drive\b', command_lower):
-        return _handle_drive_closing(command)
+        return matched(command, action="close_drive")
     
     # Check if this is NOT a system folder/drive opening command
     if not re.search(r'\b(open|access|go\s+to|navigate\s+to)\b.*\b(desktop|downloads|documents|pictures|music|videos|drive|partition)\b', command_lower):
-        return False
+        return None
     
     # PATTERN 1: Open system folders
     # "Open Desktop", "Open Downloads", etc.
@@ -75,7 +79,7 @@ def handle_system_folder_opening(command):
         
         folder_match = re.search(folder_regex, command_lower)
         if folder_match:
-            return _open_system_folder(folder_key, command)
+            return matched(command, action="folder", folder_key=folder_key)
     
     # PATTERN 2: Open drives
     # "Open drive C", "Open C drive", "Open the D drive", etc.
@@ -84,9 +88,26 @@ def handle_system_folder_opening(command):
     
     if drive_match:
         drive_letter = drive_match.group(1).upper()
-        return _open_drive(drive_letter, command)
+        return matched(command, action="drive", drive_letter=drive_letter)
+    
+    return None
+
+
+def execute_system_folder_opening(match):
+    """Open the matched folder or drive, or eject a drive"""
+    command = match.command
+    action = match.args["action"]
     
-    return False
+    if action == "close_drive":
+        return _handle_drive_closing(command)
+    if action == "folder":
+        return _open_system_folder(match.args["folder_key"], command)
+    return _open_drive(match.args["drive_letter"], command)
+
+
+def handle_system_folder_opening(command):
+    """Handle opening system folders and drives"""
+    return run_handler(match_system_folder_opening, execute_system_folder_opening, command)
 
 
 def _open_system_folder(folder_key, command):
@@ -4,6 +4,7 @@ import time
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 
 # Current tab tracking
@@ -21,8 +22,8 @@ def get_current_tab():
     return CURRENT_TAB
 
 
-def handle_tab_navigation(command):
-    """Handle tab navigation commands using Ctrl+number
+def match_tab_navigation(command):
+    """Match tab navigation commands using Ctrl+number
     
     Supports:
     - "move to 1st tab" → Presses Ctrl+1
@@ -35,23 +36,24 @@ def handle_tab_navigation(command):
     - "previous tab" → Presses Ctrl+Shift+Tab
     - "move to the 2nd tab" → Presses Ctrl+2
     
-    Returns True if command was handled, False otherwise
+    args["action"] is "tab" (with args["tab_number"]), "next", "previous",
+    "last" or "out_of_range" (with args["message"]).
     """
-    command_lower = command.lower().strip()
+    command_lower = command.text
     
     # Check if this is a tab navigation command
     if not re.search(r'\b(move|go|switch|navigate)\s+(to|to\s+the)?\s*(first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|last|next|previous|\d+(?:st|nd|rd|th)?|tab)', command_lower):
-        return False
+        return None
     
     # Pattern 1: Numeric tab numbers - "move to 3rd tab" or "tab 5"
     numeric_match = re.search(r'(?:move|go|switch|navigate)?\s*(?:to)?\s*(?:the)?\s*(\d+)(?:st|nd|rd|th)?\s*tab', command_lower)
     if numeric_match:
         tab_num = int(numeric_match.group(1))
         if 1 <= tab_num <= 8:
-            return _navigate_to_tab(tab_num, command)
+            return matched(command, action="tab", tab_number=tab_num)
         else:
-            speak(f"Tab {tab_num} is out of range. Browsers support tabs 1 to 8 with Ctrl+number shortcut.")
-            return True
+            return matched(command, action="out_of_range",
+                           message=f"Tab {tab_num} is out of range. Browsers support tabs 1 to 8 with Ctrl+number shortcut.")
     
     # Pattern 2: Word-based tab numbers - "move to first tab"
     word_tabs = {
@@ -65,34 +67,60 @@ def handle_tab_navigation(command):
         tab_word = word_match.group(1)
         tab_num = word_tabs[tab_word]
         if tab_num <= 8:
-            return _navigate_to_tab(tab_num, command)
+            return matched(command, action="tab", tab_number=tab_num)
         else:
-            speak("Tab position out of supported range. Use tabs 1 to 8.")
-            return True
+            return matched(command, action="out_of_range",
+                           message="Tab position out of supported range. Use tabs 1 to 8.")
     
     # Pattern 3: Next tab - "next tab"
     if re.search(r'\bnext\s+tab\b', command_lower):
-        return _navigate_next_tab(command)
+        return matched(command, action="next")
     
     # Pattern 4: Previous tab - "previous tab"
     if re.search(r'\bprevious\s+tab\b|\bprev\s+tab\b', command_lower):
-        return _navigate_previous_tab(command)
+        return matched(command, action="previous")
     
     # Pattern 5: Last tab - "move to last tab"
     if re.search(r'(?:move|go|switch|navigate)\s+(?:to)?\s*(?:the)?\s+last\s+tab', command_lower):
-        return _navigate_to_last_tab(command)
+        return matched(command, action="last")
     
     # Pattern 6: Simple "tab X" format - "tab 3"
     simple_tab = re.search(r'^tab\s+(\d+)$', command_lower)
     if simple_tab:
         tab_num = int(simple_tab.group(1))
         if 1 <= tab_num <= 8:
-            return _navigate_to_tab(tab_num, command)
+            return matched(command, action="tab", tab_number=tab_num)
         else:
-            speak(f"Tab {tab_num} is out of range. Browsers support tabs 1 to 8 with Ctrl+number shortcut.")
-            return True
+            return matched(command, action="out_of_range",
+                           message=f"Tab {tab_num} is out of range. Browsers support tabs 1 to 8 with Ctrl+number shortcut.")
+    
+    return None
+
+
+def execute_tab_navigation(match):
+    """Press the shortcut for the matched tab action"""
+    command = match.command
+    action = match.args["action"]
+    
+    if action == "tab":
+        return _navigate_to_tab(match.args["tab_number"], command)
+    if action == "next":
+        return _navigate_next_tab(command)
+    if action == "previous":
+        return _navigate_previous_tab(command)
+    if action == "last":
+        return _navigate_to_last_tab(command)
+    
+    speak(match.args["message"])
+    return True
+
+
+def handle_tab_navigation(command):
+    """Handle tab navigation commands using Ctrl+number
     
-    return False
+    Returns True if command was handled, False otherwise
+    """
+    return run_handler(match_tab_navigation, execute_tab_navigation, command)
 
 
 def _navigate_to_tab(tab_number, command):
@@ -7,10 +7,11 @@ import gemini_client
 from handlers.personal_handler import handle_personal_questions
 from handlers.exit_handler import handle_exit
 from handlers.thank_you_handler import handle_thank_you
+from handlers.base import matched, run_handler
 
 
-def handle_text_input(command):
-    """Handle text/text mode commands for manual input
+def match_text_input(command):
+    """Match text/text mode commands for manual input
     
     Detects keywords like:
     - "I want to give you a text message"
@@ -19,22 +20,31 @@ def handle_text_input(command):
     - "Text input"
     - "Give me text mode"
     
-    When detected, prompts user to type their question manually
+    When matched, execute prompts user to type their question manually
     """
     # Keywords that trigger text mode
     text_keywords = r'\b(text|text\s+mode|text\s+input|text\s+message|manual\s+input)\b'
     
-    if not re.search(text_keywords, command, re.IGNORECASE):
-        return False
+    if not re.search(text_keywords, command.text):
+        return None
     
     # Check if this is actually a request for text mode vs just mentioning the word "text"
     # Filter out commands like "text message to" which should go to messaging
-    if re.search(r'\b(?:send|message|to|write)\s+(?:a\s+)?(?:text|message)\b', command, re.IGNORECASE):
+    if re.search(r'\b(?:send|message|to|write)\s+(?:a\s+)?(?:text|message)\b', command.text):
         # This might be a messaging command, not text mode
         # Only handle if it explicitly says "text mode" or "text input"
-        if not re.search(r'\btext\s+(?:mode|input)\b', command, re.IGNORECASE):
-            return False
+        if not re.search(r'\btext\s+(?:mode|input)\b', command.text):
+            return None
+    
+    return matched(command)
+
+
+def execute_text_input(match):
+    """Prompt for typed input and answer it
     
+    Returns "exit" when the typed text asks to quit, True when handled
+    """
+    command = match.command
     try:
         # Announce text mode activation
         speak("Entering text mode. Please type your question or command.")
@@ -74,12 +84,16 @@ def handle_text_input(command):
             # Personal handler already spoke the response
             return True
         
-        # Get response from Gemini if not a personal question
-        response = _process_text_input(user_text)
+        # Get response from Gemini if not a personal question (follow-ups
+        # are sent with the recent conversation)
+        prompt, context = gemini_client.conversation_prompt(user_text)
+        gemini_client.log_prompt_size(user_text, prompt, context)
+        response = _process_text_input(prompt)
         
         if response:
             print(f"\n📤 Response: {response}\n")
             speak(response)
+            gemini_client.remember_turn(user_text, response)
             log_interaction(user_text, response, source="text_input_gemini")
         else:
             speak("Sorry, I couldn't generate a response.")
@@ -99,6 +113,11 @@ def handle_text_input(command):
         return False
 
 
+def handle_text_input(command):
+    """Handle text/text mode commands for manual input (may return "exit")"""
+    return run_handler(match_text_input, execute_text_input, command)
+
+
 def _process_text_input(text_input):
     """Process the manually typed text through Gemini
     
@@ -114,7 +133,7 @@ def _process_text_input(text_input):
         if stream_flag:
             try:
                 # Try streaming first
-                gen = gemini_client.stream_generate(text_input)
+                gen = gemini_client.stream_generate(text_input, source="text_input_gemini")
                 
                 # Collect all chunks
                 chunks = []
@@ -123,11 +142,8 @@ def _process_text_input(text_input):
                         chunks.append(chunk)
                 
                 if chunks:
-                    response = " ".join(chunks)
-                    # Clean the response
-                    cleaned = gemini_client.normalize_response(response)
-                    final_response = gemini_client.strip_json_noise(cleaned)
-                    return final_response if final_response else response
+                    # Streamed deltas carry their own spacing
+                    return "".join(chunks)
                 else:
                     # Fallback to blocking if streaming returns nothing
                     return _get_blocking_response(text_input)
@@ -152,12 +168,8 @@ def _get_blocking_response(text_input):
         Response from Gemini API
     """
     try:
-        response = gemini_client.generate_response(text_input)
-        if response:
-            cleaned = gemini_client.normalize_response(response)
-            final_response = gemini_client.strip_json_noise(cleaned)
-            return final_response if final_response else response
-        return None
+        response = gemini_client.generate_response(text_input, source="text_input_gemini")
+        return response if response else None
     except Exception as e:
         print(f"Error in blocking call: {e}")
         return None
@@ -3,11 +3,20 @@ import re
 from config.settings import THANK_YOU_KEYWORDS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
+
+def match_thank_you(command):
+    """Match thank you commands"""
+    if any(phrase in command.text for phrase in THANK_YOU_KEYWORDS):
+        return matched(command)
+    return None
+
+def execute_thank_you(match):
+    """Respond to a thank you"""
+    speak("You are most welcome.... Happy to help you")
+    log_interaction(match.command, "You are most welcome.... Happy to help you", source="local")
+    return True
 
 def handle_thank_you(command):
     """Handle thank you commands"""
-    if any(phrase in command for phrase in THANK_YOU_KEYWORDS):
-        speak("You are most welcome.... Happy to help you")
-        log_interaction(command, "You are most welcome.... Happy to help you", source="local")
-        return True
-    return False
+    return run_handler(match_thank_you, execute_thank_you, command)
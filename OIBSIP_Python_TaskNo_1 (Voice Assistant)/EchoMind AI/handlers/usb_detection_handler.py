@@ -4,7 +4,9 @@ import threading
 import time
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from utils import metrics_endpoint
 from config.settings import OS
+from handlers.base import matched, run_handler
 
 # Track connected USB devices
 connected_usbs = set()
@@ -140,6 +142,7 @@ def monitor_usb_devices():
     check_interval = 2  # Check every 2 seconds
     
     while monitoring:
+        started = time.perf_counter()
         try:
             current_usbs = get_connected_usbs()
             
@@ -160,10 +163,12 @@ def monitor_usb_devices():
             # Update the current state
             connected_usbs = current_usbs
             
+            metrics_endpoint.MONITOR_LOOP_SECONDS.observe(time.perf_counter() - started, monitor="usb")
             time.sleep(check_interval)
         
         except Exception as e:
             # Silent fail - don't interrupt the assistant
+            metrics_endpoint.MONITOR_ERRORS.inc(monitor="usb")
             time.sleep(check_interval)
 
 
@@ -187,9 +192,9 @@ def stop_usb_monitoring():
     monitoring = False
 
 
-def handle_usb_detection(command):
-    """Handle USB detection queries"""
-    command_lower = command.lower()
+def match_usb_detection(command):
+    """Match USB detection queries"""
+    command_lower = command.text
     
     # Keywords that indicate USB DETECTION (not definition/information queries)
     detection_keywords = [
@@ -207,14 +212,18 @@ def handle_usb_detection(command):
     # Check if this is asking for USB information/definition (not detection)
     is_info_query = any(keyword in command_lower for keyword in exclusion_keywords)
     if is_info_query:
-        return False
+        return None
     
     # Check if this is a USB detection query
     is_usb_query = any(keyword in command_lower for keyword in detection_keywords)
     
     if not is_usb_query:
-        return False
-    
+        return None
+    return matched(command)
+
+
+def execute_usb_detection(match):
+    """List the connected USB devices"""
     # Get current USB devices
     current_usbs = get_connected_usbs()
     
@@ -231,5 +240,10 @@ def handle_usb_detection(command):
     
     print(response)
     speak(response)
-    log_interaction(command, response, source="usb_detection")
+    log_interaction(match.command, response, source="usb_detection")
     return True
+
+
+def handle_usb_detection(command):
+    """Handle USB detection queries"""
+    return run_handler(match_usb_detection, execute_usb_detection, command)
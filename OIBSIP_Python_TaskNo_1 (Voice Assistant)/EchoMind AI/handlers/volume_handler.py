@@ -6,6 +6,7 @@ import time
 from config.settings import OS
 from utils.voice_io import speak
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 # Flag to prevent F5 hotkey loop
 _F5_PRESS_IN_PROGRESS = False
@@ -284,139 +285,147 @@ def press_f5_key():
         _F5_PRESS_IN_PROGRESS = False
 
 
-def handle_volume(command):
-    """Handle volume control commands"""
-    if not re.search(r'\b(volume|sound|mute|unmute|increase|decrease|louder|quieter)\b', command, re.IGNORECASE):
-        return False
+def match_volume(command):
+    """Match volume control commands
+    
+    args["action"] is one of "unmute", "mute", "up", "down", "set" (with
+    args["percentage"]) or "clarify" when the intent is unclear.
+    """
+    if not re.search(r'\b(volume|sound|mute|unmute|increase|decrease|louder|quieter)\b', command.text):
+        return None
     
     # Exclude question/inquiry patterns (How to, What, Tell me, etc.) - should not trigger mute/unmute
-    if re.search(r'\b(how|what|why|tell|explain|show|can you|could you|would you)\b', command, re.IGNORECASE):
-        return False
+    if re.search(r'\b(how|what|why|tell|explain|show|can you|could you|would you)\b', command.text):
+        return None
     
     # Check for UNMUTE command - use F5 key
     # Patterns: "Unmute yourself", "Unmute system", "Unmute sound", "Unmute device sound", etc.
-    if re.search(r'\bunmute\b', command, re.IGNORECASE):
+    if re.search(r'\bunmute\b', command.text):
         # Make sure it's not just a percentage command like "volume 50" that contains word "mute"
-        if not re.search(r'set.*volume|volume\s*\d+|^\d+', command, re.IGNORECASE):
-            success = press_f5_key()
-            if success:
-                speak("Unmuting sound")
-                log_interaction(command, "Sound unmuted via F5 key press", source="local")
-            else:
-                speak("Unmuting sound - F5 key method unavailable")
-                log_interaction(command, "Unmute requested (F5 method failed)", source="local")
-            return True
+        if not re.search(r'set.*volume|volume\s*\d+|^\d+', command.text):
+            return matched(command, action="unmute")
     
     # Check for MUTE command - use F5 key
     # Patterns: "Mute yourself", "Mute system", "Mute sound", "Mute device", "Mute the device sound", etc.
-    if re.search(r'\bmute\b', command, re.IGNORECASE):
+    if re.search(r'\bmute\b', command.text):
         # Make sure it's not just a percentage command like "volume 50" that contains word "mute"
-        if not re.search(r'set.*volume|volume\s*\d+|^\d+', command, re.IGNORECASE):
-            success = press_f5_key()
-            if success:
-                speak("Muting sound")
-                log_interaction(command, "Sound muted via F5 key press", source="local")
-            else:
-                speak("Muting sound - F5 key method unavailable")
-                log_interaction(command, "Mute requested (F5 method failed)", source="local")
-            return True
+        if not re.search(r'set.*volume|volume\s*\d+|^\d+', command.text):
+            return matched(command, action="mute")
     
     # VOLUME UP - Increase volume using keyboard shortcut
-    if re.search(r'\b(increase|up|louder)\b', command, re.IGNORECASE) and re.search(r'\bvolume\b', command, re.IGNORECASE):
-        success = False
-        
-        # Method 1: Use keyboard module with media keys
-        if KEYBOARD_MODULE_AVAILABLE:
-            try:
-                for _ in range(5):  # Press volume up 5 times
+    if re.search(r'\b(increase|up|louder)\b', command.text) and re.search(r'\bvolume\b', command.text):
+        return matched(command, action="up")
+    
+    # VOLUME DOWN - Decrease volume using keyboard shortcut
+    if re.search(r'\b(decrease|down|lower|quieter)\b', command.text) and re.search(r'\bvolume\b', command.text):
+        return matched(command, action="down")
+    
+    # Try to parse a specific percentage - ONLY for explicit volume set commands
+    if re.search(r'(set\s+)?volume\s+to\s+(\d+)', command.text) or re.search(r'volume\s+at\s+(\d+)', command.text):
+        # Extract percentage more carefully
+        if command.numbers:
+            return matched(command, action="set", percentage=command.numbers[0])
+    
+    # If we matched volume/sound/mute but didn't handle it yet, ask for clarification
+    return matched(command, confidence=0.5, action="clarify")
+
+
+def _press_volume_key(primary, fallback, hotkey_direction):
+    """Press a volume media key 5 times, returning True if any press worked"""
+    success = False
+    
+    # Method 1: Use keyboard module with media keys
+    if KEYBOARD_MODULE_AVAILABLE:
+        try:
+            for _ in range(5):  # Press volume key 5 times
+                try:
+                    keyboard.press_and_release(primary)  # Try primary key name first
+                    time.sleep(0.1)
+                    success = True
+                except:
                     try:
-                        keyboard.press_and_release('volume_up')  # Try volume_up first
+                        keyboard.press_and_release(fallback)  # Fallback
                         time.sleep(0.1)
                         success = True
                     except:
-                        try:
-                            keyboard.press_and_release('volumeup')  # Fallback
-                            time.sleep(0.1)
-                            success = True
-                        except:
-                            pass
-            except Exception as e:
-                print(f"Keyboard volume up failed: {e}")
-        
-        # Method 2: Try using keyboard with different key names
-        if not success and KEYBOARD_MODULE_AVAILABLE:
-            try:
-                for _ in range(5):
-                    keyboard.hotkey('shift', 'alt', 'up')  # Windows media key alternative
-                    time.sleep(0.1)
-                success = True
-            except Exception:
-                pass
-        
+                        pass
+        except Exception as e:
+            print(f"Keyboard volume {hotkey_direction} failed: {e}")
+    
+    # Method 2: Try using keyboard with different key names
+    if not success and KEYBOARD_MODULE_AVAILABLE:
+        try:
+            for _ in range(5):
+                keyboard.hotkey('shift', 'alt', hotkey_direction)  # Windows media key alternative
+                time.sleep(0.1)
+            success = True
+        except Exception:
+            pass
+    
+    return success
+
+
+def execute_volume(match):
+    """Perform the matched volume action"""
+    command = match.command
+    action = match.args["action"]
+    
+    if action == "unmute":
+        success = press_f5_key()
+        if success:
+            speak("Unmuting sound")
+            log_interaction(command, "Sound unmuted via F5 key press", source="local")
+        else:
+            speak("Unmuting sound - F5 key method unavailable")
+            log_interaction(command, "Unmute requested (F5 method failed)", source="local")
+        return True
+    
+    if action == "mute":
+        success = press_f5_key()
+        if success:
+            speak("Muting sound")
+            log_interaction(command, "Sound muted via F5 key press", source="local")
+        else:
+            speak("Muting sound - F5 key method unavailable")
+            log_interaction(command, "Mute requested (F5 method failed)", source="local")
+        return True
+    
+    if action == "up":
+        success = _press_volume_key('volume_up', 'volumeup', 'up')
         speak("Increasing volume")
         log_interaction(command, "Volume increased" if success else "Volume up requested", source="local")
         return True
     
-    # VOLUME DOWN - Decrease volume using keyboard shortcut
-    if re.search(r'\b(decrease|down|lower|quieter)\b', command, re.IGNORECASE) and re.search(r'\bvolume\b', command, re.IGNORECASE):
-        success = False
-        
-        # Method 1: Use keyboard module with media keys
-        if KEYBOARD_MODULE_AVAILABLE:
-            try:
-                for _ in range(5):  # Press volume down 5 times
-                    try:
-                        keyboard.press_and_release('volume_down')  # Try volume_down first
-                        time.sleep(0.1)
-                        success = True
-                    except:
-                        try:
-                            keyboard.press_and_release('volumedown')  # Fallback
-                            time.sleep(0.1)
-                            success = True
-                        except:
-                            pass
-            except Exception as e:
-                print(f"Keyboard volume down failed: {e}")
-        
-        # Method 2: Try using keyboard with different key names
-        if not success and KEYBOARD_MODULE_AVAILABLE:
-            try:
-                for _ in range(5):
-                    keyboard.hotkey('shift', 'alt', 'down')  # Windows media key alternative
-                    time.sleep(0.1)
-                success = True
-            except Exception:
-                pass
-        
+    if action == "down":
+        success = _press_volume_key('volume_down', 'volumedown', 'down')
         speak("Decreasing volume")
         log_interaction(command, "Volume decreased" if success else "Volume down requested", source="local")
         return True
     
-    # Try to parse a specific percentage - ONLY for explicit volume set commands
-    if re.search(r'(set\s+)?volume\s+to\s+(\d+)', command, re.IGNORECASE) or re.search(r'volume\s+at\s+(\d+)', command, re.IGNORECASE):
-        # Extract percentage more carefully
-        match = re.search(r'(\d{1,3})\s*%?(?:\s*percent)?', command)
-        if match:
-            perc = int(match.group(1))
-            
-            # VALIDATE: Reject invalid percentages
-            if perc < 0 or perc > 100:
-                speak(f"Volume must be between 0 and 100 percent. You said {perc} percent which is invalid.")
-                log_interaction(command, f"Invalid volume {perc}% (out of range)", source="local")
-                return True
-            
-            success = set_volume(perc)
-            
-            if success:
-                speak(f"Volume set to {perc} percent")
-                log_interaction(command, f"Volume set to {perc}%", source="local")
-            else:
-                speak("Volume control attempted but may not be fully supported on this system.")
-                log_interaction(command, f"Volume set to {perc}% attempted", source="local")
+    if action == "set":
+        perc = match.args["percentage"]
+        
+        # VALIDATE: Reject invalid percentages
+        if perc < 0 or perc > 100:
+            speak(f"Volume must be between 0 and 100 percent. You said {perc} percent which is invalid.")
+            log_interaction(command, f"Invalid volume {perc}% (out of range)", source="local")
             return True
+        
+        success = set_volume(perc)
+        
+        if success:
+            speak(f"Volume set to {perc} percent")
+            log_interaction(command, f"Volume set to {perc}%", source="local")
+        else:
+            speak("Volume control attempted but may not be fully supported on this system.")
+            log_interaction(command, f"Volume set to {perc}% attempted", source="local")
+        return True
     
-    # If we matched volume/sound/mute but didn't handle it yet, ask for clarification
     speak("I can change volume if you tell me a percentage, for example 'set volume to 60 percent', or say 'volume up', 'volume down', 'mute', or 'unmute'.")
     log_interaction(command, "Volume command - clarification needed", source="local")
     return True
+
+
+def handle_volume(command):
+    """Handle volume control commands"""
+    return run_handler(match_volume, execute_volume, command)
@@ -6,6 +6,7 @@ import time
 from config.settings import OS, WEBSITE_MAP
 from utils.voice_io import speak, listen
 from utils.logger import log_interaction
+from handlers.base import matched, run_handler
 
 def handle_web_search(command):
     """Handle web search commands"""
@@ -15,20 +16,31 @@ def handle_web_search(command):
     log_interaction(command, f"Search opened: {command}", source="local")
 
 
-def handle_whatsapp_web(command):
-    """Handle WhatsApp Web commands"""
-    command_lower = command.lower()
+def match_whatsapp_web(command):
+    """Match WhatsApp Web commands"""
+    command_lower = command.text
     
     # Check if it's a WhatsApp command
     if not re.search(r'\b(open|launch|start)\b.*\bwhatsapp\b', command_lower):
-        return False
+        return None
     
     # Check if user wants to message someone
-    if re.search(r'\bmessage\b|\btext\b|\bsend\b', command_lower):
+    wants_message = bool(re.search(r'\bmessage\b|\btext\b|\bsend\b', command_lower))
+    contact = None
+    if wants_message:
         # Extract contact name if possible
         message_match = re.search(r'(?:message|text|send)\s+(?:to\s+)?(.+?)(?:\s+(?:on|via))?$', command_lower)
         contact = message_match.group(1).strip() if message_match else None
-        
+    
+    return matched(command, wants_message=wants_message, contact=contact)
+
+
+def execute_whatsapp_web(match):
+    """Open WhatsApp Web"""
+    command = match.command
+    contact = match.args["contact"]
+    
+    if match.args["wants_message"]:
         try:
             # Open WhatsApp Web
             whatsapp_url = "https://web.whatsapp.com/"
@@ -70,18 +82,23 @@ def handle_whatsapp_web(command):
             speak("Sorry, I couldn't open WhatsApp Web.")
             return False
 
-def handle_browser_search(command):
-    """Handle browser-based search and opening"""
+
+def handle_whatsapp_web(command):
+    """Handle WhatsApp Web commands"""
+    return run_handler(match_whatsapp_web, execute_whatsapp_web, command)
+
+def match_browser_search(command):
+    """Match browser-based search and opening"""
     # Pattern: check for browser mention with "on" or "in" separator
     # More flexible to catch various search intents
-    if not re.search(r'\b(on|in)\b.*\b(chrome|firefox|edge|google|browser)\b', command, re.IGNORECASE):
-        return False
+    if not re.search(r'\b(on|in)\b.*\b(chrome|firefox|edge|google|browser)\b', command.text):
+        return None
     
     # Make sure it's not a pure weather query (has "weather" without action words)
-    if re.search(r'\bweather\b', command, re.IGNORECASE) and not re.search(r'\b(search|open|look|find|check|get)\b', command, re.IGNORECASE):
-        return False
+    if re.search(r'\bweather\b', command.text) and not re.search(r'\b(search|open|look|find|check|get)\b', command.text):
+        return None
     
-    command_lower = command.lower()
+    command_lower = command.text
     
     # Extract browser
     browser = None
@@ -119,76 +136,92 @@ def handle_browser_search(command):
                     break
             query = query_part
     
-    if browser and query:
-        try:
-            # Check if query is a URL or a search term
-            if query.startswith("http://") or query.startswith("https://") or "." in query:
-                url = query if query.startswith("http") else f"https://{query}"
-            else:
-                url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-            
-            # Launch the browser
-            if browser == "chrome":
-                if OS == "windows":
-                    subprocess.Popen(["cmd", "/c", f"start chrome {url}"], shell=True)
-                elif OS == "darwin":
-                    subprocess.Popen(["open", "-a", "Google Chrome", url])
-                elif OS == "linux":
-                    subprocess.Popen(["google-chrome", url])
-            elif browser == "firefox":
-                if OS == "windows":
-                    subprocess.Popen(["cmd", "/c", f"start firefox {url}"], shell=True)
-                elif OS == "darwin":
-                    subprocess.Popen(["open", "-a", "Firefox", url])
-                elif OS == "linux":
-                    subprocess.Popen(["firefox", url])
-            elif browser == "edge":
-                if OS == "windows":
-                    subprocess.Popen(["cmd", "/c", f"start msedge {url}"], shell=True)
-                elif OS == "darwin":
-                    subprocess.Popen(["open", "-a", "Microsoft Edge", url])
-                elif OS == "linux":
-                    subprocess.Popen(["microsoft-edge", url])
-            
-            speak(f"Searching for {query} on {browser_name}")
-            log_interaction(command, f"Opened {query} on {browser_name}", source="local")
-            return True
-        except Exception as e:
-            speak("Sorry, I couldn't open that in the browser.")
-            print(f"Browser opening error: {e}")
-            return False
+    if not (browser and query):
+        return None
     
-    return False
-
-def handle_website_opening(command):
-    """Handle website opening commands"""
-    if not re.search(r'\b(open|visit|go to)\b\s+(youtube|wikipedia|reddit|github|facebook|twitter|instagram|gmail|google\.com|stack\s*overflow)', command, re.IGNORECASE):
-        return False
-    
-    command_lower = command.lower()
-    
-    # Find which website was mentioned
-    website = None
-    for site_key in WEBSITE_MAP:
-        if site_key in command_lower:
-            website = site_key
-            break
+    # Check if query is a URL or a search term
+    if query.startswith("http://") or query.startswith("https://") or "." in query:
+        url = query if query.startswith("http") else f"https://{query}"
+    else:
+        url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
     
-    if website:
-        try:
-            url = WEBSITE_MAP[website]
+    return matched(command, browser=browser, browser_name=browser_name, query=query, url=url)
+
+def execute_browser_search(match):
+    """Launch the matched browser on the search or URL"""
+    browser = match.args["browser"]
+    browser_name = match.args["browser_name"]
+    query = match.args["query"]
+    url = match.args["url"]
+    try:
+        # Launch the browser
+        if browser == "chrome":
             if OS == "windows":
                 subprocess.Popen(["cmd", "/c", f"start chrome {url}"], shell=True)
             elif OS == "darwin":
                 subprocess.Popen(["open", "-a", "Google Chrome", url])
             elif OS == "linux":
                 subprocess.Popen(["google-chrome", url])
-            speak(f"Opening {website}")
-            log_interaction(command, f"Opened {website}", source="local")
-            return True
-        except Exception as e:
-            speak(f"Sorry, I couldn't open {website}.")
-            print(f"Error: {e}")
-            return False
+        elif browser == "firefox":
+            if OS == "windows":
+                subprocess.Popen(["cmd", "/c", f"start firefox {url}"], shell=True)
+            elif OS == "darwin":
+                subprocess.Popen(["open", "-a", "Firefox", url])
+            elif OS == "linux":
+                subprocess.Popen(["firefox", url])
+        elif browser == "edge":
+            if OS == "windows":
+                subprocess.Popen(["cmd", "/c", f"start msedge {url}"], shell=True)
+            elif OS == "darwin":
+                subprocess.Popen(["open", "-a", "Microsoft Edge", url])
+            elif OS == "linux":
+                subprocess.Popen(["microsoft-edge", url])
+        
+        speak(f"Searching for {query} on {browser_name}")
+        log_interaction(match.command, f"Opened {query} on {browser_name}", source="local")
+        return True
+    except Exception as e:
+        speak("Sorry, I couldn't open that in the browser.")
+        print(f"Browser opening error: {e}")
+        return False
+
+def handle_browser_search(command):
+    """Handle browser-based search and opening"""
+    return run_handler(match_browser_search, execute_browser_search, command)
+
+def match_website_opening(command):
+    """Match website opening commands"""
+    if not re.search(r'\b(open|visit|go to)\b\s+(youtube|wikipedia|reddit|github|facebook|twitter|instagram|gmail|google\.com|stack\s*overflow)', command.text):
+        return None
+    
+    command_lower = command.text
     
-    return False
+    # Find which website was mentioned
+    for site_key in WEBSITE_MAP:
+        if site_key in command_lower:
+            return matched(command, website=site_key)
+    
+    return None
+
+def execute_website_opening(match):
+    """Open the matched website"""
+    website = match.args["website"]
+    try:
+        url = WEBSITE_MAP[website]
+        if OS == "windows":
+            subprocess.Popen(["cmd", "/c", f"start chrome {url}"], shell=True)
+        elif OS == "darwin":
+            subprocess.Popen(["open", "-a", "Google Chrome", url])
+        elif OS == "linux":
+            subprocess.Popen(["google-chrome", url])
+        speak(f"Opening {website}")
+        log_interaction(match.command, f"Opened {website}", source="local")
+        return True
+    except Exception as e:
+        speak(f"Sorry, I couldn't open {website}.")
+        print(f"Error: {e}")
+        return False
+
+def handle_website_opening(command):
+    """Handle website opening commands"""
+    return run_handler(match_website_opening, execute_website_opening, command)
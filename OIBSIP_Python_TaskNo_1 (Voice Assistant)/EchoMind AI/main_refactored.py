@@ -3,106 +3,171 @@ EchoMind AI - Main entry point for the voice assistant
 This refactored version uses modular architecture for better maintainability
 """
 import os
+import sys
+import threading
 import time
+
+# --profile-startup times every import from here on (see utils/startup_profiler.py)
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    from utils import startup_profiler
+    startup_profiler.install()
+
 from dotenv import load_dotenv
 
 # Load environment variables BEFORE importing other modules
 load_dotenv()
 
-# Import all handlers
-from handlers.thank_you_handler import handle_thank_you
-from handlers.greeting_handler import handle_greeting
-from handlers.time_handler import handle_time
-from handlers.date_handler import handle_date
-from handlers.simple_weather_handler import handle_simple_city_weather
-from handlers.weather_handler import handle_weather
-from handlers.web_handler import handle_browser_search, handle_website_opening, handle_whatsapp_web
-from handlers.file_handler import handle_file_opening
-from handlers.file_writing_handler import handle_file_writing
-from handlers.app_handler import handle_app_opening
-from handlers.personal_handler import handle_personal_questions
-from handlers.text_input_handler import handle_text_input
-from handlers.brightness_handler import handle_brightness
-from handlers.resume_handler import handle_resume_opening
-from handlers.close_app_handler import handle_app_closing
-from handlers.tab_navigation_handler import handle_tab_navigation
-from handlers.system_folder_handler import handle_system_folder_opening
-from handlers.music_handler import handle_play_music, handle_play_on_youtube
-from handlers.exit_handler import handle_exit
-from handlers.battery_handler import handle_battery_status, start_battery_monitoring, stop_battery_monitoring
-from handlers.usb_detection_handler import handle_usb_detection, start_usb_monitoring, stop_usb_monitoring
-from handlers.volume_handler import handle_volume
+# Handler modules are imported lazily, the first time one of their triggers fires
+from handlers.registry import lazy_handler
 
 # Import utilities
 from utils.voice_io import speak, listen, speak_stream
+from utils import audio_capture, log_writer, metrics_endpoint, mic_session, tracing, tts, voice_io
 from utils.text_processing import convert_spoken_symbols, is_symbol_only, ensure_question_mark_if_question
 from utils.time_utils import get_greeting
 from utils.logger import log_interaction
+from utils.dispatcher import IntentDispatcher, Triggers
+from utils.command import parse_command
+from config.settings import GEMINI_SPECULATIVE, THANK_YOU_KEYWORDS
+
 
-# Import specific functions for global hotkeys
-from handlers.emoji_handler import open_emoji, handle_emoji_mode
-from handlers.volume_handler import press_f5_key
+# Handler table in priority order. Each entry names a handler module's pure
+# match phase and its execute phase, and lists the words or phrases that must
+# appear in the command before it can match, so the dispatcher skips handlers
+# that would only decline (and never imports modules nobody has asked for).
+HANDLERS = [
+    ("Text input", lazy_handler("text_input_handler", "text_input"),
+     Triggers(keywords=("text", "manual"))),
+    ("Thank you", lazy_handler("thank_you_handler", "thank_you"),
+     Triggers(phrases=THANK_YOU_KEYWORDS)),
+    ("Greeting", lazy_handler("greeting_handler", "greeting"),
+     Triggers(keywords=("hello", "hi", "hey", "greetings"))),
+    ("Emoji mode", lazy_handler("emoji_handler", "emoji_mode"),
+     Triggers(phrases=("emoji",))),
+    ("Time", lazy_handler("time_handler", "time"),
+     Triggers(keywords=("time",))),
+    ("Date", lazy_handler("date_handler", "date"),
+     Triggers(keywords=("date", "day"))),
+    ("Resume opening", lazy_handler("resume_handler", "resume_opening"),  # NEW - Resume file handler
+     Triggers(keywords=("resume", "cv", "c", "curriculum", "curriculam"))),
+    ("USB detection", lazy_handler("usb_detection_handler", "usb_detection"),
+     Triggers(phrases=(
+         "detect", "connected", "any usb", "is there", "how many", "list",
+         "available", "pendrive", "pen drive", "flash drive", "external drive",
+         "removable", "storage device", "drives present"))),
+    ("Browser search", lazy_handler("web_handler", "browser_search"),
+     Triggers(keywords=("chrome", "firefox", "edge", "google", "browser"))),
+    ("Website opening", lazy_handler("web_handler", "website_opening"),
+     Triggers(keywords=("open", "visit", "go"))),
+    ("Simple city weather", lazy_handler("simple_weather_handler", "simple_city_weather"),
+     Triggers(when=lambda words: len(words) == 1)),
+    ("Weather", lazy_handler("weather_handler", "weather"),
+     Triggers(keywords=("weather", "forecast", "temperature"))),
+    ("WhatsApp", lazy_handler("web_handler", "whatsapp_web"),
+     Triggers(keywords=("whatsapp",))),
+    ("Battery status", lazy_handler("battery_handler", "battery_status"),
+     Triggers(phrases=("battery", "charge", "charging"))),
+    ("Volume control", lazy_handler("volume_handler", "volume"),
+     Triggers(keywords=(
+         "volume", "sound", "mute", "unmute", "increase", "decrease", "louder", "quieter"))),
+    ("File writing", lazy_handler("file_writing_handler", "file_writing"),
+     Triggers(keywords=("write",))),
+    ("Music (YouTube play)", lazy_handler("music_handler", "play_on_youtube"),
+     Triggers(keywords=("youtube",))),
+    ("Music (play)", lazy_handler("music_handler", "play_music"),
+     Triggers(keywords=("play",))),
+    ("File opening", lazy_handler("file_handler", "file_opening"),
+     Triggers(keywords=("open", "show"))),
+    ("System folder opening", lazy_handler("system_folder_handler", "system_folder_opening"),
+     Triggers(keywords=("close", "eject", "unmount", "open", "access", "go", "navigate"))),
+    ("App opening", lazy_handler("app_handler", "app_opening"),
+     Triggers(keywords=("open", "launch", "start"))),
+    ("Personal questions", lazy_handler("personal_handler", "personal_questions"),
+     Triggers(keywords=("babin", "b", "how", "your", "who", "what"))),
+    ("Brightness control", lazy_handler("brightness_handler", "brightness"),
+     Triggers(keywords=("brightness",))),
+    ("Tab navigation", lazy_handler("tab_navigation_handler", "tab_navigation"),
+     Triggers(keywords=("move", "go", "switch", "navigate"))),
+    ("App closing", lazy_handler("close_app_handler", "app_closing"),
+     Triggers(keywords=("close", "shut", "kill", "terminate", "stop"), phrases=("tab",))),
+    ("Exit", lazy_handler("exit_handler", "exit"),
+     Triggers(keywords=(
+         "exit", "quit", "stop", "bye", "goodbye", "terminate",
+         "close", "end", "finish", "wrap",
+         "i", "all", "nothing", "no", "done",
+         "good", "see", "take", "farewell"))),
+]
 
-# Import Gemini client
-import gemini_client
+dispatcher = IntentDispatcher(HANDLERS)
 
 
 def route_command(command):
-    """Route command to appropriate handler"""
-    handlers = [
-        ("Text input", handle_text_input),
-        ("Thank you", handle_thank_you),
-        ("Greeting", handle_greeting),
-        ("Emoji mode", handle_emoji_mode),
-        ("Time", handle_time),
-        ("Date", handle_date),
-        ("Resume opening", handle_resume_opening),  # NEW - Resume file handler
-        ("USB detection", handle_usb_detection),
-        ("Browser search", handle_browser_search),
-        ("Website opening", handle_website_opening),
-        ("Simple city weather", handle_simple_city_weather),
-        ("Weather", handle_weather),
-        ("WhatsApp", handle_whatsapp_web),
-        ("Battery status", handle_battery_status),
-        ("Volume control", handle_volume),
-        ("File writing", handle_file_writing),
-        ("Music (YouTube play)", handle_play_on_youtube),
-        ("Music (play)", handle_play_music),
-        ("File opening", handle_file_opening),
-        ("System folder opening", handle_system_folder_opening),
-        ("App opening", handle_app_opening),
-        ("Personal questions", handle_personal_questions),
-        ("Brightness control", handle_brightness),
-        ("Tab navigation", handle_tab_navigation),
-        ("App closing", handle_app_closing),
-        ("Exit", handle_exit),
-    ]
+    """Route command to appropriate handler
     
-    for handler_name, handler in handlers:
-        if handler_name == "Text input":
-            # Special case for text input - can return "exit"
-            result = handle_text_input(command)
-            if result == "exit":
-                return "exit"
-            elif result:
-                return "handled"
-        elif handler_name == "Exit":
-            # Special case for exit
-            if handle_exit(command):
-                return "exit"
-        else:
-            if handler(command):
-                return "handled"
-    
-    return "not_handled"
+    command is parsed into a Command once (a Command is used as-is) and that
+    same object is shared by the dispatcher and every handler's match phase.
+    Candidates are matched in priority order; the first match is executed.
+    If execution declines (returns False), routing continues with the next one.
+    """
+    started = time.perf_counter()
+    handler_seconds = 0.0
+    try:
+        with tracing.span("route") as route_span:
+            command = parse_command(command)
+            for handler_name, handler, match in dispatcher.matches(command):
+                handler_started = time.perf_counter()
+                with tracing.span("handler:" + handler_name) as handler_span:
+                    result = handler.execute(match)
+                    handler_span.set(result=str(result))
+                elapsed = time.perf_counter() - handler_started
+                handler_seconds += elapsed
+                metrics_endpoint.HANDLER_SECONDS.observe(elapsed, handler=handler_name)
+                if result:
+                    metrics_endpoint.HANDLER_HITS.inc(handler=handler_name)
+                # Text input can return "exit", and a matched Exit always exits
+                if result == "exit" or (result and handler_name == "Exit"):
+                    route_span.set(handler=handler_name)
+                    return "exit"
+                elif result:
+                    route_span.set(handler=handler_name)
+                    return "handled"
+            
+            metrics_endpoint.HANDLER_HITS.inc(handler="gemini")
+            return "not_handled"
+    finally:
+        metrics_endpoint.ROUTE_SECONDS.observe(time.perf_counter() - started - handler_seconds)
 
 
-def handle_gemini_fallback(command):
+def handle_gemini_fallback(command, speculation=None):
     """Handle unknown commands with Gemini
     
     Note: 'command' parameter should already have ? added if it's a question
     from the main() function's ensure_question_mark_if_question() call
+
+    The request can be aborted: in background listen mode saying "stop"
+    cancels it (see voice_io.watch_for_interrupt).
+
+    speculation is a request for this command started before routing (see
+    start_speculation()); it is used instead of sending a new one.
     """
+    with tracing.span("gemini_fallback"):
+        _gemini_fallback(command, speculation)
+
+
+def _gemini_fallback(command, speculation):
+    # Imported on the first fallback rather than at startup
+    import gemini_async
+    import gemini_client
+    
+    # Follow-up questions are sent with the recent conversation
+    prompt, context = gemini_client.conversation_prompt(command)
+    gemini_client.log_prompt_size(command, prompt, context)
+    if speculation is not None and speculation.prompt != prompt:
+        speculation.cancel("different command")
+        speculation = None
+    cancel_token = speculation.token if speculation is not None else gemini_async.CancelToken()
+    watcher = voice_io.watch_for_interrupt(lambda: cancel_token.cancel("user said stop"))
     try:
         # Use command as-is (already formatted with ? in main if needed)
         formatted_command = command
@@ -110,69 +175,126 @@ def handle_gemini_fallback(command):
         stream_flag = os.getenv("GEMINI_API_STREAM", "").lower() in ("1", "true", "yes")
         if stream_flag:
             try:
-                # Get streaming chunks
-                gen = gemini_client.stream_generate(command)
-                # Assemble complete response without printing
+                # Get streaming chunks and speak each sentence as soon as it is complete
+                if speculation is not None and speculation.stream:
+                    gen = speculation.chunks()
+                else:
+                    gen = gemini_async.stream_generate_cancellable(prompt, cancel_token)
                 final_text = speak_stream(gen)
                 
                 if not final_text or not final_text.strip():
                     print(f"DEBUG: Empty response from stream_generate for: {command}")
                     # Try blocking call as fallback
-                    response = gemini_client.generate_response(command)
-                    if response and "trouble" not in response.lower():
+                    response = gemini_async.generate_response_cancellable(prompt, cancel_token)
+                    if gemini_client.is_answer(response):
                         print(response)
                         speak(response)
+                        gemini_client.remember_turn(formatted_command, response)
                         log_interaction(formatted_command, response, source="gemini_fallback")
                     else:
                         speak("Sorry, I couldn't generate a response.")
                         log_interaction(formatted_command, "No response returned", source="gemini_stream")
                     return
                 
-                # Normalize and clean the complete response
-                cleaned = gemini_client.normalize_response(final_text)
-                final_clean = gemini_client.strip_json_noise(cleaned)
-                
-                # Use cleaned response if available, otherwise use final_text
-                response_to_use = final_clean if final_clean else final_text
-                if response_to_use and response_to_use.strip():
-                    # Print and speak ONCE (no ? added to response)
-                    print(response_to_use)
-                    speak(response_to_use)
-                    log_interaction(formatted_command, response_to_use, source="gemini_stream")
-                else:
-                    speak("Sorry, I couldn't generate a response.")
-                    log_interaction(formatted_command, "No response returned", source="gemini_stream")
+                # Already spoken sentence by sentence
+                metrics = voice_io.last_stream_metrics
+                if metrics and metrics.first_audio is not None:
+                    print(f"Time to first audio: {metrics.first_audio * 1000:.0f} ms "
+                          f"({metrics.sentences} sentences, stream took {metrics.total * 1000:.0f} ms)")
+                gemini_client.remember_turn(formatted_command, final_text)
+                log_interaction(formatted_command, final_text, source="gemini_stream")
                 
+            except gemini_async.RequestCancelled:
+                raise
             except Exception as e:
                 print(f"Streaming error: {e}")
                 speak("Sorry, there was an error with streaming response.")
                 log_interaction(formatted_command, f"Streaming error: {e}", source="gemini_stream")
         else:
-            response = gemini_client.generate_response(command)
+            if speculation is not None and not speculation.stream:
+                response = speculation.result()
+            else:
+                response = gemini_async.generate_response_cancellable(prompt, cancel_token)
             if response:
-                cleaned = gemini_client.normalize_response(response)
-                final_clean = gemini_client.strip_json_noise(cleaned)
-                
-                if final_clean:
-                    print(final_clean)
-                    speak(final_clean)
-                    log_interaction(formatted_command, final_clean, source="gemini")
-                else:
-                    print(response)
-                    speak(response)
-                    log_interaction(formatted_command, response, source="gemini")
+                # Already extracted by the client: spoken as returned
+                print(response)
+                speak(response)
+                gemini_client.remember_turn(formatted_command, response)
+                log_interaction(formatted_command, response, source="gemini")
             else:
                 speak("Sorry, I couldn't generate a response.")
                 log_interaction(formatted_command, "No response returned", source="gemini")
+    except gemini_async.RequestCancelled as e:
+        # Drop sentences that were queued but not spoken yet
+        tts.clear()
+        print(f"Gemini request cancelled ({e})")
+        speak("Okay.")
+        log_interaction(command, "Cancelled", source="gemini")
     except Exception as e:
         print(f"Gemini error: {e}")
         speak("Sorry, I couldn't process that right now.")
         log_interaction(command, f"Error: {e}", source="gemini")
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if speculation is not None and speculation.saved is not None:
+            print(f"Speculative request saved {speculation.saved * 1000:.0f} ms")
 
 
-def main():
-    """Main function - voice assistant loop"""
+def start_speculation(command):
+    """Start the Gemini request for a question before routing (GEMINI_SPECULATIVE)
+
+    Returns None for commands that are not questions; the caller cancels the
+    request if a handler takes the command, or passes it to
+    handle_gemini_fallback().
+    """
+    if not (GEMINI_SPECULATIVE and command.endswith("?")):
+        return None
+    import gemini_async
+    import gemini_client
+    stream_flag = os.getenv("GEMINI_API_STREAM", "").lower() in ("1", "true", "yes")
+    return gemini_async.Speculation(gemini_client.conversation_prompt(command)[0], stream=stream_flag)
+
+
+def _hotkey_open_emoji():
+    """F1 hotkey action (the emoji handler is imported on the first press)"""
+    from handlers.emoji_handler import open_emoji
+    open_emoji()
+
+
+def _hotkey_press_f5():
+    """F5 hotkey action (the volume handler is imported on the first press)"""
+    from handlers.volume_handler import press_f5_key
+    press_f5_key()
+
+
+def _warm_up_gemini():
+    """Import the Gemini client and open its HTTP connection ahead of the first question"""
+    import gemini_async
+    gemini_async.warm_up()
+
+
+def main(profile_startup=False):
+    """Main function - voice assistant loop
+    
+    With profile_startup, report import times and the time to first greeting
+    once startup has finished, then exit.
+    """
+    # Greet first: speech is queued on the TTS worker, and monitors and
+    # hotkeys are set up while it plays
+    greeting = get_greeting()
+    if profile_startup:
+        startup_profiler.mark("first greeting started")
+    speak(greeting, wait=profile_startup)
+    if profile_startup:
+        startup_profiler.mark("first greeting spoken")
+    else:
+        # Connection setup to Gemini happens while the greeting plays
+        threading.Thread(target=_warm_up_gemini, name="gemini-warmup", daemon=True).start()
+    
     # Start background monitoring threads
+    from handlers.battery_handler import start_battery_monitoring, stop_battery_monitoring
+    from handlers.usb_detection_handler import start_usb_monitoring, stop_usb_monitoring
     start_battery_monitoring()
     start_usb_monitoring()
     
@@ -186,14 +308,14 @@ def main():
                 if key == _pynput_keyboard.Key.f1:
                     print("Global hotkey: F1 pressed -> sending Win+. to open emoji picker")
                     try:
-                        open_emoji()
+                        _hotkey_open_emoji()
                         log_interaction("F1 (hotkey)", "Win+. sent for emoji picker", source="hotkey")
                     except Exception as e:
                         print(f"Error opening emoji from hotkey: {e}")
                 elif key == _pynput_keyboard.Key.f5:
                     print("Global hotkey: F5 pressed -> pressing F5 key for mute/unmute")
                     try:
-                        press_f5_key()
+                        _hotkey_press_f5()
                         log_interaction("F5 (hotkey)", "F5 key pressed for mute/unmute", source="hotkey")
                     except Exception as e:
                         print(f"Error pressing F5 from hotkey: {e}")
@@ -213,59 +335,96 @@ def main():
                 def _f1_hotkey():
                     print('Hotkey f1 -> Win+. for emoji')
                     try:
-                        open_emoji()
+                        _hotkey_open_emoji()
                         log_interaction('F1 (hotkey)', 'Win+. sent for emoji picker', source='hotkey')
                     except Exception as e:
                         print(f"F1 hotkey error: {e}")
 
                 _keyboard.add_hotkey('f1', _f1_hotkey)
-                _keyboard.add_hotkey('f5', lambda: (print('Hotkey f5 -> press F5 for mute/unmute'), press_f5_key(), log_interaction('F5 (hotkey)', 'F5 key pressed for mute/unmute', source='hotkey')))
+                _keyboard.add_hotkey('f5', lambda: (print('Hotkey f5 -> press F5 for mute/unmute'), _hotkey_press_f5(), log_interaction('F5 (hotkey)', 'F5 key pressed for mute/unmute', source='hotkey')))
                 print("Global hotkey listener started (keyboard module)")
             except Exception as e:
                 print(f"Failed to register hotkeys with keyboard module: {e}")
         except Exception:
             print("No global hotkey support available (pynput and keyboard modules missing)")
     
-    greeting = get_greeting()
-    speak(greeting)
+    if profile_startup:
+        startup_profiler.mark("monitors and hotkeys ready")
+        startup_profiler.uninstall()
+        startup_profiler.report()
+        stop_battery_monitoring()
+        stop_usb_monitoring()
+        tts.shutdown()
+        return
+    
+    # Prometheus endpoint for live counters and latencies (METRICS_PORT)
+    metrics_endpoint.start_server()
     
     try:
         while True:
-            # Listen for command
-            command = listen()
-            if not command:
-                continue
+            # Every utterance is traced from listening to the end of its answer (TRACE)
+            with tracing.utterance() as trace:
+                # Listen for command
+                command = listen()
+                if not command:
+                    continue
+                trace.label(command)
+                metrics_endpoint.UTTERANCES.inc()
             
-            # Convert spoken symbols to actual punctuation marks
-            command = convert_spoken_symbols(command)
+                # Convert spoken symbols to actual punctuation marks
+                command = convert_spoken_symbols(command)
             
-            # Skip if command is only symbols
-            if command and is_symbol_only(command):
-                speak("I didn't catch a complete command. Could you please say something more?")
-                continue
+                # Skip if command is only symbols
+                if command and is_symbol_only(command):
+                    speak("I didn't catch a complete command. Could you please say something more?")
+                    continue
             
-            # Format command with ? if it's a question (for logging)
-            formatted_command = ensure_question_mark_if_question(command, None)
+                # Format command with ? if it's a question (for logging)
+                formatted_command = ensure_question_mark_if_question(command, None)
             
-            # Route the command to handlers
-            result = route_command(formatted_command)
+                # Questions can go to Gemini while the handlers are matched
+                speculation = start_speculation(formatted_command)
             
-            if result == "exit":
-                speak("Goodbye!")
-                break
-            elif result == "handled":
-                # Handler already processed the command
-                time.sleep(0.5)  # Small delay to avoid rate limiting
-                continue
-            else:
-                # No handler matched, try Gemini
-                handle_gemini_fallback(formatted_command)
-                time.sleep(0.5)  # Small delay between API calls to avoid rate limiting
+                # Parse once, then route the command to handlers
+                try:
+                    result = route_command(parse_command(formatted_command))
+                except BaseException:
+                    if speculation is not None:
+                        speculation.cancel("routing failed")
+                    raise
+            
+                if result != "not_handled" and speculation is not None:
+                    speculation.cancel()
+                if result == "exit":
+                    speak("Goodbye!")
+                    break
+                elif result == "handled":
+                    # Handler already processed the command
+                    time.sleep(0.5)  # Small delay to avoid rate limiting
+                    continue
+                else:
+                    # No handler matched, try Gemini
+                    handle_gemini_fallback(formatted_command, speculation)
+                    time.sleep(0.5)  # Small delay between API calls to avoid rate limiting
     finally:
+        if "gemini_async" in sys.modules:
+            stats = sys.modules["gemini_async"].speculation_stats()
+            if stats["started"]:
+                print(f"Speculative Gemini requests: {stats['started']} started, {stats['adopted']} used "
+                      f"(saved {stats['avg_saved_ms']:.0f} ms each on average), {stats['wasted']} wasted")
         # Stop background monitoring threads
         stop_battery_monitoring()
         stop_usb_monitoring()
+        # Let queued speech (e.g. "Goodbye!") finish before exiting
+        tts.shutdown()
+        mic_session.close_session()
+        audio_capture.stop_capture()
+        metrics_endpoint.shutdown()
+        tracing.shutdown()
+        if tracing.TRACE:
+            tracing.print_summary(tracing.summary())
+        log_writer.shutdown()
 
 
 if __name__ == "__main__":
-    main()
+    main(profile_startup=PROFILE_STARTUP)
@@ -0,0 +1,413 @@
+"""Continuous background audio capture
+
+With LISTEN_MODE=background the microphone is read by a background thread
+the whole time, so the assistant keeps hearing while it routes a command,
+waits for Gemini or speaks:
+
+    source -> RingBuffer (pre-roll) -> EnergySegmenter -> utterance queue -> listen()
+
+- Sources produce raw PCM buffers: MicrophoneSource for a real microphone,
+  WavFileSource to feed recorded WAV files in tests and benchmarks.
+- EnergySegmenter is a lightweight energy VAD: it tracks the noise floor,
+  starts an utterance after a short run of loud buffers (keeping a little
+  pre-roll from the ring buffer so the first syllable is not cut) and ends it
+  after a pause.
+- Finished utterances wait in a bounded queue, so what is said while the
+  assistant is busy is answered afterwards instead of lost.
+- WakeWordGate optionally only lets through utterances that start with the
+  wake word (or follow a bare wake word closely).
+
+Audio is dropped while the assistant itself is speaking (suppress callback)
+so it does not answer its own voice.
+"""
+import queue
+import threading
+import time
+import wave
+from array import array
+from collections import deque, namedtuple
+from utils.mic_session import frame_rms
+
+# frame_data:   raw little-endian mono PCM of the whole utterance
+# sample_rate:  samples per second
+# sample_width: bytes per sample
+# started_at:   time.monotonic() when speech started
+# offset:       seconds into the source's audio where the utterance starts
+# duration:     seconds of audio in frame_data
+# text:         transcript when one is already known (set by WakeWordGate)
+Utterance = namedtuple("Utterance", ["frame_data", "sample_rate", "sample_width", "started_at", "offset", "duration", "text"])
+
+
+def to_audio_data(utterance):
+    """Convert an Utterance to speech_recognition.AudioData for recognition"""
+    import speech_recognition as sr
+    return sr.AudioData(utterance.frame_data, utterance.sample_rate, utterance.sample_width)
+
+
+class MicrophoneSource:
+    """Reads PCM buffers from the default microphone (via speech_recognition/PyAudio)"""
+
+    def __init__(self, sample_rate=16000, chunk=1024):
+        import speech_recognition as sr
+        self._microphone = sr.Microphone(sample_rate=sample_rate, chunk_size=chunk)
+        self._stream = None
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.chunk = chunk
+
+    def open(self):
+        source = self._microphone.__enter__()
+        self._stream = source.stream
+        self.sample_rate = source.SAMPLE_RATE
+        self.sample_width = source.SAMPLE_WIDTH
+
+    def read(self):
+        """Next buffer of audio (blocks until it is available)"""
+        return self._stream.read(self.chunk)
+
+    def close(self):
+        if self._stream is not None:
+            self._microphone.__exit__(None, None, None)
+            self._stream = None
+
+
+class WavFileSource:
+    """Plays a PCM WAV file as if it were a microphone (for tests/benchmarks)
+
+    Stereo files are reduced to their first channel. With realtime=True each
+    read sleeps for the buffer's duration, like a real device would.
+    """
+
+    def __init__(self, path, chunk=1024, realtime=False):
+        self.path = path
+        self.chunk = chunk
+        self.realtime = realtime
+        self._wav = None
+        self.sample_rate = None
+        self.sample_width = None
+        self.channels = None
+
+    def open(self):
+        self._wav = wave.open(self.path, "rb")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+        self.channels = self._wav.getnchannels()
+
+    def read(self):
+        """Next buffer of audio, or b"" at the end of the file"""
+        data = self._wav.readframes(self.chunk)
+        if self.channels > 1 and data:
+            samples = array({1: "b", 2: "h", 4: "i"}[self.sample_width])
+            samples.frombytes(data)
+            data = samples[::self.channels].tobytes()
+        if self.realtime and data:
+            time.sleep(self.chunk / self.sample_rate)
+        return data
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class RingBuffer:
+    """Fixed-size buffer keeping only the most recent audio buffers"""
+
+    def __init__(self, capacity):
+        self._frames = deque(maxlen=capacity)
+
+    def append(self, frame):
+        self._frames.append(frame)
+
+    def last(self, count):
+        """The most recent count buffers, oldest first"""
+        if count <= 0:
+            return []
+        return list(self._frames)[-count:]
+
+    def clear(self):
+        self._frames.clear()
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class EnergySegmenter:
+    """Energy-based voice activity detection that cuts audio into utterances"""
+
+    def __init__(self, sample_rate, sample_width=2, chunk=1024, threshold_ratio=3.0,
+                 min_threshold=50, start_seconds=0.15, pause_seconds=0.8,
+                 pre_roll_seconds=0.4, min_seconds=0.3, max_seconds=12.0, ring_seconds=5.0):
+        """
+        Args:
+            threshold_ratio: Speech must be this many times louder than the noise floor.
+            min_threshold: Lower bound for the speech threshold.
+            start_seconds: Loud audio needed before an utterance starts (ignores clicks).
+            pause_seconds: Silence that ends an utterance.
+            pre_roll_seconds: Audio kept from before the start was detected.
+            min_seconds: Shorter utterances are discarded as noise.
+            max_seconds: Utterances are cut at this length.
+            ring_seconds: Recent audio kept in the ring buffer.
+        """
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        seconds_per_buffer = chunk / sample_rate
+
+        def _buffers(seconds):
+            return max(1, int(round(seconds / seconds_per_buffer)))
+
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self._start_buffers = _buffers(start_seconds)
+        self._pause_buffers = _buffers(pause_seconds)
+        self._pre_roll_buffers = _buffers(pre_roll_seconds)
+        self._min_buffers = _buffers(min_seconds)
+        self._max_buffers = _buffers(max_seconds)
+        self._seconds_per_buffer = seconds_per_buffer
+        self.ring = RingBuffer(max(_buffers(ring_seconds), self._pre_roll_buffers + self._start_buffers))
+
+        self.noise_floor = None
+        self._buffers_seen = 0
+        self._voiced_run = 0
+        self._speech = None
+        self._silent_run = 0
+        self._started_at = None
+        self._offset = None
+
+    @property
+    def threshold(self):
+        floor = self.noise_floor if self.noise_floor is not None else self.min_threshold
+        return max(floor * self.threshold_ratio, self.min_threshold)
+
+    @property
+    def in_speech(self):
+        return self._speech is not None
+
+    def reset(self):
+        """Abandon any utterance in progress (keeps the noise floor)"""
+        self._speech = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        self.ring.clear()
+
+    def feed(self, frame, now=None):
+        """Process one buffer; returns a finished Utterance or None"""
+        now = time.monotonic() if now is None else now
+        energy = frame_rms(frame, self.sample_width)
+        loud = energy > self.threshold
+        self.ring.append(frame)
+        self._buffers_seen += 1
+
+        if self._speech is None:
+            # Track the noise floor on quiet audio only (slow, asymmetric average)
+            if self.noise_floor is None:
+                self.noise_floor = energy
+            elif not loud:
+                self.noise_floor = self.noise_floor * 0.95 + energy * 0.05
+            self._voiced_run = self._voiced_run + 1 if loud else 0
+            if self._voiced_run >= self._start_buffers:
+                self._speech = self.ring.last(self._pre_roll_buffers + self._start_buffers)
+                self._started_at = now - len(self._speech) * self._seconds_per_buffer
+                self._offset = (self._buffers_seen - len(self._speech)) * self._seconds_per_buffer
+                self._silent_run = 0
+            return None
+
+        self._speech.append(frame)
+        self._silent_run = 0 if loud else self._silent_run + 1
+        if self._silent_run >= self._pause_buffers or len(self._speech) >= self._max_buffers:
+            return self._finish()
+        return None
+
+    def flush(self):
+        """End the current utterance (e.g. at the end of a file)"""
+        if self._speech is None:
+            return None
+        return self._finish()
+
+    def _finish(self):
+        # Keep a short tail of the pause so the last word is not clipped
+        frames = self._speech
+        trailing = min(self._silent_run, len(frames))
+        keep_tail = min(trailing, max(1, self._pause_buffers // 4))
+        if trailing:
+            frames = frames[:len(frames) - trailing + keep_tail]
+        started_at, offset = self._started_at, self._offset
+        self._speech = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        self.ring.clear()
+
+        if len(frames) - keep_tail < self._min_buffers:
+            return None
+        return Utterance(
+            frame_data=b"".join(frames),
+            sample_rate=self.sample_rate,
+            sample_width=self.sample_width,
+            started_at=started_at,
+            offset=offset,
+            duration=len(frames) * self._seconds_per_buffer,
+            text=None,
+        )
+
+
+class WakeWordGate:
+    """Lets through utterances addressed to the assistant
+
+    "echo what time is it" passes as "what time is it"; a bare "echo" arms
+    the gate so the next utterance within armed_seconds passes as-is.
+    """
+
+    def __init__(self, wake_word, transcribe, armed_seconds=8.0, on_wake=None):
+        """
+        Args:
+            wake_word: Phrase that has to start the utterance (case-insensitive).
+            transcribe: Callable(Utterance) -> text or None.
+            armed_seconds: How long a bare wake word keeps the gate open.
+            on_wake: Optional callback when a bare wake word was heard.
+        """
+        self.wake_word = " ".join(wake_word.lower().split())
+        self.transcribe = transcribe
+        self.armed_seconds = armed_seconds
+        self.on_wake = on_wake
+        self._armed_until = None
+
+    def __call__(self, utterance):
+        """Return the utterance (with .text set) if it passes, else None"""
+        text = " ".join((self.transcribe(utterance) or "").lower().split())
+        if not text:
+            return None
+
+        if self._armed_until is not None and utterance.started_at <= self._armed_until:
+            self._armed_until = None
+            return utterance._replace(text=text)
+
+        if text == self.wake_word or text.startswith(self.wake_word + " "):
+            rest = text[len(self.wake_word):].strip(" ,.!?")
+            if rest:
+                return utterance._replace(text=rest)
+            self._armed_until = utterance.started_at + utterance.duration + self.armed_seconds
+            if self.on_wake is not None:
+                self.on_wake()
+        return None
+
+
+class BackgroundCapture(threading.Thread):
+    """Reads a source continuously and queues the utterances it contains"""
+
+    def __init__(self, source=None, segmenter_options=None, max_pending=5, suppress=None, source_factory=None):
+        """
+        Args:
+            source: MicrophoneSource, WavFileSource or anything with open/read/close
+                    and sample_rate/sample_width/chunk attributes.
+            source_factory: Callable creating the source on the capture thread
+                    instead (a missing microphone/PyAudio then ends the capture
+                    with error set rather than raising in the caller).
+            segmenter_options: Keyword arguments for EnergySegmenter.
+            max_pending: Utterances kept while nobody is listening (oldest dropped).
+            suppress: Optional callable; while it returns True audio is discarded
+                      (used to ignore the assistant's own speech).
+        """
+        super().__init__(name="audio-capture", daemon=True)
+        self.source = source
+        self.source_factory = source_factory
+        self.segmenter_options = segmenter_options or {}
+        self.suppress = suppress
+        self.segmenter = None
+        self.utterances = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            if self.source is None:
+                self.source = self.source_factory()
+            self.source.open()
+            self.segmenter = EnergySegmenter(
+                self.source.sample_rate, self.source.sample_width, self.source.chunk,
+                **self.segmenter_options)
+            while not self._stop_event.is_set():
+                frame = self.source.read()
+                if not frame:
+                    break
+                if self.suppress is not None and self.suppress():
+                    self.segmenter.reset()
+                    continue
+                utterance = self.segmenter.feed(frame)
+                if utterance is not None:
+                    self._enqueue(utterance)
+            utterance = self.segmenter.flush()
+            if utterance is not None:
+                self._enqueue(utterance)
+        except Exception as e:
+            self.error = e
+            print(f"Audio capture stopped: {e}")
+        finally:
+            try:
+                if self.source is not None:
+                    self.source.close()
+            except Exception:
+                pass
+            self.finished.set()
+
+    def _enqueue(self, utterance):
+        while True:
+            try:
+                self.utterances.put_nowait(utterance)
+                return
+            except queue.Full:
+                try:
+                    self.utterances.get_nowait()
+                    self.dropped += 1
+                    print("Warning: too many queued utterances, dropping the oldest")
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None, gate=None):
+        """Next queued utterance that passes gate, or None after timeout (or once capture ended)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                # Woken periodically so a capture that failed does not hold the caller
+                utterance = self.utterances.get(timeout=0.25 if remaining is None else min(remaining, 0.25))
+            except queue.Empty:
+                if self.finished.is_set() or remaining == 0.0:
+                    return None
+                continue
+            if gate is None:
+                return utterance
+            passed = gate(utterance)
+            if passed is not None:
+                return passed
+
+    def pending(self):
+        """Number of utterances waiting to be processed"""
+        return self.utterances.qsize()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture(source_factory=MicrophoneSource, **options):
+    """Return the shared background capture, starting it on first use"""
+    global _capture
+    with _capture_lock:
+        if _capture is None or (_capture.finished.is_set() and _capture.error is None):
+            _capture = BackgroundCapture(source_factory=source_factory, **options)
+            _capture.start()
+        return _capture
+
+
+def stop_capture():
+    """Stop the shared background capture, if it was started"""
+    global _capture
+    with _capture_lock:
+        capture, _capture = _capture, None
+    if capture is not None:
+        capture.stop()
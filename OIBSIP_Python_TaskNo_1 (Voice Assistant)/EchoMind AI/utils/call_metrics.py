@@ -0,0 +1,304 @@
+"""Per-call accounting of Gemini requests
+
+Every answer gemini_client produces (blocking, streamed, async or batched)
+is described by a CallRecord: where it came from (source: "gemini",
+"gemini_stream", "text_input_gemini", ...), which stage answered ("cache",
+"similar", "google", "http", "stream"), the model route it was sent to
+(see utils/model_router.py), how many retries it took, the prompt/output
+tokens the API reported, the time to the first text and the total time.
+
+Records go to a small SQLite table (one row of numbers per call, rows older
+than keep_days are pruned). record() only puts the row on a queue; a
+background thread inserts them in batches, so a call never waits for the
+disk.
+
+Summary per day and source, or per day and route (from the EchoMind AI folder):
+    python -m utils.call_metrics [--days 7] [--source gemini_stream] [--by route] [--path .cache/gemini_calls.sqlite3]
+"""
+import argparse
+import atexit
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(".cache", "gemini_calls.sqlite3")
+_STOP = object()
+
+
+def token_counts(usage):
+    """(prompt tokens, output tokens) of a usage dict (Gemini or OpenAI style); None when unknown"""
+    if not isinstance(usage, dict):
+        return None, None
+    prompt = usage.get("promptTokenCount", usage.get("prompt_tokens", usage.get("input_tokens")))
+    output = usage.get("candidatesTokenCount", usage.get("completion_tokens", usage.get("output_tokens")))
+    if output is not None and usage.get("thoughtsTokenCount"):
+        output += usage["thoughtsTokenCount"]  # billed as output
+    return prompt, output
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class CallRecord:
+    """What one Gemini call did; filled in by gemini_client as the call goes"""
+
+    __slots__ = ("source", "ts", "started", "route", "stage", "attempts", "prompt_tokens", "output_tokens",
+                 "ttft", "total", "ok")
+
+    def __init__(self, source):
+        self.source = source
+        self.ts = time.time()
+        self.started = time.perf_counter()
+        self.route = None          # name of the model route it was sent to
+        self.stage = None          # stage that produced the answer
+        self.attempts = 0          # HTTP requests sent, over all stages
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.ttft = None           # seconds to the first text
+        self.total = None          # seconds until the call finished
+        self.ok = False
+
+    def attempt(self, stage, ok):
+        """Count one HTTP attempt; a successful one is the answering stage (so far)"""
+        self.attempts += 1
+        if ok:
+            self.stage = stage
+
+    def answered_from(self, stage):
+        """The answer came without a request (stage "cache" or "similar")"""
+        self.stage = stage
+
+    def usage(self, usage):
+        """Take the token counts of the response's usage metadata (if it has any)"""
+        prompt, output = token_counts(usage)
+        if prompt is not None:
+            self.prompt_tokens = prompt
+        if output is not None:
+            self.output_tokens = output
+
+    def first_text(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(self, ok):
+        self.total = time.perf_counter() - self.started
+        self.ok = bool(ok)
+        if ok and self.ttft is None:
+            self.ttft = self.total  # the whole answer arrived at once
+
+    @property
+    def retries(self):
+        return max(0, self.attempts - 1)
+
+    def row(self):
+        return (self.ts, self.source, self.stage if self.ok else None, int(self.ok), self.retries,
+                self.prompt_tokens, self.output_tokens,
+                None if self.ttft is None else round(self.ttft * 1000),
+                None if self.total is None else round(self.total * 1000), self.route)
+
+
+def _connect(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS calls ("
+        "ts REAL, source TEXT, stage TEXT, ok INTEGER, retries INTEGER, "
+        "prompt_tokens INTEGER, output_tokens INTEGER, ttft_ms INTEGER, total_ms INTEGER, route TEXT)")
+    if "route" not in [column[1] for column in db.execute("PRAGMA table_info(calls)")]:
+        db.execute("ALTER TABLE calls ADD COLUMN route TEXT")  # stores from before routing
+    db.execute("CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts)")
+    db.commit()
+    return db
+
+
+class CallStore(threading.Thread):
+    """Background thread that inserts queued CallRecord rows into SQLite"""
+
+    def __init__(self, path=DEFAULT_PATH, keep_days=30):
+        """
+        Args:
+            path: SQLite file of the calls table.
+            keep_days: Rows older than this are deleted when the store opens.
+        """
+        super().__init__(name="call-metrics", daemon=True)
+        self.path = path
+        self.keep_days = keep_days
+        self.written = 0
+        self._queue = queue.Queue()
+
+    def record(self, call):
+        """Queue a finished CallRecord (never blocks)"""
+        self._queue.put(call.row())
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is stored; False if the timeout expired first"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self):
+        self._queue.put(_STOP)
+
+    def run(self):
+        try:
+            db = _connect(self.path)
+            if self.keep_days:
+                db.execute("DELETE FROM calls WHERE ts < ?", (time.time() - self.keep_days * 86400,))
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Gemini call metrics unavailable ({e})")
+            db = None
+        while True:
+            items = [self._queue.get()]
+            # Everything that queued up meanwhile goes into the same transaction
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in items if isinstance(item, tuple)]
+            if rows and db is not None:
+                try:
+                    db.executemany("INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    db.commit()
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    print(f"Warning: could not store Gemini call metrics: {e}")
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if _STOP in items:
+                if db is not None:
+                    db.close()
+                return
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_PATH, keep_days=30):
+    """Return the running store, starting it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None or not _store.is_alive():
+            _store = CallStore(path, keep_days)
+            _store.start()
+        return _store
+
+
+def shutdown(timeout=5.0):
+    """Store what is queued and stop the writer thread"""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is None:
+        return
+    store.stop()
+    store.join(timeout)
+
+
+# The store is a daemon thread: make sure the last rows reach the disk
+atexit.register(shutdown)
+
+
+def summary(path=DEFAULT_PATH, days=7, source=None, now=None, by="source"):
+    """Per (day, source) statistics of the calls of the last days, oldest day first
+
+    by="route" groups them per (day, route) instead.
+    """
+    if not os.path.exists(path):
+        return []
+    now = time.time() if now is None else now
+    db = sqlite3.connect(path)
+    try:
+        column = "coalesce(route, 'default')" if by == "route" else "source"
+        query = (f"SELECT date(ts, 'unixepoch', 'localtime'), {column}, stage, ok, retries, prompt_tokens, "
+                 "output_tokens, ttft_ms, total_ms FROM calls WHERE ts >= ?")
+        params = [now - days * 86400]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        rows = db.execute(query + " ORDER BY ts", params).fetchall()
+    finally:
+        db.close()
+
+    groups = {}
+    for day, name, stage, ok, retries, prompt_tokens, output_tokens, ttft_ms, total_ms in rows:
+        group = groups.setdefault((day, name), {
+            "day": day, by: name, "calls": 0, "ok": 0, "cached": 0, "retries": 0,
+            "prompt_tokens": 0, "output_tokens": 0, "api_ms": 0, "totals": [], "ttfts": [], "stages": {}})
+        group["calls"] += 1
+        group["ok"] += ok
+        group["retries"] += retries
+        group["stages"][stage or "failed"] = group["stages"].get(stage or "failed", 0) + 1
+        if stage in ("cache", "similar"):
+            group["cached"] += 1
+        if total_ms is not None:
+            group["totals"].append(total_ms)
+        if ttft_ms is not None:
+            group["ttfts"].append(ttft_ms)
+        group["prompt_tokens"] += prompt_tokens or 0
+        if output_tokens:
+            group["output_tokens"] += output_tokens
+            group["api_ms"] += total_ms or 0
+
+    result = []
+    for _, group in sorted(groups.items()):
+        totals, ttfts = group.pop("totals"), group.pop("ttfts")
+        api_ms = group.pop("api_ms")
+        group.update({
+            "p50_ms": percentile(totals, 50), "p95_ms": percentile(totals, 95),
+            "ttft_p50_ms": percentile(ttfts, 50), "ttft_p95_ms": percentile(ttfts, 95),
+            # Output tokens per second of the calls that reported them
+            "tokens_per_second": group["output_tokens"] * 1000.0 / api_ms if api_ms else None,
+        })
+        result.append(group)
+    return result
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+def print_summary(path=DEFAULT_PATH, days=7, source=None, by="source"):
+    groups = summary(path, days, source, by=by)
+    if not groups:
+        print(f"No Gemini calls recorded in {path} over the last {days} days")
+        return
+    print(f"{'day':<12}{by:<20}{'calls':>6}{'ok %':>6}{'cache %':>8}{'retries':>8}{'p50 ms':>8}"
+          f"{'p95 ms':>8}{'TTFT50':>8}{'TTFT95':>8}{'tok in':>8}{'tok out':>8}{'tok/s':>7}  stages")
+    for group in groups:
+        calls = group["calls"]
+        stages = ", ".join(f"{name} {count}" for name, count in sorted(group["stages"].items()))
+        speed = group["tokens_per_second"]
+        print(f"{group['day']:<12}{group[by]:<20}{calls:>6}{group['ok'] * 100 / calls:>6.0f}"
+              f"{group['cached'] * 100 / calls:>8.0f}{group['retries']:>8}{_ms(group['p50_ms']):>8}"
+              f"{_ms(group['p95_ms']):>8}{_ms(group['ttft_p50_ms']):>8}{_ms(group['ttft_p95_ms']):>8}"
+              f"{group['prompt_tokens']:>8}{group['output_tokens']:>8}{'-' if speed is None else f'{speed:.0f}':>7}"
+              f"  {stages}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Percentiles of recorded Gemini calls per day and source")
+    parser.add_argument("--path", default=os.getenv("GEMINI_METRICS_PATH", DEFAULT_PATH),
+                        help=f"metrics database (default {DEFAULT_PATH} or GEMINI_METRICS_PATH)")
+    parser.add_argument("--days", type=int, default=7, help="days to include (default 7)")
+    parser.add_argument("--source", help="only this source (e.g. gemini, gemini_stream, text_input_gemini)")
+    parser.add_argument("--by", choices=("source", "route"), default="source",
+                        help="group per source or per model route (default source)")
+    args = parser.parse_args()
+    print_summary(args.path, args.days, args.source, args.by)
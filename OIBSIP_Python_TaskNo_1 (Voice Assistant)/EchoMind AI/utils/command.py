@@ -0,0 +1,39 @@
+"""Pre-parsed command shared by all handlers
+
+The main loop parses each utterance once into an immutable Command, and every
+handler's match phase reads from it instead of lowercasing, stripping and
+splitting the same string again.
+"""
+import re
+from collections import namedtuple
+from utils.text_processing import is_question
+
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+")
+_PERCENT_RE = re.compile(r"(\d+)\s*(?:%|percent\b)")
+
+# raw:         the utterance as routed (after symbol conversion and "?")
+# text:        lowercased and stripped
+# tokens:      words of text, split on regex word boundaries (like \b...\b)
+# token_set:   frozenset of tokens for O(1) keyword checks
+# numbers:     every integer in text, in order
+# percentages: integers followed by "%" or "percent", in order
+# is_question: utils.text_processing.is_question(raw)
+Command = namedtuple("Command", ["raw", "text", "tokens", "token_set", "numbers", "percentages", "is_question"])
+
+
+def parse_command(raw):
+    """Parse an utterance into a Command (returns Command input unchanged)"""
+    if isinstance(raw, Command):
+        return raw
+    text = raw.lower().strip()
+    tokens = tuple(_WORD_RE.findall(text))
+    return Command(
+        raw=raw,
+        text=text,
+        tokens=tokens,
+        token_set=frozenset(tokens),
+        numbers=tuple(int(n) for n in _NUMBER_RE.findall(text)),
+        percentages=tuple(int(n) for n in _PERCENT_RE.findall(text)),
+        is_question=is_question(raw),
+    )
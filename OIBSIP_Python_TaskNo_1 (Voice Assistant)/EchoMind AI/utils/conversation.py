@@ -0,0 +1,116 @@
+"""Recent conversation turns for Gemini follow-up questions
+
+Each Gemini question used to be sent on its own, so "and what about its
+population?" had nothing to refer to. ConversationMemory keeps the recent
+question/answer turns and renders them in front of a new question within a
+token budget:
+
+- the newest turns are included in full while they fit
+- older turns are shortened to the question and the first sentence of the
+  answer, and dropped once even that does not fit
+- a pause longer than idle_timeout starts a new conversation
+
+Tokens are estimated (about 4 characters each, as for Gemini's English
+text) rather than counted by a tokenizer.
+"""
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+HEADER = "Conversation so far:"
+
+# text:       the rendered history ("" when there is none)
+# tokens:     estimated tokens of text
+# turns:      turns included in full
+# summarized: turns shortened to fit the budget
+# dropped:    turns left out entirely
+ContextInfo = namedtuple("ContextInfo", ["text", "tokens", "turns", "summarized", "dropped"])
+NO_CONTEXT = ContextInfo("", 0, 0, 0, 0)
+
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|it's|they|them|their|those|these|that|he|him|his|she|her|there)\b"
+    r"|^(?:and|but|so|also|then|what about|how about|what else|tell me more|more about)\b")
+_FOLLOW_UP_ONLY = {"why", "why not", "how come", "how so", "really", "more", "go on", "continue",
+                   "explain more", "elaborate", "and", "then what"}
+_FIRST_SENTENCE_RE = re.compile(r"^(.+?[.!?])(?:\s|$)", re.DOTALL)
+
+
+def estimate_tokens(text):
+    """Rough token count of text (about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def is_follow_up(question):
+    """True if question seems to refer to an earlier turn ("what about its population?")"""
+    text = " ".join(re.sub(r"[^\w\s']", " ", question.lower()).split())
+    return text in _FOLLOW_UP_ONLY or _FOLLOW_UP_RE.search(text) is not None
+
+
+def _summary(question, answer, max_chars=160):
+    match = _FIRST_SENTENCE_RE.match(answer.strip())
+    first = match.group(1) if match else answer.strip()
+    if len(first) > max_chars:
+        first = first[:max_chars].rsplit(" ", 1)[0] + "..."
+    return f"User: {question}\nAssistant: {first}"
+
+
+class ConversationMemory:
+    """Recent question/answer turns, rendered within a token budget (thread-safe)"""
+
+    def __init__(self, budget=400, max_turns=10, idle_timeout=300.0):
+        """
+        Args:
+            budget: Estimated tokens the rendered history may use.
+            max_turns: Turns remembered at all.
+            idle_timeout: Seconds without a turn after which the history is forgotten.
+        """
+        self.budget = budget
+        self.idle_timeout = idle_timeout
+        self._turns = deque(maxlen=max_turns)
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, question, answer, now=None):
+        """Remember a finished turn"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self._last > self.idle_timeout:
+                self._turns.clear()
+            self._turns.append((question, answer))
+            self._last = now
+
+    def context(self, now=None):
+        """ContextInfo for the turns that fit the budget, oldest first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self._last > self.idle_timeout:
+                self._turns.clear()
+            turns = list(self._turns)
+        if not turns:
+            return NO_CONTEXT
+
+        parts = []
+        used = estimate_tokens(HEADER)
+        full = summarized = 0
+        for question, answer in reversed(turns):
+            text = f"User: {question}\nAssistant: {answer}"
+            cost = estimate_tokens(text)
+            if used + cost > self.budget:
+                text = _summary(question, answer)
+                cost = estimate_tokens(text)
+                if used + cost > self.budget:
+                    break
+                summarized += 1
+            else:
+                full += 1
+            parts.append(text)
+            used += cost
+        if not parts:
+            return ContextInfo("", 0, 0, 0, len(turns))
+        text = HEADER + "\n" + "\n".join(reversed(parts))
+        return ContextInfo(text, estimate_tokens(text), full, summarized, len(turns) - len(parts))
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
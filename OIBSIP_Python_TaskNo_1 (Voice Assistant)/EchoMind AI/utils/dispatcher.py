@@ -0,0 +1,89 @@
+"""Keyword-indexed intent dispatcher
+
+Every handler declares the vocabulary it needs to see before it can possibly
+match (whole words, substrings, or a predicate on the word list). The index is
+built once, so routing an utterance only evaluates the handlers whose triggers
+actually occur in it, in the original priority order.
+
+Triggers must be a *superset* of what the handler accepts: it is fine to wake
+a handler that then declines, but a handler whose triggers are missing is
+never called.
+"""
+from collections import namedtuple
+
+# keywords: whole words (same boundaries as regex \b...\b)
+# phrases:  substrings of the lowercased command
+# when:     optional predicate on Command.tokens, for shape-based handlers
+Triggers = namedtuple("Triggers", ["keywords", "phrases", "when"])
+Triggers.__new__.__defaults__ = ((), (), None)
+
+# Handler evaluated for every utterance
+ALWAYS = None
+
+
+class IntentDispatcher:
+    """Selects candidate handlers for an utterance from a prebuilt trigger index"""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries: Iterable of (name, handler, triggers) in priority order.
+                     triggers is a Triggers tuple, or ALWAYS to evaluate the
+                     handler on every command.
+        """
+        self.entries = list(entries)
+        self._keyword_index = {}
+        self._phrase_index = {}
+        self._predicates = []
+        self._always = []
+
+        for position, (name, handler, triggers) in enumerate(self.entries):
+            if triggers is ALWAYS:
+                self._always.append(position)
+                continue
+            for keyword in triggers.keywords:
+                self._keyword_index.setdefault(keyword.lower(), set()).add(position)
+            for phrase in triggers.phrases:
+                self._phrase_index.setdefault(phrase.lower(), set()).add(position)
+            if triggers.when is not None:
+                self._predicates.append((position, triggers.when))
+
+    def candidate_positions(self, command):
+        """Return sorted positions of the handlers that may match a parsed Command"""
+        text = command.text
+        words = command.tokens
+        positions = set(self._always)
+
+        keyword_index = self._keyword_index
+        for word in command.token_set:
+            hits = keyword_index.get(word)
+            if hits:
+                positions.update(hits)
+
+        for phrase, hits in self._phrase_index.items():
+            if phrase in text:
+                positions.update(hits)
+
+        for position, predicate in self._predicates:
+            if position not in positions and predicate(words):
+                positions.add(position)
+
+        return sorted(positions)
+
+    def candidates(self, command):
+        """Yield (name, handler) for the handlers worth evaluating for a Command, in priority order"""
+        entries = self.entries
+        for position in self.candidate_positions(command):
+            name, handler, _ = entries[position]
+            yield name, handler
+
+    def matches(self, command):
+        """Yield (name, handler, match) for candidates whose match phase accepts the command
+
+        Handlers follow the match/execute protocol in handlers/base.py; nothing
+        here has side effects, so callers can stop after the first result.
+        """
+        for name, handler in self.candidates(command):
+            match = handler.match(command)
+            if match is not None:
+                yield name, handler, match
@@ -0,0 +1,213 @@
+"""Background JSON-lines log writer
+
+Callers (handlers, the battery/USB monitor threads, gemini_client) only put
+an entry on a queue; one background thread serializes the entries and
+appends them to their files in batches. A batch is written when batch_size
+entries are waiting or flush_interval seconds have passed, so the hot path
+never opens a file or touches the disk.
+
+Files live in logs/ under the working directory and are kept open between
+batches. A file is rotated when it would grow past max_bytes or (with
+rotate_daily) when the date changes: it is renamed to
+<name>.<YYYYmmdd-HHMMSS-micro>.jsonl, gzip-compressed, and only the newest
+backup_count archives are kept.
+"""
+import atexit
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from config.settings import LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_DAILY
+
+_STOP = object()
+
+
+class _LogFile:
+    """An open log file plus what is needed to decide when to rotate it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, "a", encoding="utf-8")
+        self.size = self.handle.tell()
+        self.date = datetime.date.fromtimestamp(os.path.getmtime(path)) if self.size else datetime.date.today()
+
+    def close(self):
+        self.handle.close()
+
+
+class LogWriter(threading.Thread):
+    """Background thread that appends queued entries to JSON-lines files"""
+
+    def __init__(self, directory=None, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, rotate_daily=LOG_ROTATE_DAILY):
+        """
+        Args:
+            directory: Folder for the log files (default: logs/ in the working directory).
+            batch_size: Write as soon as this many entries are waiting.
+            flush_interval: Write waiting entries at least this often (seconds).
+            max_bytes: Rotate a file before it grows past this size (0 = never).
+            backup_count: Compressed archives kept per file.
+            rotate_daily: Also rotate when the date changes.
+        """
+        super().__init__(name="log-writer", daemon=True)
+        self.directory = directory or os.path.join(os.getcwd(), "logs")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self._queue = queue.Queue()
+        self._files = {}
+
+    def write(self, filename, entry):
+        """Queue a JSON-serializable entry for logs/<filename> (never blocks)"""
+        self._queue.put((filename, entry))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is on disk
+
+        Returns False if the timeout expired first.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self):
+        """Write what is queued, close the files and end the thread"""
+        self._queue.put(_STOP)
+
+    def run(self):
+        pending = {}
+        count = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                filename, entry = item
+                try:
+                    line = json.dumps(entry, ensure_ascii=False) + "\n"
+                except (TypeError, ValueError):
+                    line = json.dumps({"unserializable": repr(entry)}, ensure_ascii=False) + "\n"
+                pending.setdefault(filename, []).append(line)
+                count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if count < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            # Batch full, interval elapsed, flush requested or stopping
+            if pending:
+                self._write_batch(pending)
+                pending = {}
+                count = 0
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                self._close_files()
+                return
+
+    def _write_batch(self, pending):
+        for filename, lines in pending.items():
+            data = "".join(lines)
+            try:
+                log_file = self._open(filename)
+                if self._should_rotate(log_file, len(data.encode("utf-8"))):
+                    log_file = self._rotate(filename)
+                log_file.handle.write(data)
+                log_file.handle.flush()
+                log_file.size = log_file.handle.tell()
+                self.written += len(lines)
+            except Exception as e:
+                # Logging must never take the assistant down
+                print(f"Warning: could not write {filename}: {e}")
+        self.batches += 1
+
+    def _open(self, filename):
+        log_file = self._files.get(filename)
+        if log_file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            log_file = self._files[filename] = _LogFile(os.path.join(self.directory, filename))
+        return log_file
+
+    def _should_rotate(self, log_file, incoming):
+        if not log_file.size:
+            return False
+        if self.max_bytes and log_file.size + incoming > self.max_bytes:
+            return True
+        return self.rotate_daily and log_file.date != datetime.date.today()
+
+    def _rotate(self, filename):
+        log_file = self._files.pop(filename)
+        log_file.close()
+        base, ext = os.path.splitext(log_file.path)
+        archive = f"{base}.{datetime.datetime.now():%Y%m%d-%H%M%S-%f}{ext}"
+        os.replace(log_file.path, archive)
+        with open(archive, "rb") as src, gzip.open(archive + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(archive)
+        self.rotations += 1
+
+        archives = sorted(glob.glob(f"{glob.escape(base)}.*{ext}.gz"))
+        for old in archives[:max(0, len(archives) - self.backup_count)]:
+            os.remove(old)
+        return self._open(filename)
+
+    def _close_files(self):
+        for log_file in self._files.values():
+            log_file.close()
+        self._files.clear()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the running log writer, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = LogWriter()
+            _writer.start()
+        return _writer
+
+
+def write(filename, entry):
+    """Queue entry to be appended to logs/<filename> as one JSON line"""
+    get_writer().write(filename, entry)
+
+
+def flush(timeout=None):
+    """Block until queued entries are written (no-op if nothing was logged)"""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+
+def shutdown(timeout=5.0):
+    """Write queued entries and stop the writer"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is None:
+        return
+    writer.stop()
+    writer.join(timeout)
+
+
+# The writer is a daemon thread: make sure the last batch reaches the disk
+atexit.register(shutdown)
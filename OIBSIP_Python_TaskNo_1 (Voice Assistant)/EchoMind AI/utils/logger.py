@@ -1,15 +1,15 @@
 """Logging utilities"""
-import os
-import json
 import time
+from utils import log_writer
 
 def log_interaction(user: str, response: str, source: str = "local"):
-    """Append a JSON line with the interaction to logs/assistant.jsonl"""
+    """Queue a JSON line with the interaction for logs/assistant.jsonl
+
+    Returns immediately; the background log writer (utils/log_writer.py)
+    appends the entries in batches.
+    """
     try:
-        _dir = os.path.join(os.getcwd(), "logs")
-        os.makedirs(_dir, exist_ok=True)
         entry = {"ts": time.time(), "user": user, "response": response, "source": source}
-        with open(os.path.join(_dir, "assistant.jsonl"), "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        log_writer.write("assistant.jsonl", entry)
     except Exception:
         pass
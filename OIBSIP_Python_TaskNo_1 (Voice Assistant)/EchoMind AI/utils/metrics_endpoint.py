@@ -0,0 +1,198 @@
+"""Live counters and histograms, served in Prometheus text format
+
+The assistant's code updates the metrics below as it works (nothing is read
+back from the log files); with METRICS_PORT set, start_server() serves them
+at http://METRICS_HOST:METRICS_PORT/metrics for Prometheus to scrape:
+
+    utterances processed, handler hits and handler time, routing time,
+    STT / Gemini / TTS latency, Gemini cache lookups (hit rate) and tokens,
+    and the time one pass of the battery and USB monitor loops takes
+
+Example queries:
+    rate(echomind_utterances_total[5m])
+    histogram_quantile(0.95, rate(echomind_llm_seconds_bucket[5m]))
+    sum(rate(echomind_llm_cache_lookups_total{result=~"cache|similar"}[1h]))
+      / sum(rate(echomind_llm_cache_lookups_total[1h]))
+
+With METRICS_PORT unset (0) nothing is recorded: inc() and observe() return
+after one global check.
+"""
+import threading
+
+from config.settings import METRICS_HOST, METRICS_PORT
+
+ENABLED = METRICS_PORT > 0
+
+# Seconds; chosen for spoken-command latencies (STT, Gemini, TTS)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; in-process work that should take milliseconds (routing, monitor passes)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+_metrics = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label values (thread-safe)"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label values (thread-safe)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}   # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def lines(self):
+        with self._lock:
+            values = sorted((key, list(entry)) for key, entry in self._values.items())
+        lines = []
+        for key, entry in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), entry[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(entry[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+UTTERANCES = Counter("echomind_utterances_total", "Commands heard and processed by the main loop")
+HANDLER_HITS = Counter("echomind_handler_hits_total", "Commands answered per handler (gemini = no handler matched)",
+                       ("handler",))
+HANDLER_SECONDS = Histogram("echomind_handler_seconds", "Time a handler spent executing a command", ("handler",))
+ROUTE_SECONDS = Histogram("echomind_route_seconds", "Time spent parsing and matching a command, handlers excluded",
+                          buckets=FAST_BUCKETS)
+STT_SECONDS = Histogram("echomind_stt_seconds", "Speech recognition latency per backend", ("backend", "ok"))
+LLM_SECONDS = Histogram("echomind_llm_seconds", "Total time of a Gemini call per source and answering stage",
+                        ("source", "stage"))
+LLM_TTFT_SECONDS = Histogram("echomind_llm_ttft_seconds", "Time to the first text of a successful Gemini call",
+                             ("source",))
+LLM_TOKENS = Counter("echomind_llm_tokens_total", "Tokens reported by the Gemini API", ("kind",))
+CACHE_LOOKUPS = Counter("echomind_llm_cache_lookups_total",
+                        "Gemini answer cache lookups by result (cache, similar, miss, bypass)", ("result",))
+TTS_SECONDS = Histogram("echomind_tts_seconds", "Time the TTS backend spent on one utterance", ("backend",))
+MONITOR_LOOP_SECONDS = Histogram("echomind_monitor_loop_seconds", "Duration of one pass of a background monitor loop",
+                                 ("monitor",), buckets=FAST_BUCKETS)
+MONITOR_ERRORS = Counter("echomind_monitor_errors_total", "Background monitor passes that raised", ("monitor",))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics on a background thread; does nothing when METRICS_PORT is unset"""
+    global _server
+    if not ENABLED:
+        return None
+    # Imported here so startup does not pay for it when metrics are off
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # no line per scrape on the console
+
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"Warning: metrics endpoint unavailable on {host}:{port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics at http://{host}:{_server.server_address[1]}/metrics")
+        return _server
+
+
+def shutdown():
+    """Stop the endpoint (if it was started)"""
+    global _server
+    with _server_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,184 @@
+"""Persistent microphone session
+
+listen() used to create a new Recognizer, reopen the microphone and spend
+1.5 s calibrating the energy threshold for every attempt. A
+MicrophoneSession keeps one Recognizer and one open microphone stream for the
+lifetime of the assistant and calibrates once.
+
+Every buffer the recognizer reads is also measured, so the ambient level is
+tracked for free while listening. The energy threshold is only re-calibrated
+when the quiet level drifts away from the one it was calibrated for (a fan
+switching on, a window opening), instead of before every command.
+"""
+import math
+import operator
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+# array typecodes for signed little-endian PCM sample widths
+_SAMPLE_TYPECODES = {1: "b", 2: "h", 4: "i"}
+
+
+def frame_rms(data, sample_width=2):
+    """Root-mean-square energy of a PCM buffer (same scale as audioop.rms)"""
+    samples = array(_SAMPLE_TYPECODES[sample_width])
+    samples.frombytes(data[:len(data) - len(data) % sample_width])
+    if not samples:
+        return 0
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return int(math.sqrt(sum(map(operator.mul, samples, samples)) / len(samples)))
+
+
+class _MeasuredStream:
+    """Wraps the microphone stream so every buffer read is also measured"""
+
+    def __init__(self, stream, on_buffer, sample_width):
+        self._stream = stream
+        self._on_buffer = on_buffer
+        self._sample_width = sample_width
+
+    def read(self, size):
+        data = self._stream.read(size)
+        self._on_buffer(frame_rms(data, self._sample_width))
+        return data
+
+    def discard_pending(self):
+        """Drop audio buffered while nobody was listening (e.g. our own speech)"""
+        pyaudio_stream = getattr(self._stream, "pyaudio_stream", None)
+        if pyaudio_stream is None:
+            return
+        try:
+            available = pyaudio_stream.get_read_available()
+            if available:
+                pyaudio_stream.read(available, exception_on_overflow=False)
+        except Exception:
+            pass
+
+    def close(self):
+        self._stream.close()
+
+
+class MicrophoneSession:
+    """One Recognizer plus one open microphone, calibrated once"""
+
+    def __init__(self, calibration_duration=1.0, drift_ratio=1.5, window_seconds=8.0,
+                 check_every=1.0, min_energy_threshold=50, pause_threshold=1.2):
+        """
+        Args:
+            calibration_duration: Seconds of ambient audio used for the initial calibration.
+            drift_ratio: Re-calibrate when the threshold implied by the current quiet
+                         level differs from the active one by more than this factor.
+            window_seconds: Audio history the quiet level is estimated from.
+            check_every: Seconds of audio between drift checks.
+            min_energy_threshold: Lower bound so silence never makes every click "speech".
+            pause_threshold: Seconds of silence that end a phrase.
+        """
+        self.calibration_duration = calibration_duration
+        self.drift_ratio = drift_ratio
+        self.window_seconds = window_seconds
+        self.check_every = check_every
+        self.min_energy_threshold = min_energy_threshold
+        self.pause_threshold = pause_threshold
+
+        self.recognizer = None
+        self.microphone = None
+        self.source = None
+        self.recalibrations = 0
+        self._energies = deque()
+        self._check_interval = 1
+        self._since_check = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.source is not None
+
+    def open(self):
+        """Open the microphone stream and calibrate the energy threshold"""
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        # Thresholds are managed here rather than drifting on every buffer
+        recognizer.dynamic_energy_threshold = False
+        recognizer.pause_threshold = self.pause_threshold
+        microphone = sr.Microphone()
+        source = microphone.__enter__()
+
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        self._energies = deque(maxlen=max(1, int(self.window_seconds / seconds_per_buffer)))
+        self._check_interval = max(1, int(self.check_every / seconds_per_buffer))
+        source.stream = _MeasuredStream(source.stream, self._observe, source.SAMPLE_WIDTH)
+
+        self.recognizer, self.microphone, self.source = recognizer, microphone, source
+        self.calibrate()
+
+    def calibrate(self, duration=None):
+        """Calibrate the energy threshold on ambient audio (blocking)"""
+        started = time.perf_counter()
+        self.recognizer.adjust_for_ambient_noise(self.source, duration=duration or self.calibration_duration)
+        self.recognizer.energy_threshold = max(self.recognizer.energy_threshold, self.min_energy_threshold)
+        self._energies.clear()
+        self._since_check = 0
+        print(f"Microphone calibrated: energy threshold {self.recognizer.energy_threshold:.0f} "
+              f"({time.perf_counter() - started:.1f}s)")
+
+    def _observe(self, energy):
+        """Track the quiet level and re-calibrate when it drifts"""
+        self._energies.append(energy)
+        self._since_check += 1
+        if self._since_check < self._check_interval or len(self._energies) < self._energies.maxlen:
+            return
+        self._since_check = 0
+
+        # The quietest fifth of the window is ambient noise, even while someone talks
+        ambient = sorted(self._energies)[len(self._energies) // 5]
+        target = max(ambient * self.recognizer.dynamic_energy_ratio, self.min_energy_threshold)
+        current = self.recognizer.energy_threshold
+        if target > current * self.drift_ratio or target * self.drift_ratio < current:
+            self.recognizer.energy_threshold = target
+            self.recalibrations += 1
+            print(f"Ambient noise changed: energy threshold {current:.0f} -> {target:.0f}")
+
+    def listen(self, timeout=None, phrase_time_limit=None):
+        """Record one phrase, starting as soon as speech begins"""
+        with self._lock:
+            if not self.is_open:
+                self.open()
+            self.source.stream.discard_pending()
+            return self.recognizer.listen(self.source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+
+    def close(self):
+        """Close the microphone stream"""
+        with self._lock:
+            if self.microphone is not None:
+                try:
+                    self.microphone.__exit__(None, None, None)
+                except Exception:
+                    pass
+            self.recognizer = self.microphone = self.source = None
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared microphone session (opened and calibrated on first listen)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = MicrophoneSession()
+        return _session
+
+
+def close_session():
+    """Close the shared microphone session, if one was opened"""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
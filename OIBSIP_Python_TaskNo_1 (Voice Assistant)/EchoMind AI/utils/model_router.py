@@ -0,0 +1,106 @@
+"""Choosing a fast or a large Gemini model per request
+
+A five-word factual question does not need the model (or the time budget)
+that "write a story" does. ModelRouter sends a request to the fast route
+unless one of these points to the large one:
+
+- the prompt is long (estimated tokens, e.g. a follow-up with history)
+- the answer is expected to be long ("write a story", "explain in detail",
+  "step by step", ...)
+- the request comes from a source that writes long text (file writing)
+
+Each Route has its own model, time budget and output token limit. The
+latency of every request that reached the API is recorded per route, so
+the thresholds can be tuned from stats() (or from the route column of the
+call metrics: python -m utils.call_metrics --by route).
+"""
+import re
+import threading
+from collections import deque, namedtuple
+
+from utils.call_metrics import percentile
+from utils.conversation import estimate_tokens
+
+# name:       "fast", "large" or "default" (routing off)
+# model:      model name put into the endpoint URL (None = the endpoint's own)
+# timeout:    seconds the whole request may take, retries and fallbacks included
+# max_tokens: output token limit sent with the request (0 = none)
+Route = namedtuple("Route", ["name", "model", "timeout", "max_tokens"])
+
+# Expected answer length in tokens: long-form requests vs everything else
+LONG_ANSWER_TOKENS = 800
+SHORT_ANSWER_TOKENS = 100
+
+_LONG_ANSWER_RE = re.compile(
+    r"\b(?:write|story|stories|poem|essay|article|letter|report|paragraphs?|tale|script|code|program|"
+    r"in detail|detailed|step by step|elaborate|summari[sz]e|compare|pros and cons|list (?:all|every)|"
+    r"outline|plan)\b")
+_MODEL_RE = re.compile(r"/models/[^/:]+:")
+
+
+def expected_output_tokens(prompt):
+    """Rough size of the answer prompt asks for"""
+    return LONG_ANSWER_TOKENS if _LONG_ANSWER_RE.search(prompt.lower()) else SHORT_ANSWER_TOKENS
+
+
+def endpoint_for(endpoint, route):
+    """endpoint with route's model in place of the one in its /models/<name>: segment"""
+    if not endpoint or route is None or not route.model:
+        return endpoint
+    return _MODEL_RE.sub(f"/models/{route.model}:", endpoint, count=1)
+
+
+class ModelRouter:
+    """Picks the fast or the large route and keeps the latency seen per route (thread-safe)"""
+
+    def __init__(self, fast, large, prompt_tokens=200, output_tokens=300, large_sources=("file_writing",),
+                 window=200):
+        """
+        Args:
+            fast, large: The two Routes.
+            prompt_tokens: Prompts estimated above this many tokens go to the large route.
+            output_tokens: Answers expected above this many tokens go to the large route.
+            large_sources: Callers (call sources) that always use the large route.
+            window: Latest latencies kept per route for stats().
+        """
+        self.fast = fast
+        self.large = large
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.large_sources = frozenset(large_sources)
+        self._latencies = {route.name: deque(maxlen=window) for route in (fast, large)}
+        self._counts = {route.name: {"chosen": 0, "calls": 0, "failures": 0} for route in (fast, large)}
+        self._lock = threading.Lock()
+
+    def choose(self, prompt, source=None, expected_tokens=None):
+        """Route for prompt from source; expected_tokens overrides the guessed answer size"""
+        if expected_tokens is None:
+            expected_tokens = expected_output_tokens(prompt)
+        large = (source in self.large_sources or estimate_tokens(prompt) > self.prompt_tokens
+                 or expected_tokens > self.output_tokens)
+        route = self.large if large else self.fast
+        with self._lock:
+            self._counts[route.name]["chosen"] += 1
+        return route
+
+    def record(self, route_name, seconds, ok=True):
+        """Add the latency of a request that went to route_name"""
+        with self._lock:
+            counts = self._counts.get(route_name)
+            if counts is None:
+                return
+            counts["calls"] += 1
+            if not ok:
+                counts["failures"] += 1
+            self._latencies[route_name].append(seconds)
+
+    def stats(self):
+        """Per route: times chosen, calls and failures, and p50/p95 of the recent latencies (ms)"""
+        with self._lock:
+            stats = {}
+            for name, counts in self._counts.items():
+                latencies = list(self._latencies[name])
+                stats[name] = dict(counts)
+                stats[name]["p50_ms"] = percentile(latencies, 50) * 1000 if latencies else None
+                stats[name]["p95_ms"] = percentile(latencies, 95) * 1000 if latencies else None
+            return stats
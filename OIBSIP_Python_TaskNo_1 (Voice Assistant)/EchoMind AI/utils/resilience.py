@@ -0,0 +1,262 @@
+"""Deadlines, retry backoff and a circuit breaker for backend calls
+
+- Deadline: one time budget shared by every attempt and fallback of a request
+- backoff_delay(): retry wait that honors Retry-After, with jitter
+- CircuitBreaker: after repeated failures calls fail fast instead of waiting
+  for timeouts; a background probe checks when the backend is back
+- RateLimiter: spaces requests to a requests-per-minute budget and holds
+  every caller back after a 429
+- StageMetrics: calls, failures and time spent per stage of a request
+"""
+import email.utils
+import random
+import threading
+import time
+
+
+class Deadline:
+    """Absolute time budget for one request"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap):
+        """Timeout for the next attempt: cap, or less if the budget is nearly used up"""
+        return max(0.1, min(cap, self.remaining()))
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=8.0, rng=random):
+    """Seconds to wait before retry number attempt + 1
+
+    Honors a Retry-After header (plus up to 10% jitter so clients do not
+    retry in lockstep); otherwise exponential backoff from base, capped at
+    cap, with half of it randomized.
+    """
+    wait = parse_retry_after(retry_after) if isinstance(retry_after, str) else retry_after
+    if wait is not None:
+        return wait + rng.uniform(0, 0.1 * wait + 0.1)
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Fail fast while a backend keeps failing
+
+    closed:    calls go through; failure_threshold failures in a row open it
+    open:      calls are refused at once; every reset_timeout seconds probe()
+               runs on a background thread (without a probe the breaker just
+               waits reset_timeout)
+    half_open: the backend looked healthy again: one trial call is let
+               through, its success closes the breaker, its failure reopens it
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, probe=None, max_reset_timeout=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe = probe
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = None
+        self._wait = reset_timeout
+        self._trial_started = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._counts = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0, "probes": 0}
+
+    def allow(self):
+        """True if a call may go to the backend now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and self.probe is None and now - self._opened_at >= self._wait:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open":
+                # One trial at a time; a trial that never reported back expires
+                if self._trial_started is None or now - self._trial_started >= self.reset_timeout:
+                    self._trial_started = now
+                    return True
+            self._counts["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._counts["successes"] += 1
+            self._failures = 0
+            if self.state != "closed":
+                print(f"{self.name}: backend is responding again, circuit closed")
+            self.state = "closed"
+            self._wait = self.reset_timeout
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._counts["failures"] += 1
+            self._failures += 1
+            if self.state == "half_open":
+                # The trial failed: back off longer before the next one
+                self._wait = min(self.max_reset_timeout, self._wait * 2)
+                self._open()
+            elif self.state == "closed" and self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        print(f"WARNING: {self.name}: {self._failures} failures in a row, "
+              f"failing fast for {self._wait:.0f}s")
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._trial_started = None
+        self._counts["opened"] += 1
+        self._schedule_probe()
+
+    def _schedule_probe(self):
+        if self.probe is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self._wait, self._run_probe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_probe(self):
+        try:
+            healthy = bool(self.probe())
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._counts["probes"] += 1
+            if self.state != "open":
+                return
+            if healthy:
+                self.state = "half_open"
+            else:
+                self._wait = min(self.max_reset_timeout, self._wait * 2)
+                self._schedule_probe()
+
+    def reset(self):
+        """Close the breaker and forget the failures"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.state = "closed"
+            self._failures = 0
+            self._wait = self.reset_timeout
+            self._trial_started = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self._failures
+            stats["open_for"] = time.monotonic() - self._opened_at if self.state != "closed" else 0.0
+            return stats
+
+
+class RateLimiter:
+    """Shared request budget for concurrent callers
+
+    With rate_per_minute set, requests get evenly spaced start slots
+    (60 / rate_per_minute seconds apart); 0 means no limit. pause() holds back
+    every caller for a while, e.g. after the server answered 429.
+    """
+
+    def __init__(self, rate_per_minute=0.0):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "delayed": 0, "waited": 0.0, "pauses": 0}
+
+    def reserve(self, deadline=None):
+        """Claim the next start slot; returns the seconds to wait for it
+
+        Returns None (and claims nothing) when the slot would come after
+        deadline. Callers sleep the returned time themselves, so async code
+        can use this too.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            wait = slot - now
+            if deadline is not None and wait > 0 and wait >= deadline.remaining():
+                return None
+            self._next_slot = slot + self.interval
+            self._counts["requests"] += 1
+            if wait > 0:
+                self._counts["delayed"] += 1
+                self._counts["waited"] += wait
+            return wait
+
+    def acquire(self, deadline=None):
+        """reserve() and sleep until the slot; False if the deadline comes first"""
+        wait = self.reserve(deadline)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def pause(self, seconds):
+        """Hold back every request for seconds (extends a running pause)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._counts["pauses"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class StageMetrics:
+    """Calls, failures and seconds spent per named stage (thread-safe)"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, ok=True):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"calls": 0, "failures": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["calls"] += 1
+            entry["failures"] += 0 if ok else 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(entry, avg_seconds=entry["seconds"] / entry["calls"])
+                    for stage, entry in self._stages.items()}
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
@@ -0,0 +1,202 @@
+"""Two-tier cache for Gemini responses
+
+Repeated questions ("what is python?", "tell me a joke") are answered from
+the cache instead of the API:
+
+- memory: an LRU of the most recent answers (no I/O at all)
+- disk:   a SQLite table, so answers survive restarts
+
+Entries are keyed on the normalized user prompt plus everything else that
+changes the answer (prompt wrapper, response mode, endpoint) and expire
+after a per-entry TTL. Prompts that depend on the current moment ("what's
+the news today", "weather now") are never cached.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 7 * 24 * 3600
+# Answers that are expected to vary between asks are only reused briefly
+VARIED_TTL = 10 * 60
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s']+")
+_TIME_SENSITIVE_RE = re.compile(
+    r"\b(?:today|tonight|tomorrow|yesterday|now|current|currently|latest|recent|recently|"
+    r"news|headlines|weather|forecast|temperature|time|date|day|this (?:week|month|year)|"
+    r"score|scores|price|prices|stock|stocks|live|breaking|trending|update|updates)\b"
+)
+_VARIED_RE = re.compile(r"\b(?:joke|jokes|riddle|quote|fact|story|poem|random|suggest|recommend)\b")
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop punctuation and collapse whitespace ("What is Python?" -> "what is python")"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", prompt.lower()).split())
+
+
+def is_time_sensitive(prompt):
+    """True if the answer depends on when it is asked (never cached)"""
+    return _TIME_SENSITIVE_RE.search(normalize_prompt(prompt)) is not None
+
+
+def ttl_for(prompt, default_ttl=DEFAULT_TTL):
+    """Seconds an answer to prompt stays valid"""
+    if _VARIED_RE.search(normalize_prompt(prompt)):
+        return min(VARIED_TTL, default_ttl)
+    return default_ttl
+
+
+def make_key(prompt, *context):
+    """Cache key for the normalized prompt and the settings that shape the answer"""
+    material = "\x00".join([normalize_prompt(prompt)] + [str(part or "") for part in context])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU in front of a SQLite store, with per-entry expiry"""
+
+    def __init__(self, path=None, max_memory=128):
+        """
+        Args:
+            path: SQLite file for the disk tier (None = memory only).
+            max_memory: Entries kept in the in-memory LRU.
+        """
+        self.path = path
+        self.max_memory = max_memory
+        self._memory = OrderedDict()     # key -> (response, expires_at)
+        self._db = None
+        self._db_failed = False
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "bypassed": 0, "stores": 0}
+
+    def _connection(self):
+        if self._db is None and self.path and not self._db_failed:
+            try:
+                folder = os.path.dirname(self.path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, prompt TEXT, response TEXT, created REAL, expires REAL)")
+                db.commit()
+                self._db = db
+            except sqlite3.Error as e:
+                print(f"Warning: response cache on disk unavailable ({e}), using memory only")
+                self._db_failed = True
+        return self._db
+
+    def _remember(self, key, response, expires):
+        self._memory[key] = (response, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def get(self, key, now=None):
+        """Cached response for key, or None if missing or expired"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+                self._counts["expired"] += 1
+
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT response, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    response, expires = row
+                    if expires > now:
+                        self._remember(key, response, expires)
+                        self._counts["disk_hits"] += 1
+                        return response
+                    self._counts["expired"] += 1
+
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, key, response, ttl=DEFAULT_TTL, prompt="", now=None):
+        """Store response for key for ttl seconds"""
+        now = time.time() if now is None else now
+        expires = now + ttl
+        with self._lock:
+            self._remember(key, response, expires)
+            self._counts["stores"] += 1
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                               (key, prompt, response, now, expires))
+                    db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: could not store cached response ({e})")
+
+    def entries(self, limit=1000, now=None):
+        """(key, prompt, response, expires) of the newest unexpired entries on disk"""
+        now = time.time() if now is None else now
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            try:
+                return db.execute("SELECT key, prompt, response, expires FROM responses WHERE expires > ? "
+                                  "ORDER BY created DESC LIMIT ?", (now, limit)).fetchall()
+            except sqlite3.Error:
+                return []
+
+    def record_bypass(self):
+        """Count a lookup that was skipped (e.g. a time-sensitive prompt)"""
+        with self._lock:
+            self._counts["bypassed"] += 1
+
+    def prune(self, now=None):
+        """Delete expired entries from both tiers; returns how many left the disk"""
+        now = time.time() if now is None else now
+        with self._lock:
+            for key in [k for k, (_, expires) in self._memory.items() if expires <= now]:
+                del self._memory[key]
+            db = self._connection()
+            if db is None:
+                return 0
+            removed = db.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+            db.commit()
+            return removed
+
+    def clear(self):
+        """Forget every cached response"""
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self):
+        """Hit/miss counters plus the hit rate and entry counts"""
+        with self._lock:
+            stats = dict(self._counts)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            db = self._connection()
+            stats["disk_entries"] = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if db else 0
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
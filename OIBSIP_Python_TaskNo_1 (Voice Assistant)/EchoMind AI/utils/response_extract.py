@@ -0,0 +1,224 @@
+"""Single-pass extraction of the answer from a Gemini response
+
+extract_response() turns whatever came back from the API (a parsed JSON
+object, a JSON body, or plain text) into the text to speak plus the
+response metadata:
+
+- a JSON body is parsed once and the text is read from the provider schema
+  (candidates -> content -> parts, output, choices, or a flat text key);
+  only an unknown JSON shape falls back to its longest string value
+- plain text only gets the cheap cleanup: system prompt echoes and
+  whitespace runs are removed, and JSON fragments only when there are any
+
+Handlers speak the text as returned; they no longer run their own cleanup
+chain over it.
+"""
+import json
+import re
+from collections import namedtuple
+
+Extraction = namedtuple("Extraction", ["text", "finish_reason", "model_version", "usage", "source"])
+Extraction.__doc__ = """Answer text plus metadata; source is "schema", "json", "text" or "empty"."""
+
+EMPTY = Extraction("", None, None, None, "empty")
+
+# Start-of-line echoes of the instructions in build_prompt()/GEMINI_PROMPT_WRAPPER,
+# removed one after the other (removing one can bring the next to a line start)
+_ECHO_RES = [re.compile(pattern, re.MULTILINE | re.IGNORECASE) for pattern in (
+    r"^you are a voice assistant[^.\n]*\.",
+    r"^answer the user['\']?s question[^.\n]*\.",
+    r"^respond only with[^.\n]*\.",
+    r"^i will provide[^.\n]*\.",
+    r"^okay[,.]?\s*(?:i\s+)?understand\.\s*",
+)]
+_ECHO_START_RE = re.compile(r"^(?:you are|answer the|respond only|i will provide|okay)", re.MULTILINE | re.IGNORECASE)
+_JSON_PAIR_RE = re.compile(r'"[^"]*":\s*(?:\{[^}]*\}|\[[^\]]*\]|"[^"]*"|[^,}\]]*)')
+_QUOTED_LINE_RE = re.compile(r'^"([^"]+)"$', re.MULTILINE)
+_LEADING_PUNCT_RE = re.compile(r"^[\{\[\,\s]+")
+_TRAILING_PUNCT_RE = re.compile(r"[\}\]\,\s]+$")
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_METADATA_MARKERS = ('"candidates"', "usageMetadata", "modelVersion", "responseId", "avgLogprobs")
+
+
+def _remove_echoes(text):
+    for pattern in _ECHO_RES:
+        text = pattern.sub("", text)
+    return text
+
+
+def _tidy(text):
+    """Remove prompt echoes and whitespace runs from answer text"""
+    text = text.strip()
+    if _ECHO_START_RE.search(text):
+        text = _remove_echoes(text)
+    if "  " in text or "\t" in text:
+        text = _SPACES_RE.sub(" ", text)
+    if "\n" in text:
+        text = _BLANK_LINES_RE.sub("\n", text)
+    text = text.strip()
+    return text if any(ch.isalnum() for ch in text) else ""
+
+
+def clean_text(text):
+    """Strip JSON keys, metadata and prompt echoes from text (strip_json_noise)
+
+    Each pattern only runs when the text contains what it looks for, so
+    plain answers cost a few substring checks.
+    """
+    if not isinstance(text, str):
+        return str(text)
+    text = text.strip()
+    if _ECHO_START_RE.search(text):
+        text = _remove_echoes(text)
+    if '":' in text:
+        text = _JSON_PAIR_RE.sub("", text)
+    if '"' in text:
+        text = _QUOTED_LINE_RE.sub(r"\1", text)
+    text = _LEADING_PUNCT_RE.sub("", text)
+    text = _TRAILING_PUNCT_RE.sub("", text)
+    if "  " in text or "\t" in text:
+        text = _SPACES_RE.sub(" ", text)
+    if "\n" in text:
+        text = _BLANK_LINES_RE.sub("\n", text)
+    text = text.strip()
+    return text if any(ch.isalnum() for ch in text) else ""
+
+
+def schema_text(data):
+    """Unstripped answer text at the known provider locations
+
+    Returns None when data has none of them (an unknown shape), and "" for a
+    known response without text (e.g. a blocked prompt). A list (streamed
+    frames) gives the text of all its items.
+    """
+    if isinstance(data, list):
+        texts = [schema_text(item) for item in data]
+        if all(text is None for text in texts):
+            return None
+        return "".join(text for text in texts if text)
+    if not isinstance(data, dict):
+        return None
+
+    candidates = data.get("candidates")
+    if isinstance(candidates, list):
+        candidate = candidates[0] if candidates else None
+        if not isinstance(candidate, dict):
+            return ""
+        content = candidate.get("content")
+        parts = content.get("parts") if isinstance(content, dict) else None
+        if isinstance(parts, list):
+            return "".join(
+                part["text"] for part in parts
+                if isinstance(part, dict) and isinstance(part.get("text"), str) and not part.get("thought"))
+        return candidate["text"] if isinstance(candidate.get("text"), str) else ""
+
+    output = data.get("output")
+    if isinstance(output, list) and output and isinstance(output[0], dict):
+        content = output[0].get("content")
+        if isinstance(content, list):
+            return "".join(item["text"] for item in content
+                           if isinstance(item, dict) and isinstance(item.get("text"), str))
+
+    choices = data.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        choice = choices[0]
+        message = choice.get("message") or choice.get("delta")
+        if isinstance(message, dict) and isinstance(message.get("content"), str):
+            return message["content"]
+        return choice["text"] if isinstance(choice.get("text"), str) else ""
+
+    for key in ("text", "content", "response", "output", "completion"):
+        if isinstance(data.get(key), str):
+            return data[key]
+    if "promptFeedback" in data or "usageMetadata" in data:
+        return ""
+    return None
+
+
+def _longest_string(data):
+    longest = ""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            item = item.strip()
+            if len(item) > len(longest):
+                longest = item
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return longest
+
+
+def _metadata(data):
+    """(finish_reason, model_version, usage) of a response or its last frame"""
+    if isinstance(data, list):
+        frames = [item for item in data if isinstance(item, dict)]
+        data = frames[-1] if frames else None
+    if not isinstance(data, dict):
+        return None, None, None
+
+    finish_reason = None
+    candidates = data.get("candidates")
+    choices = data.get("choices")
+    if isinstance(candidates, list) and candidates and isinstance(candidates[0], dict):
+        finish_reason = candidates[0].get("finishReason")
+    elif isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        finish_reason = choices[0].get("finish_reason")
+    feedback = data.get("promptFeedback")
+    if finish_reason is None and isinstance(feedback, dict):
+        finish_reason = feedback.get("blockReason")
+    usage = data.get("usageMetadata") or data.get("usage")
+    return finish_reason, data.get("modelVersion") or data.get("model"), usage if isinstance(usage, dict) else None
+
+
+def _from_data(data):
+    text = schema_text(data)
+    source = "schema"
+    if text is None:
+        text = _longest_string(data)
+        source = "json"
+    finish_reason, model_version, usage = _metadata(data)
+    return Extraction(_tidy(text), finish_reason, model_version, usage, source)
+
+
+def _from_text(text):
+    if any(marker in text for marker in _METADATA_MARKERS) or "{" in text:
+        # JSON fragments mixed into the text: drop the structural lines first
+        lines = []
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped or stripped[0] in "{}[" or stripped[-1] == "]":
+                continue
+            if any(marker in line for marker in _METADATA_MARKERS):
+                continue
+            lines.append(line)
+        kept = clean_text("\n".join(lines))
+        if kept:
+            return Extraction(kept, None, None, None, "text")
+    return Extraction(clean_text(text), None, None, None, "text")
+
+
+def extract_response(raw):
+    """Answer text and metadata from a raw response (str, bytes, dict, list or None)"""
+    if raw is None:
+        return EMPTY
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("utf-8", errors="ignore")
+    if isinstance(raw, (dict, list)):
+        return _from_data(raw)
+    if not isinstance(raw, str):
+        raw = str(raw)
+
+    text = raw.strip()
+    if not text:
+        return EMPTY
+    if text[0] in "{[":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return Extraction(clean_text(text), None, None, None, "text")
+        return _from_data(data)
+    return _from_text(text)
@@ -0,0 +1,168 @@
+"""Near-duplicate lookup for cached Gemini answers
+
+The exact cache (utils/response_cache.py) only matches prompts that are equal
+after normalization. Rephrasings ("what's the capital of france" / "capital
+of france?") are found here instead:
+
+- a prompt becomes a set of shingles: its content words (filler such as
+  "what's", "the", "tell me" dropped) and the pairs of adjacent ones
+- a MinHash signature of the set is split into LSH bands, so a lookup only
+  compares the prompts that share a band with it instead of all of them
+- candidates are confirmed with the exact Jaccard similarity of the sets;
+  the best one at or above the threshold is a hit
+
+Question words other than "what" are kept, so "when was X born" and "where
+was X born" stay different questions. Tense-bearing auxiliaries become a
+tense marker ("was", "were", "did" -> past; "will" -> future) and a past
+prompt only matches a prompt with the same tense, so "who is the
+president" never gets the answer to "who was the president". Entries
+expire after their TTL and the least recently used ones are evicted past
+max_entries.
+"""
+import hashlib
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from utils.response_cache import DEFAULT_TTL, normalize_prompt
+
+_STOPWORDS = frozenset((
+    "a", "an", "the", "of", "to", "in", "on", "for", "at", "by", "with", "from", "and", "or",
+    "is", "are", "be", "am", "do", "does", "can", "could", "should", "please", "tell", "me", "us",
+    "i", "would", "what", "what's", "whats", "it", "its", "explain", "describe", "give", "know",
+    "hey", "okay", "ok", "so", "just", "about", "you",
+))
+# Auxiliaries that change the answer: kept as one marker per tense ("~" never survives normalize_prompt)
+_TENSES = {"was": "~past", "were": "~past", "did": "~past", "had": "~past", "been": "~past",
+           "will": "~future", "shall": "~future"}
+_TENSE_MARKERS = frozenset(_TENSES.values())
+
+
+def _word(word):
+    """Drop a possessive/contraction "'s" and a plural "s" (rainbows -> rainbow, who's -> who)"""
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    return word
+
+
+def shingles(prompt):
+    """Content words of prompt plus every pair of adjacent ones"""
+    words = [_TENSES.get(word) or _word(word) for word in normalize_prompt(prompt).split() if word not in _STOPWORDS]
+    return frozenset(words + [f"{first} {second}" for first, second in zip(words, words[1:])])
+
+
+def same_tense(first, second):
+    """True if both shingle sets carry the same tense markers (none for the present)"""
+    return first & _TENSE_MARKERS == second & _TENSE_MARKERS
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class SimilarityCache:
+    """MinHash/LSH index of past prompts and their answers (thread-safe)"""
+
+    def __init__(self, threshold=0.8, max_entries=1000, num_perm=64, bands=16):
+        """
+        Args:
+            threshold: Jaccard similarity a past prompt needs to count as the same question.
+            max_entries: Prompts kept; the least recently used are evicted first.
+            num_perm: MinHash functions per signature (a multiple of bands).
+            bands: LSH bands; more bands find less similar candidates.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        # num_perm independent 32-bit hashes per shingle, from one SHAKE digest
+        self._unpack = struct.Struct(f"<{self.rows * bands}I").unpack
+        self._entries = OrderedDict()   # shingle set -> (response, expires, band keys)
+        self._buckets = [{} for _ in range(bands)]  # band key -> shingle sets
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0, "expired": 0, "lookup_seconds": 0.0}
+
+    def _band_keys(self, tokens):
+        unpack = self._unpack
+        size = unpack.__self__.size
+        columns = [unpack(hashlib.shake_128(token.encode("utf-8")).digest(size)) for token in tokens]
+        signature = list(map(min, *columns)) if len(columns) > 1 else columns[0]
+        rows = self.rows
+        return [hash(tuple(signature[i * rows:(i + 1) * rows])) for i in range(self.bands)]
+
+    def _remove(self, tokens):
+        _, _, band_keys = self._entries.pop(tokens)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(tokens)
+                if not members:
+                    del bucket[band_key]
+
+    def get(self, prompt, now=None):
+        """(answer, similarity) of the closest past prompt, or None below the threshold"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        tokens = shingles(prompt)
+        with self._lock:
+            best = None
+            if tokens:
+                candidates = set()
+                for bucket, band_key in zip(self._buckets, self._band_keys(tokens)):
+                    candidates.update(bucket.get(band_key, ()))
+                for candidate in candidates:
+                    response, expires, _ = self._entries[candidate]
+                    if expires <= now:
+                        self._remove(candidate)
+                        self._counts["expired"] += 1
+                        continue
+                    if not same_tense(tokens, candidate):
+                        continue
+                    score = jaccard(tokens, candidate)
+                    if score >= self.threshold and (best is None or score > best[1]):
+                        best = (candidate, score)
+            self._counts["hits" if best else "misses"] += 1
+            self._counts["lookup_seconds"] += time.perf_counter() - started
+            if best is None:
+                return None
+            self._entries.move_to_end(best[0])
+            return self._entries[best[0]][0], best[1]
+
+    def put(self, prompt, response, ttl=DEFAULT_TTL, now=None):
+        """Index prompt with its answer for ttl seconds"""
+        tokens = shingles(prompt)
+        if not tokens:
+            return
+        now = time.time() if now is None else now
+        band_keys = self._band_keys(tokens)
+        with self._lock:
+            if tokens in self._entries:
+                self._remove(tokens)
+            self._entries[tokens] = (response, now + ttl, band_keys)
+            for bucket, band_key in zip(self._buckets, band_keys):
+                bucket.setdefault(band_key, set()).add(tokens)
+            self._counts["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counts["evicted"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def stats(self):
+        """Hit/miss counters, entry count and the average lookup time"""
+        with self._lock:
+            stats = dict(self._counts)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["avg_lookup_us"] = stats.pop("lookup_seconds") * 1e6 / lookups if lookups else 0.0
+            stats["entries"] = len(self._entries)
+            return stats
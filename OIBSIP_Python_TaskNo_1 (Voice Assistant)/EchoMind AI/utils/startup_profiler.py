@@ -0,0 +1,79 @@
+"""Startup profiler for EchoMind AI
+
+Enabled with `python main_refactored.py --profile-startup`. It wraps the
+import machinery to time every module imported during startup and records
+named milestones (e.g. the first greeting), then prints a report.
+
+install() has to run before the modules being measured are imported.
+"""
+import builtins
+import sys
+import time
+
+_original_import = None
+_start = None
+_stack = []          # [module name, start time, time spent in nested imports]
+_imports = {}        # module name -> (cumulative seconds, self seconds)
+_marks = []          # (label, seconds since install)
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Already imported (or a relative import we cannot cheaply resolve): no cost to record
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    _stack.append([name, time.perf_counter(), 0.0])
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        module_name, started, nested = _stack.pop()
+        elapsed = time.perf_counter() - started
+        if module_name not in _imports:
+            _imports[module_name] = (elapsed, elapsed - nested)
+        if _stack:
+            _stack[-1][2] += elapsed
+
+
+def install():
+    """Start timing imports and milestones"""
+    global _original_import, _start
+    if _original_import is not None:
+        return
+    _start = time.perf_counter()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def uninstall():
+    """Restore the normal import machinery"""
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def is_active():
+    """True while the profiler is installed"""
+    return _original_import is not None
+
+
+def mark(label):
+    """Record a named milestone (seconds since install)"""
+    if _start is not None:
+        _marks.append((label, time.perf_counter() - _start))
+
+
+def report(top=25):
+    """Print the slowest imports and the recorded milestones"""
+    print("\n=== Startup profile ===")
+    print(f"{'module':<40}{'cumulative (ms)':>16}{'self (ms)':>12}")
+    slowest = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (cumulative, own) in slowest[:top]:
+        print(f"{name:<40}{cumulative * 1000:>16.1f}{own * 1000:>12.1f}")
+    total_self = sum(own for _, own in _imports.values())
+    print(f"{len(_imports)} modules imported, {total_self * 1000:.1f} ms in total")
+
+    if _marks:
+        print("\nMilestones (since startup):")
+        for label, at in _marks:
+            print(f"  {label:<36}{at * 1000:>10.1f} ms")
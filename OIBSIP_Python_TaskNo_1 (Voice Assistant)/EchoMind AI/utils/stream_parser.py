@@ -0,0 +1,228 @@
+"""Incremental parser for streamed Gemini responses
+
+The streaming endpoint sends either server-sent events
+(`?alt=sse`: "data: {json}" lines, events separated by blank lines) or one JSON
+array whose elements arrive piece by piece ("[{...},\\r\\n{...}]"). A
+StreamParser is fed the raw network reads as they come in and returns the
+text deltas of every frame completed so far:
+
+- each character is scanned once: the scan position is kept between reads
+  and only structural characters (braces, quotes and backslashes, or line
+  ends for SSE) are looked at, using C-level searches
+- a frame split across reads is simply completed by the next read, and a
+  UTF-8 sequence split across reads is decoded incrementally
+- every complete frame is parsed once with json.loads and its text is taken
+  from the response schema (candidates[0].content.parts[*].text)
+
+The deltas keep their whitespace exactly, so joining them gives the answer
+as the model wrote it.
+"""
+import codecs
+import json
+import re
+from utils import response_extract
+
+# Outside strings only braces and quotes matter; inside, quotes and escapes
+_JSON_STRUCTURE_RE = re.compile(r'[{}"]')
+_JSON_STRING_RE = re.compile(r'["\\]')
+_SSE_FIELDS = ("data", "event", "id", "retry", ":")
+
+
+def frame_text(frame):
+    """Text delta carried by one parsed response frame ("" if none)
+
+    Read from the response schema (see response_extract.schema_text), with
+    the text left exactly as sent.
+    """
+    if isinstance(frame, str):
+        return frame
+    return response_extract.schema_text(frame) or ""
+
+
+class StreamParser:
+    """Turns raw network reads of a streamed response into text deltas"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._pos = 0              # everything before this was already scanned
+        self.mode = None           # "sse", "json" or "text" (detected from the first data)
+        self.frames = 0            # complete frames parsed
+        self.bad_frames = 0        # frames that were not valid JSON
+        self.usage = None          # usageMetadata of the latest frame that had it
+        # JSON mode scan state
+        self._depth = 0
+        self._in_string = False
+        self._frame_start = None
+        # SSE mode: data lines of the event being read
+        self._data = []
+
+    def feed(self, data):
+        """Add the next read (bytes or str); returns the new, non-empty text deltas"""
+        if isinstance(data, (bytes, bytearray)):
+            data = self._decoder.decode(data)
+        if not data:
+            return []
+        self._buffer += data
+
+        if self.mode is None:
+            head = self._buffer.lstrip()
+            if not head:
+                return []
+            if head[0] in "[{":
+                self.mode = "json"
+            elif head.startswith(_SSE_FIELDS):
+                self.mode = "sse"
+            elif any(field.startswith(head) for field in _SSE_FIELDS):
+                return []  # too short to tell yet ("da...")
+            else:
+                self.mode = "text"
+
+        if self.mode == "json":
+            return self._feed_json()
+        if self.mode == "sse":
+            return self._feed_sse()
+        text, self._buffer = self._buffer, ""
+        return [text]
+
+    def close(self):
+        """Flush what is left at the end of the stream; returns the last deltas"""
+        tail = self._decoder.decode(b"", final=True)
+        deltas = self.feed(tail) if tail else []
+        if self.mode is None and self._buffer.strip():
+            self.mode = "text"
+            deltas.append(self._buffer)
+            self._buffer = ""
+        if self.mode == "sse":
+            # The last line and event do not need a trailing newline / blank line
+            line, self._buffer, self._pos = self._buffer.rstrip("\r"), "", 0
+            for text in (self._sse_line(line) if line else "", self._sse_dispatch()):
+                if text:
+                    deltas.append(text)
+        return deltas
+
+    def _frame(self, raw):
+        self.frames += 1
+        try:
+            frame = json.loads(raw)
+        except ValueError:
+            self.bad_frames += 1
+            return ""
+        return self._text(frame)
+
+    def _text(self, frame):
+        if isinstance(frame, dict) and isinstance(frame.get("usageMetadata"), dict):
+            self.usage = frame["usageMetadata"]
+        return frame_text(frame)
+
+    def _feed_json(self):
+        deltas = []
+        buffer = self._buffer
+        pos = self._pos
+        end = len(buffer)
+        while pos < end:
+            if self._in_string:
+                match = _JSON_STRING_RE.search(buffer, pos)
+                if match is None:
+                    pos = end
+                    break
+                if match.group() == "\\":
+                    if match.end() == end:
+                        # The escaped character is in the next read
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _JSON_STRUCTURE_RE.search(buffer, pos)
+            if match is None:
+                pos = end
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._frame_start = match.start()
+                self._depth += 1
+            elif self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    text = self._frame(buffer[self._frame_start:pos])
+                    if text:
+                        deltas.append(text)
+                    self._frame_start = None
+
+        # Drop what has been consumed; keep an unfinished frame
+        keep = self._frame_start if self._frame_start is not None else pos
+        self._buffer = buffer[keep:]
+        self._pos = pos - keep
+        if self._frame_start is not None:
+            self._frame_start = 0
+        return deltas
+
+    def _feed_sse(self):
+        deltas = []
+        buffer = self._buffer
+        start = 0
+        while True:
+            newline = buffer.find("\n", self._pos)
+            if newline < 0:
+                break
+            line = buffer[start:newline].rstrip("\r")
+            start = self._pos = newline + 1
+            text = self._sse_line(line)
+            if text:
+                deltas.append(text)
+        # Keep the unfinished line; it is not searched again
+        self._buffer = buffer[start:]
+        self._pos = len(self._buffer)
+        return deltas
+
+    def _sse_line(self, line):
+        if not line:
+            # A blank line ends the event
+            return self._sse_dispatch()
+        if not line.startswith("data:"):
+            return ""  # event:, id:, retry: and ":" comments carry no text
+        payload = line[5:]
+        if payload[:1] == " ":
+            payload = payload[1:]
+        self._data.append(payload)
+        # Gemini puts each frame on one data line: hand it over without
+        # waiting for the blank line (some servers never send one)
+        if len(self._data) == 1 and payload[-1:] in ("}", "]"):
+            try:
+                frame = json.loads(payload)
+            except ValueError:
+                return ""
+            self._data = []
+            self.frames += 1
+            return self._text(frame)
+        return ""
+
+    def _sse_dispatch(self):
+        if not self._data:
+            return ""
+        payload = "\n".join(self._data)
+        self._data = []
+        if payload.strip() == "[DONE]":
+            return ""
+        return self._frame(payload)
+
+
+def parse_stream(reads, parser=None):
+    """Yield the text deltas of an iterable of raw reads (bytes or str)
+
+    Pass a StreamParser to read its counters and usage afterwards.
+    """
+    parser = parser if parser is not None else StreamParser()
+    for data in reads:
+        for text in parser.feed(data):
+            yield text
+    for text in parser.close():
+        yield text
@@ -0,0 +1,227 @@
+"""Speech-to-text backends
+
+listen() in utils/voice_io.py hands recorded audio (speech_recognition
+AudioData) to recognize(), which uses the engine selected by STT_BACKEND:
+
+- google:  Google Web Speech API (network round trip per command)
+- vosk:    offline Kaldi models (pip install vosk, model folder in VOSK_MODEL_PATH)
+- whisper: offline OpenAI Whisper models (pip install openai-whisper)
+- file:    returns the lines of STT_TRANSCRIPT_FILE in order, ignoring the
+           audio; deterministic, for tests and scripted sessions
+
+Backends raise speech_recognition's UnknownValueError when nothing was
+understood and RequestError when the engine itself failed; on RequestError
+the STT_FALLBACK engine (if any) gets the same audio. Every recognition is
+timed so engines can be compared (see recognition_stats() and
+benchmarks/stt_benchmark.py). Further engines can be added with
+register_backend().
+"""
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from config.settings import (
+    STT_BACKEND, STT_FALLBACK, VOSK_MODEL_PATH, WHISPER_MODEL, STT_TRANSCRIPT_FILE,
+)
+from utils import metrics_endpoint, tracing
+
+# backend:       name of the engine that produced the result
+# audio_seconds: length of the recognized audio
+# latency:       seconds spent recognizing
+# ok:            False if the engine raised (nothing understood or failure)
+RecognitionTiming = namedtuple("RecognitionTiming", ["backend", "audio_seconds", "latency", "ok"])
+
+
+def _sr():
+    # Imported on first use so it does not delay the startup greeting
+    import speech_recognition as sr
+    return sr
+
+
+def audio_duration(audio):
+    """Seconds of audio in an AudioData"""
+    return len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+
+class GoogleBackend:
+    """Google Web Speech API through speech_recognition"""
+
+    name = "google"
+
+    def __init__(self):
+        self._recognizer = _sr().Recognizer()
+
+    def recognize(self, audio):
+        return self._recognizer.recognize_google(audio)
+
+
+class VoskBackend:
+    """Offline recognition with a Vosk model loaded once"""
+
+    name = "vosk"
+    sample_rate = 16000
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(model_path)
+
+    def recognize(self, audio):
+        recognizer = self._vosk.KaldiRecognizer(self._model, self.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise _sr().UnknownValueError()
+        return text
+
+
+class WhisperBackend:
+    """Offline recognition with a Whisper model loaded once"""
+
+    name = "whisper"
+    sample_rate = 16000
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        import numpy
+        import whisper
+        self._numpy = numpy
+        self._model = whisper.load_model(model_name)
+
+    def recognize(self, audio):
+        raw = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        samples = self._numpy.frombuffer(raw, self._numpy.int16).astype(self._numpy.float32) / 32768.0
+        result = self._model.transcribe(samples, fp16=False, language="en")
+        text = result.get("text", "").strip()
+        if not text:
+            raise _sr().UnknownValueError()
+        return text
+
+
+class FileBackend:
+    """Returns the lines of a transcript file in order (the audio is ignored)
+
+    An empty line stands for speech that was not understood.
+    """
+
+    name = "file"
+
+    def __init__(self, path=STT_TRANSCRIPT_FILE):
+        if not path:
+            raise ValueError("STT_TRANSCRIPT_FILE is not set")
+        with open(path, encoding="utf-8") as f:
+            self._lines = deque(line.rstrip("\n") for line in f)
+
+    def recognize(self, audio):
+        if not self._lines:
+            raise _sr().UnknownValueError()
+        text = self._lines.popleft().strip()
+        if not text:
+            raise _sr().UnknownValueError()
+        return text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperBackend,
+    "file": FileBackend,
+}
+
+
+def register_backend(name, factory):
+    """Make a backend available as STT_BACKEND=name
+
+    factory() must return an object with a name attribute and a
+    recognize(audio) method following the conventions above.
+    """
+    BACKENDS[name] = factory
+
+
+def create_backend(name):
+    """Create a backend, falling back to Google if it cannot be loaded"""
+    factory = BACKENDS.get(name)
+    if factory is None:
+        print(f"Warning: unknown STT backend '{name}', using google")
+        return GoogleBackend()
+    try:
+        return factory()
+    except Exception as e:
+        # ImportError when the package is missing, OSError/ValueError for models and files
+        if name == "google":
+            raise
+        print(f"Warning: STT backend '{name}' unavailable ({e}), using google")
+        return GoogleBackend()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+_timings = deque(maxlen=200)
+
+
+def get_backend(name=None):
+    """Return the (shared) backend instance for name, default STT_BACKEND"""
+    name = name or STT_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_backend(name)
+        return _backends[name]
+
+
+def recognize_with(backend, audio):
+    """Run one backend on AudioData and record its timing (text as returned)"""
+    started = time.perf_counter()
+    ok = False
+    try:
+        text = backend.recognize(audio)
+        ok = True
+        return text
+    finally:
+        latency = time.perf_counter() - started
+        _timings.append(RecognitionTiming(backend.name, audio_duration(audio), latency, ok))
+        metrics_endpoint.STT_SECONDS.observe(latency, backend=backend.name, ok=ok)
+        tracing.add_span("stt:" + backend.name, started, ok=ok)
+
+
+def recognize(audio):
+    """Transcribe AudioData with the configured engine (lowercase text)
+
+    Raises UnknownValueError / RequestError like speech_recognition does.
+    """
+    sr = _sr()
+    try:
+        return recognize_with(get_backend(), audio).lower()
+    except sr.RequestError as e:
+        if not STT_FALLBACK or STT_FALLBACK == STT_BACKEND:
+            raise
+        print(f"Speech service error: {e}, trying {STT_FALLBACK}")
+        return recognize_with(get_backend(STT_FALLBACK), audio).lower()
+
+
+def last_timing():
+    """Timing of the most recent recognition, or None"""
+    return _timings[-1] if _timings else None
+
+
+def recent_timings():
+    """Timings of the most recent recognitions, oldest first"""
+    return list(_timings)
+
+
+def recognition_stats(timings=None):
+    """Average latency per backend: {backend: {count, failed, latency, real_time_factor}}"""
+    grouped = {}
+    for timing in (recent_timings() if timings is None else timings):
+        grouped.setdefault(timing.backend, []).append(timing)
+
+    stats = {}
+    for backend, items in grouped.items():
+        audio_seconds = sum(t.audio_seconds for t in items)
+        latency = sum(t.latency for t in items)
+        stats[backend] = {
+            "count": len(items),
+            "failed": sum(1 for t in items if not t.ok),
+            "latency": latency / len(items),
+            "real_time_factor": latency / audio_seconds if audio_seconds else None,
+        }
+    return stats
@@ -50,6 +50,13 @@ def clean_connector_words(text):
             return text[len(connector):].strip()
     return text
 
+# Common question words, as one pattern so the text is scanned once
+_QUESTION_WORDS_RE = re.compile(
+    r'\b(?:how|what|when|where|why|whom|whose|which|do|does|did|'
+    r'could|can|will|should|would|may|might|must|has|have|'
+    r'is|are|was|were)\b'
+)
+
 def is_question(text):
     """Detect if text is a question based on question words or punctuation"""
     if not text:
@@ -60,20 +67,7 @@ def is_question(text):
         return True
     
     # Common question words
-    question_words = [
-        r'\bhow\b', r'\bwhat\b', r'\bwhen\b', r'\bwhere\b', r'\bwhy\b', r'\bwhom\b',
-        r'\bwhose\b', r'\bwhich\b', r'\bdo\b', r'\bdoes\b', r'\bdid\b',
-        r'\bcould\b', r'\bcan\b', r'\bwill\b', r'\bshould\b', r'\bwould\b',
-        r'\bmay\b', r'\bmight\b', r'\bmust\b', r'\bhas\b', r'\bhave\b',
-        r'\bis\b', r'\bare\b', r'\bwas\b', r'\bwere\b'
-    ]
-    
-    text_lower = text.lower().strip()
-    for pattern in question_words:
-        if re.search(pattern, text_lower):
-            return True
-    
-    return False
+    return bool(_QUESTION_WORDS_RE.search(text.lower().strip()))
 
 def ensure_question_mark_if_question(command, response=None):
     """
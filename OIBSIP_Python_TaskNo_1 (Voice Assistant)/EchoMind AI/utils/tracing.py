@@ -0,0 +1,247 @@
+"""Per-utterance span tracing in Chrome trace format
+
+The main loop wraps every utterance in utterance(); listening, speech
+recognition, routing, each handler that runs, Gemini calls and their HTTP
+attempts and speech are recorded inside it as spans:
+
+    with tracing.span("route"):
+        ...
+
+Spans are (name, start, end, thread) records; nesting follows from their
+times on each thread, as in the Chrome/Perfetto viewers. Spans from other
+threads (the Gemini event loop, batch workers) belong to the utterance that
+is current while they run; speech carries the utterance it was queued in.
+
+The last TRACE_KEEP utterances are kept for summary() (p50/p95 per span
+name) and written to TRACE_FILE, a trace JSON with one process per
+utterance, to open in https://ui.perfetto.dev or chrome://tracing. An
+utterance is written when the next one ends (or at shutdown()), so speech
+still playing when its command finished is included.
+
+With TRACE off, utterance() and span() return a shared no-op object after
+one global check; nothing is allocated or timed.
+
+Summary of a written trace (from the EchoMind AI folder):
+    python -m utils.tracing [--path logs/trace.json]
+"""
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from config.settings import TRACE, TRACE_FILE, TRACE_KEEP
+
+_current = None   # Trace of the utterance being handled (None: tracing off or idle)
+_pending = None   # finished Trace waiting for late spans (speech) before it is written
+_kept = deque(maxlen=TRACE_KEEP)
+_lock = threading.Lock()
+_numbers = iter(range(1, 1 << 62))
+
+
+class Trace:
+    """Spans recorded for one utterance"""
+
+    def __init__(self):
+        self.number = next(_numbers)
+        self.label = ""
+        self.spans = []      # (name, start, end, thread ident, args); list.append is atomic
+        self.threads = {}    # thread ident -> name
+
+    def add(self, name, start, end, args=None):
+        thread = threading.current_thread()
+        self.threads[thread.ident] = thread.name
+        self.spans.append((name, start, end, thread.ident, args))
+
+    def events(self):
+        """Chrome trace events: the spans plus process and thread names"""
+        pid = self.number
+        events = [{"name": "process_name", "ph": "M", "pid": pid,
+                   "args": {"name": f"utterance {pid}: {self.label}" if self.label else f"utterance {pid}"}}]
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                   for tid, name in self.threads.items()]
+        for name, start, end, tid, args in list(self.spans):
+            event = {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round(start * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+            if args:
+                event["args"] = args
+            events.append(event)
+        return events
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.set(error=exc_type.__name__)
+        self.trace.add(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+    def set(self, **args):
+        """Attach values (a result, a size) to the span"""
+        if self.args:
+            self.args.update(args)
+        else:
+            self.args = args
+
+
+class _NullSpan:
+    """What span() and utterance() return while nothing is traced"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def label(self, text):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+def span(name, **args):
+    """Context manager timing a block as a span of the current utterance"""
+    trace = _current
+    if trace is None:
+        return _NULL
+    return _Span(trace, name, args)
+
+
+def traced(name):
+    """Decorator: every call of the function is a span called name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_span(name, start, end=None, trace=None, **args):
+    """Record work timed elsewhere (time.perf_counter() values) in trace (default: the current one)"""
+    trace = _current if trace is None else trace
+    if trace is not None:
+        trace.add(name, start, time.perf_counter() if end is None else end, args)
+
+
+def current():
+    """Trace of the current utterance (None when not tracing), to hand to another thread"""
+    return _current
+
+
+class _Utterance(_Span):
+    def __init__(self):
+        super().__init__(Trace(), "utterance", None)
+
+    def __enter__(self):
+        global _current
+        _current = self.trace
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        global _current, _pending
+        super().__exit__(exc_type, exc, tb)
+        _current = None
+        with _lock:
+            previous, _pending = _pending, self.trace
+        if previous is not None:
+            _finish(previous)
+        return False
+
+    def label(self, text):
+        """Name the utterance after its command"""
+        self.trace.label = text
+
+
+def utterance():
+    """Context manager around one utterance (the root span); no-op when TRACE is off"""
+    if not TRACE:
+        return _NULL
+    return _Utterance()
+
+
+def _finish(trace):
+    _kept.append(trace)
+    events = [event for kept in list(_kept) for event in kept.events()]
+    try:
+        folder = os.path.dirname(TRACE_FILE)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(TRACE_FILE + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle)
+        os.replace(TRACE_FILE + ".tmp", TRACE_FILE)
+    except OSError as e:
+        print(f"Warning: could not write {TRACE_FILE}: {e}")
+
+
+def shutdown():
+    """Write the last utterance's trace"""
+    global _pending
+    with _lock:
+        trace, _pending = _pending, None
+    if trace is not None:
+        _finish(trace)
+
+
+def summarize(events):
+    """{span name: {count, p50_ms, p95_ms, max_ms}} of the complete ("X") events"""
+    from utils.call_metrics import percentile
+
+    durations = {}
+    for event in events:
+        if event.get("ph") == "X":
+            durations.setdefault(event["name"], []).append(event["dur"] / 1000.0)
+    return {name: {"count": len(values), "p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95),
+                   "max_ms": max(values)}
+            for name, values in durations.items()}
+
+
+def summary():
+    """summarize() over the utterances kept in memory (the last TRACE_KEEP)"""
+    kept = list(_kept)
+    if _pending is not None:
+        kept.append(_pending)
+    return summarize([event for trace in kept for event in trace.events()])
+
+
+def print_summary(stats, utterances=None):
+    if not stats:
+        print("No spans recorded")
+        return
+    if utterances is not None:
+        print(f"{utterances} utterances")
+    print(f"{'span':<32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, entry in sorted(stats.items(), key=lambda item: -item[1]["p50_ms"] * item[1]["count"]):
+        print(f"{name:<32}{entry['count']:>7}{entry['p50_ms']:>10.1f}{entry['p95_ms']:>10.1f}{entry['max_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="p50/p95 per span name of a written utterance trace")
+    parser.add_argument("--path", default=TRACE_FILE, help=f"trace JSON (default {TRACE_FILE})")
+    args = parser.parse_args()
+    with open(args.path, encoding="utf-8") as handle:
+        trace_events = json.load(handle)["traceEvents"]
+    print_summary(summarize(trace_events), sum(1 for event in trace_events if event.get("name") == "utterance"))
@@ -0,0 +1,262 @@
+"""Persistent text-to-speech worker
+
+A single background thread owns one TTS engine for the lifetime of the
+assistant and speaks queued utterances in order. speak() in utils/voice_io.py
+only enqueues, so callers are not blocked while a process or COM object is
+created for every sentence.
+
+Backends:
+- pyttsx3:    one engine instance kept alive (SAPI5 / NSSpeechSynthesizer / espeak)
+- subprocess: the original per-utterance system command (powershell SAPI, say,
+              espeak or festival), used when pyttsx3 is not installed
+- silent:     speaks nothing (load tests and headless runs)
+
+Every utterance is timed so backends can be compared (see speech_stats() and
+benchmarks/tts_benchmark.py).
+"""
+import queue
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+from config.settings import OS, TTS_BACKEND
+from utils import metrics_endpoint, tracing
+
+# backend:     name of the backend that spoke the utterance
+# chars:       length of the text
+# queued:      seconds between speak() and the worker picking it up
+# first_audio: seconds from synthesis start until audio started (None if the
+#              backend cannot tell)
+# total:       seconds the backend spent on the utterance (synthesis + playback)
+SpeechTiming = namedtuple("SpeechTiming", ["backend", "chars", "queued", "first_audio", "total"])
+
+
+class Pyttsx3Backend:
+    """Keeps one pyttsx3 engine alive; must be created on the worker thread"""
+
+    name = "pyttsx3"
+
+    def __init__(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self._audio_started = None
+        self.engine.connect("started-utterance", self._on_started)
+
+    def _on_started(self, name):
+        self._audio_started = time.perf_counter()
+
+    def say(self, text):
+        """Speak text, returning the seconds until audio started (or None)"""
+        self._audio_started = None
+        begin = time.perf_counter()
+        self.engine.say(text)
+        self.engine.runAndWait()
+        if self._audio_started is None:
+            return None
+        return self._audio_started - begin
+
+
+class SubprocessBackend:
+    """Runs the platform TTS command once per utterance"""
+
+    name = "subprocess"
+
+    def say(self, text):
+        """Speak text with the system command (first audio is not observable)"""
+        if OS == "windows":
+            subprocess.run(["powershell", "-c", f'(New-Object -ComObject SAPI.SpVoice).Speak("{text}")'], capture_output=True)
+        elif OS == "darwin":  # macOS
+            subprocess.run(["say", text], capture_output=True)
+        elif OS == "linux":
+            try:
+                subprocess.run(["espeak", text], capture_output=True)
+            except FileNotFoundError:
+                try:
+                    subprocess.run(["festival", "--tts"], input=text.encode(), capture_output=True)
+                except FileNotFoundError:
+                    print(f"TTS not available on this Linux system. Text: {text}")
+        else:
+            print(f"TTS not supported on {OS}. Text: {text}")
+        return None
+
+
+class SilentBackend:
+    """Discards utterances (for load tests and headless runs)"""
+
+    name = "silent"
+
+    def say(self, text):
+        return 0.0
+
+
+def create_backend(name=TTS_BACKEND):
+    """Create the configured backend, falling back to the system command"""
+    if name == "silent":
+        return SilentBackend()
+    if name in ("auto", "pyttsx3"):
+        try:
+            return Pyttsx3Backend()
+        except Exception as e:
+            # ImportError when not installed, RuntimeError/OSError when no driver works
+            if name == "pyttsx3":
+                print(f"Warning: pyttsx3 unavailable ({e}), using system TTS command")
+    return SubprocessBackend()
+
+
+class SpeechWorker(threading.Thread):
+    """Background thread that owns a TTS backend and drains the speech queue"""
+
+    def __init__(self, backend_name=TTS_BACKEND, history=200):
+        super().__init__(name="tts-worker", daemon=True)
+        self.backend_name = backend_name
+        self.backend = None
+        self.timings = deque(maxlen=history)
+        self._queue = queue.Queue()
+
+    def run(self):
+        # The engine is created here because pyttsx3 drivers are bound to
+        # the thread that initialised them
+        self.backend = create_backend(self.backend_name)
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                text, queued_at, on_start, trace = item
+                started = time.perf_counter()
+                if on_start is not None:
+                    on_start(started)
+                first_audio = None
+                try:
+                    first_audio = self.backend.say(text)
+                except Exception as e:
+                    print(f"Error in speaking: {e}")
+                    print(f"Text was: {text}")
+                total = time.perf_counter() - started
+                self.timings.append(SpeechTiming(
+                    self.backend.name, len(text), started - queued_at, first_audio, total))
+                metrics_endpoint.TTS_SECONDS.observe(total, backend=self.backend.name)
+                if trace is not None:
+                    # Speech belongs to the utterance it was queued in
+                    tracing.add_span("tts", started, trace=trace, backend=self.backend.name, chars=len(text))
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, text, on_start=None):
+        """Queue text to be spoken after anything already queued
+
+        on_start(timestamp) is called on the worker thread when the backend
+        starts on this utterance (time.perf_counter() clock).
+        """
+        self._queue.put((text, time.perf_counter(), on_start, tracing.current()))
+
+    def wait_until_idle(self, timeout=None):
+        """Block until every queued utterance has been spoken
+
+        Returns False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def is_speaking(self):
+        """True while there is queued or in-progress speech"""
+        return self._queue.unfinished_tasks > 0
+
+    def clear(self):
+        """Drop queued utterances that have not started yet"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                # Keep a pending stop request
+                self._queue.task_done()
+                self._queue.put(None)
+                return
+            self._queue.task_done()
+
+    def stop(self):
+        """Finish the queued speech, then end the thread"""
+        self._queue.put(None)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """Return the running speech worker, starting it on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = SpeechWorker()
+            _worker.start()
+        return _worker
+
+
+def say(text, wait=False, on_start=None):
+    """Queue text on the speech worker (blocking until spoken if wait=True)"""
+    worker = get_worker()
+    worker.enqueue(text, on_start)
+    if wait:
+        worker.wait_until_idle()
+
+
+def wait_until_idle(timeout=None):
+    """Block until queued speech has finished (no-op if nothing was spoken yet)"""
+    if _worker is None:
+        return True
+    return _worker.wait_until_idle(timeout)
+
+
+def is_speaking():
+    """True while speech is queued or playing"""
+    return _worker is not None and _worker.is_speaking()
+
+
+def clear():
+    """Drop speech that is queued but not playing yet (e.g. after "stop")"""
+    if _worker is not None:
+        _worker.clear()
+
+
+def shutdown(timeout=10.0):
+    """Let queued speech finish (up to timeout seconds) and stop the worker"""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is None:
+        return
+    worker.stop()
+    worker.join(timeout)
+
+
+def recent_timings():
+    """Timings of the most recent utterances, oldest first"""
+    worker = _worker
+    return list(worker.timings) if worker is not None else []
+
+
+def speech_stats(timings=None):
+    """Average latency per backend: {backend: {count, queued, first_audio, total}}"""
+    grouped = {}
+    for timing in (recent_timings() if timings is None else timings):
+        grouped.setdefault(timing.backend, []).append(timing)
+
+    stats = {}
+    for backend, items in grouped.items():
+        audio = [t.first_audio for t in items if t.first_audio is not None]
+        stats[backend] = {
+            "count": len(items),
+            "queued": sum(t.queued for t in items) / len(items),
+            "first_audio": sum(audio) / len(audio) if audio else None,
+            "total": sum(t.total for t in items) / len(items),
+        }
+    return stats
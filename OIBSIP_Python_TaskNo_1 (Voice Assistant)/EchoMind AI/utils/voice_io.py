@@ -1,91 +1,194 @@
 """Text-to-speech and voice input utilities"""
-import subprocess
-import speech_recognition as sr
-from config.settings import OS
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from config.settings import INTERRUPT_KEYWORDS, LISTEN_MODE, WAKE_WORD
+from utils import audio_capture, mic_session, stt, tracing, tts
 
-def speak(text):
-    """Cross-platform text-to-speech"""
+def speak(text, wait=False, on_start=None):
+    """Cross-platform text-to-speech
+
+    The text is queued on the persistent TTS worker (utils/tts.py) and this
+    returns immediately; pass wait=True to block until it has been spoken.
+    on_start(timestamp) is called when the worker starts speaking it.
+    """
     # Strip Markdown formatting (asterisks, bold markers) before speaking
     clean_text = text.replace("**", "").replace("*", "").replace("__", "").replace("_", "")
     print(f"Speaking: {clean_text}")
-    try:
-        if OS == "windows":
-            subprocess.run(["powershell", "-c", f'(New-Object -ComObject SAPI.SpVoice).Speak("{clean_text}")'], capture_output=True)
-        elif OS == "darwin":  # macOS
-            subprocess.run(["say", clean_text], capture_output=True)
-        elif OS == "linux":
-            try:
-                subprocess.run(["espeak", clean_text], capture_output=True)
-            except FileNotFoundError:
-                try:
-                    subprocess.run(["festival", "--tts"], input=clean_text.encode(), capture_output=True)
-                except FileNotFoundError:
-                    print(f"TTS not available on this Linux system. Text: {clean_text}")
-        else:
-            print(f"TTS not supported on {OS}. Text: {clean_text}")
-    except Exception as e:
-        print(f"Error in speaking: {e}")
-        print(f"Text was: {clean_text}")
+    tts.say(clean_text, wait=wait, on_start=on_start)
+
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed
+# by whitespace, or a line break. A sentence is only complete once the next
+# character has arrived, so "3.5" or a chunk ending in "." is never cut early.
+_SENTENCE_END_RE = re.compile(r'([.!?]+["\')\]]*)\s+|\n+')
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "st.", "vs.", "etc.", "e.g.", "i.e.", "no.", "approx."}
+
+# sentences:      number of segments handed to the TTS worker
+# chars:          characters spoken
+# first_sentence: seconds from the start of the stream until the first
+#                 sentence was queued (None if nothing was spoken)
+# first_audio:    seconds until the TTS worker started speaking it
+# total:          seconds until the stream was exhausted
+StreamMetrics = namedtuple("StreamMetrics", ["sentences", "chars", "first_sentence", "first_audio", "total"])
+
+# Metrics of the most recent speak_stream() call
+last_stream_metrics = None
 
 
-def speak_stream(chunks, min_buffer: int = 200, pause_on_punctuation: bool = False):
-    """Assemble an iterable/generator of text chunks into complete text.
+def split_sentences(buffer):
+    """Split text into (complete sentences, unfinished remainder)"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(buffer):
+        end = match.end(1) if match.group(1) else match.start()
+        sentence = buffer[start:end].strip()
+        if match.group(1) and sentence.rsplit(None, 1)[-1].lower() in _ABBREVIATIONS:
+            continue
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+@tracing.traced("speak_stream")
+def speak_stream(chunks, first_audio_timeout=10.0):
+    """Speak an iterable/generator of text chunks sentence by sentence.
 
     Behavior:
-    - Accumulates incoming chunks into a buffer
-    - Returns the complete assembled text
-    - Does NOT print or speak (caller is responsible for that)
+    - Buffers incoming chunks and cuts them at sentence boundaries
+    - Skips sentences without any letters or digits
+    - Queues every sentence on the TTS worker as soon as it is complete, so
+      the first sentence plays while later chunks are still arriving
+    - Returns the complete spoken text ("" if nothing usable arrived)
 
-    This ensures clean single output without duplication.
+    Timing for the call is stored in last_stream_metrics.
     """
-    buf = []
+    global last_stream_metrics
+    started = time.perf_counter()
+    first_sentence_at = None
+    first_audio_at = []
+    audio_started = threading.Event()
+    spoken = []
 
+    def _on_first_audio(timestamp):
+        first_audio_at.append(timestamp)
+        audio_started.set()
+
+    def _emit(text):
+        nonlocal first_sentence_at
+        if not any(ch.isalnum() for ch in text):
+            return
+        if first_sentence_at is None:
+            first_sentence_at = time.perf_counter()
+            speak(text, on_start=_on_first_audio)
+        else:
+            speak(text)
+        spoken.append(text)
+
+    buffer = ""
     for c in chunks:
         if not c:
             continue
         # ensure chunk is a string
         part = str(c)
-        buf.append(part)
+        # Some sources send trimmed chunks: keep sentences apart ("done." + "Next")
+        if buffer and buffer[-1] in ".!?" and part[:1].isupper():
+            buffer += " "
+        buffer += part
+        sentences, buffer = split_sentences(buffer)
+        for sentence in sentences:
+            _emit(sentence)
+    if buffer.strip():
+        _emit(buffer.strip())
+    finished = time.perf_counter()
+
+    first_audio = None
+    if first_sentence_at is not None and audio_started.wait(first_audio_timeout):
+        first_audio = first_audio_at[0] - started
+    last_stream_metrics = StreamMetrics(
+        sentences=len(spoken),
+        chars=sum(len(text) for text in spoken),
+        first_sentence=None if first_sentence_at is None else first_sentence_at - started,
+        first_audio=first_audio,
+        total=finished - started,
+    )
+
+    return " ".join(spoken)
+
 
-    # Assemble final text
-    final_text = "".join(buf).strip()
-    
-    return final_text
+_wake_gate = None
+# Commands heard while the assistant was busy, already recognized
+_carried_over = deque()
 
 
+def _report_recognized(command):
+    timing = stt.last_timing()
+    if timing is None:
+        print(f"You said: {command}")
+    else:
+        print(f"You said: {command} ({timing.backend}, {timing.latency * 1000:.0f} ms)")
+
+
+def _transcribe_for_wake_word(utterance):
+    """Recognize an utterance for the wake word gate (None if nothing usable)"""
+    import speech_recognition as sr
+    try:
+        return stt.recognize(audio_capture.to_audio_data(utterance))
+    except sr.UnknownValueError:
+        return None
+
+
+def _get_wake_gate():
+    global _wake_gate
+    if WAKE_WORD and _wake_gate is None:
+        _wake_gate = audio_capture.WakeWordGate(
+            WAKE_WORD, _transcribe_for_wake_word, on_wake=lambda: speak("Yes?"))
+    return _wake_gate
+
+
+@tracing.traced("listen")
 def listen():
-    """Function to listen to user's voice command"""
-    recognizer = sr.Recognizer()
+    """Function to listen to user's voice command
+
+    Uses the persistent microphone session (utils/mic_session.py): the stream
+    stays open and the noise calibration is reused between commands. With
+    LISTEN_MODE=background, utterances come from the background capture
+    thread instead (utils/audio_capture.py). The audio is transcribed by the
+    STT_BACKEND engine (utils/stt.py).
+    """
+    # Imported on first use so it does not delay the startup greeting
+    import speech_recognition as sr
+
     attempts = 3
-    ambient_duration = 1.5
     listen_timeout = 8
     phrase_time_limit = 12
 
-    try:
-        recognizer.dynamic_energy_threshold = True
-        recognizer.pause_threshold = 1.2
-    except Exception:
-        pass
+    if LISTEN_MODE == "background":
+        command = _listen_background(sr, attempts, listen_timeout)
+        return command if command is not None else _typed_input()
 
+    # Don't record the assistant's own voice
+    tts.wait_until_idle()
+    session = mic_session.get_session()
     for attempt in range(attempts):
-        with sr.Microphone() as source:
-            print("Listening...")
-            try:
-                recognizer.adjust_for_ambient_noise(source, duration=ambient_duration)
-            except Exception:
-                pass
-
-            try:
-                audio = recognizer.listen(source, timeout=listen_timeout, phrase_time_limit=phrase_time_limit)
-            except sr.WaitTimeoutError:
-                print("Listening timed out waiting for phrase.")
-                if attempt == attempts - 1:
-                    speak("I didn't hear anything. Could you please repeat?")
-                continue
+        print("Listening...")
+        try:
+            audio = session.listen(timeout=listen_timeout, phrase_time_limit=phrase_time_limit)
+        except sr.WaitTimeoutError:
+            print("Listening timed out waiting for phrase.")
+            if attempt == attempts - 1:
+                speak("I didn't hear anything. Could you please repeat?")
+            continue
+        except Exception as e:
+            # No microphone / PyAudio: typed input below still works
+            print(f"Microphone unavailable: {e}")
+            break
 
         try:
-            command = recognizer.recognize_google(audio).lower()
-            print(f"You said: {command}")
+            command = stt.recognize(audio)
+            _report_recognized(command)
             return command
         except sr.UnknownValueError:
             print("Speech not recognized (UnknownValueError)")
@@ -97,7 +200,110 @@ def listen():
             speak("Sorry, my speech service is down.")
             break
 
-    # Fallback to typed input
+    return _typed_input()
+
+
+def _listen_background(sr, attempts, listen_timeout):
+    """Take the next utterance queued by the background capture thread
+
+    Returns the command, or None when the typed fallback should be used.
+    """
+    if _carried_over:
+        # Heard (and recognized) by an InterruptWatcher while the assistant was busy
+        command = _carried_over.popleft()
+        print(f"You said: {command}")
+        return command
+
+    capture = audio_capture.get_capture(suppress=tts.is_speaking)
+    gate = _get_wake_gate()
+    attempt = 0
+    while attempt < attempts:
+        if capture.finished.is_set():
+            # No microphone / PyAudio: typed input still works
+            print(f"Microphone unavailable: {capture.error}")
+            return None
+        if not capture.pending():
+            print("Listening...")
+        try:
+            utterance = capture.get(timeout=listen_timeout, gate=gate)
+            if utterance is None:
+                # With a wake word, silence is normal: keep waiting to be addressed
+                if gate is None and not capture.finished.is_set():
+                    print("Listening timed out waiting for phrase.")
+                    attempt += 1
+                    if attempt == attempts:
+                        speak("I didn't hear anything. Could you please repeat?")
+                continue
+            if utterance.text is not None:
+                command = utterance.text
+            else:
+                command = stt.recognize(audio_capture.to_audio_data(utterance))
+            _report_recognized(command)
+            return command
+        except sr.UnknownValueError:
+            print("Speech not recognized (UnknownValueError)")
+            attempt += 1
+            if attempt == attempts:
+                speak("Sorry, I didn't understand that. Could you repeat?")
+            continue
+        except sr.RequestError as e:
+            print(f"Speech service error: {e}")
+            speak("Sorry, my speech service is down.")
+            return None
+    return None
+
+
+class InterruptWatcher(threading.Thread):
+    """Listens for "stop" while the assistant is busy (LISTEN_MODE=background)
+
+    Utterances queued by the background capture are recognized as they
+    arrive; an interrupt keyword calls on_interrupt(), anything else is kept
+    for the next listen() call.
+    """
+
+    def __init__(self, on_interrupt, keywords=INTERRUPT_KEYWORDS):
+        super().__init__(name="interrupt-watcher", daemon=True)
+        self.on_interrupt = on_interrupt
+        self.keywords = {" ".join(k.split()) for k in keywords}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import speech_recognition as sr
+
+        capture = audio_capture.get_capture(suppress=tts.is_speaking)
+        gate = _get_wake_gate()
+        while not self._stop_event.is_set() and not capture.finished.is_set():
+            utterance = capture.get(timeout=0.25, gate=gate)
+            if utterance is None:
+                continue
+            try:
+                text = utterance.text or stt.recognize(audio_capture.to_audio_data(utterance))
+            except (sr.UnknownValueError, sr.RequestError):
+                continue
+            if " ".join(text.lower().strip(" .!?").split()) in self.keywords:
+                print(f"Interrupted: {text}")
+                self.on_interrupt()
+                return
+            _carried_over.append(text)
+
+    def stop(self, timeout=2.0):
+        """Stop watching (waits for a recognition in progress to be kept)"""
+        self._stop_event.set()
+        if threading.current_thread() is not self:
+            self.join(timeout)
+
+
+def watch_for_interrupt(on_interrupt):
+    """Start an InterruptWatcher in background listen mode (None otherwise)"""
+    if LISTEN_MODE != "background":
+        return None
+    watcher = InterruptWatcher(on_interrupt)
+    watcher.start()
+    return watcher
+
+
+def _typed_input():
+    """Fallback to typed input"""
     try:
         typed = input("Type your question (or press Enter to skip): ")
         typed = typed.strip()